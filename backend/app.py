@@ -1,10 +1,11 @@
-from flask import Flask, jsonify, request, current_app, make_response, send_from_directory
+from flask import Flask, Response, jsonify, request, current_app, make_response, send_from_directory
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager, jwt_required, get_jwt_identity, get_jwt, create_access_token
 from functools import wraps
 import os
-import tempfile
-import subprocess
+import time
+import hashlib
+import base64
 import logging
 from dotenv import load_dotenv
 from auth import auth_bp
@@ -12,11 +13,17 @@ from parent import parent_bp
 from student import student_bp
 from models import db, User, Progress, Belt, FTCProgress
 from routes.ftc import ftc
+from services import (analytics_service, compression, curriculum_edits, curriculum_service, execution_service,
+                      leaderboard_service, output_matchers, progress_buffer, progress_service, search_service)
+from services.delta_sync import can_sync_since, no_changes, with_sync_version
+from services.result_cache import lesson_version
+from services.job_queue import FAILED, QueueFullError
+from config.execution_config import JOB_QUEUE
 import json
 import codecs
 from datetime import datetime, timedelta
 from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 import sqlite3
 from dateutil import tz
 import openai
@@ -39,7 +46,7 @@ CORS(app,
             "origins": "http://localhost:3000",
             "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
             "allow_headers": ["Content-Type", "Authorization"],
-            "expose_headers": ["Content-Type", "Authorization"],
+            "expose_headers": ["Content-Type", "Authorization", "X-Sync-Version"],
             "supports_credentials": True
         }
     },
@@ -93,6 +100,10 @@ app.register_blueprint(parent_bp, url_prefix='/api/parent')
 app.register_blueprint(student_bp, url_prefix='/api/student')
 app.register_blueprint(ftc)
 
+# gzip/brotli for JSON responses; static payloads are compressed once per ETag
+compression.init_app(app)
+progress_buffer.init_app(app)
+
 def admin_required(f):
     @wraps(f)
     @jwt_required()
@@ -167,6 +178,7 @@ def admin_update_role(user_id):
         if not user:
             return jsonify({'error': 'User not found'}), 404
             
+        analytics_service.role_changed(user.role, new_role)
         user.role = new_role
         db.session.commit()
         
@@ -208,6 +220,7 @@ def admin_update_user(user_id):
     data = request.get_json()
     
     if 'role' in data:
+        analytics_service.role_changed(user.role, data['role'])
         user.role = data['role']
     if 'active' in data:
         user.active = data['active']
@@ -219,14 +232,38 @@ def admin_update_user(user_id):
     db.session.commit()
     return jsonify({'message': 'User updated successfully'})
 
+ADMIN_LESSON_FIELDS = ('day', 'title', 'content', 'exercise_title', 'exercise_description',
+                       'exercise_hint', 'starter_code', 'test_cases')
+
 @app.route('/api/admin/lessons', methods=['POST'])
 @jwt_required()
 @admin_required
 def admin_add_lesson():
-    data = request.get_json()
+    """Add or replace a lesson by storing it as the next version of its day.
+
+    Send expected_version (0 for a new day) to fail with a 409 instead of
+    overwriting an edit made since the lesson was loaded.
+    """
+    data = request.get_json() or {}
+    missing = [field for field in ADMIN_LESSON_FIELDS if field not in data]
+    if missing:
+        return jsonify({'error': f"Missing fields: {', '.join(missing)}"}), 400
+    if not isinstance(data['day'], int) or data['day'] < 1:
+        return jsonify({'error': 'day must be a positive whole number'}), 400
+    # A day outside every belt would be stored but never served
+    snapshot = curriculum_service.get_index().snapshot()
+    if not any(belt['startDay'] <= data['day'] <= belt['endDay'] for belt in snapshot.belts):
+        return jsonify({'error': f"Day {data['day']} falls outside every belt"}), 400
+    # Reject test cases that would fail every student run for the day
+    if not isinstance(data['test_cases'], list) or not all(isinstance(case, dict) for case in data['test_cases']):
+        return jsonify({'error': 'test_cases must be a list of objects'}), 400
+    for number, test_case in enumerate(data['test_cases'], start=1):
+        try:
+            output_matchers.compile_test_case(test_case)
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': f'Test case {number}: {str(e)}'}), 400
     
     try:
-        curriculum = load_curriculum()
         new_lesson = {
             'day': data['day'],
             'title': data['title'],
@@ -235,18 +272,39 @@ def admin_add_lesson():
                 'title': data['exercise_title'],
                 'description': data['exercise_description'],
                 'hint': data['exercise_hint'],
-                'starter_code': data['starter_code'],
+                'starterCode': data['starter_code'],
                 'test_cases': data['test_cases']
             }
         }
         
-        curriculum['lessons'][str(data['day'])] = new_lesson
-        
-        # Save to curriculum.json
-        with open(os.path.join(os.path.dirname(__file__), 'curriculum.json'), 'w') as f:
-            json.dump(curriculum, f, indent=2)
+        version, revision = curriculum_edits.save_lesson(
+            new_lesson,
+            expected_version=data.get('expected_version'),
+            author=get_jwt_identity()
+        )
+        # This worker serves the new lesson right away; the others notice the
+        # revision counter within a second
+        curriculum_service.get_index().reload()
+
+        execution_service.invalidate_day(data['day'])
             
-        return jsonify({'message': 'Lesson added successfully'})
+        return jsonify({
+            'message': 'Lesson added successfully',
+            'day': data['day'],
+            'version': version,
+            'revision': revision
+        })
+    except curriculum_edits.VersionConflictError as e:
+        return jsonify({'error': str(e), 'current_version': e.current_version}), 409
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/lessons/<int:day>/history', methods=['GET'])
+@jwt_required()
+@admin_required
+def admin_lesson_history(day):
+    try:
+        return jsonify({'day': day, 'versions': curriculum_edits.history(day)})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -254,48 +312,325 @@ def admin_add_lesson():
 @jwt_required()
 @admin_required
 def admin_get_analytics():
+    """Dashboard figures from the analytics rollups; a few rows whatever the number of users."""
     try:
-        total_users = User.query.count()
-        students = User.query.filter_by(role='student').count()
-        parents = User.query.filter_by(role='parent').count()
-        
-        # Get activity in the last 30 days
-        thirty_days_ago = datetime.datetime.now() - datetime.timedelta(days=30)
-        recent_activity = Progress.query.filter(Progress.timestamp >= thirty_days_ago).count()
-        
-        # Get completion rates
-        total_lessons = len(load_curriculum()['lessons'])
-        completion_data = db.session.query(
-            User.current_belt,
-            func.count(User.id)
-        ).filter_by(role='student').group_by(User.current_belt).all()
-        
-        belt_distribution = {belt: count for belt, count in completion_data}
-        
-        return jsonify({
-            'user_stats': {
-                'total_users': total_users,
-                'students': students,
-                'parents': parents
-            },
-            'activity': {
-                'last_30_days': recent_activity
-            },
-            'completion': {
-                'total_lessons': total_lessons,
-                'belt_distribution': belt_distribution
-            }
-        })
+        return jsonify(analytics_service.summary())
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/admin/execution/stats', methods=['GET'])
+@admin_required
+def admin_execution_stats():
+    try:
+        return jsonify(execution_service.get_stats())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/compression/stats', methods=['GET'])
+@admin_required
+def admin_compression_stats():
+    try:
+        return jsonify(compression.get_stats())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Curriculum responses are revalidated on every use; unchanged ones come back as 304s
+CURRICULUM_CACHE_CONTROL = 'private, no-cache'
+
+def not_modified(etag):
+    """A 304 response if the client already holds etag, otherwise None."""
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    response = make_response('', 304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = CURRICULUM_CACHE_CONTROL
+    return response
+
+def with_etag(response, etag):
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = CURRICULUM_CACHE_CONTROL
+    return response
+
+def progress_state(user_id, progress):
+    """(current day, completed days) for a user, including writes still in the progress buffer."""
+    current_day = progress.current_day
+    completed_days = progress_service.completed_days(user_id)
+    buffer = progress_buffer.get_buffer()
+    if buffer is not None:
+        pending_days, pending_current_day = buffer.pending(user_id)
+        if not pending_days <= set(completed_days):
+            completed_days = sorted(pending_days.union(completed_days))
+        if pending_current_day is not None and pending_current_day > (current_day or 0):
+            current_day = pending_current_day
+    return current_day, completed_days
+
+def progress_etag(curriculum_etag, current_day, completed_days, *extra):
+    """ETag for a response built from the curriculum plus the user's progress."""
+    state = json.dumps([current_day, completed_days] + list(extra))
+    return f"{curriculum_etag}-{hashlib.sha256(state.encode('utf-8')).hexdigest()[:16]}"
+
+def curriculum_sync_version(snapshot, progress_version, current_day):
+    """The version of a user's curriculum view: the sources, the edits revision and their progress."""
+    return f'{snapshot.source_digest[:12]}.{snapshot.revision}.{progress_version}.{current_day}'
+
+def curriculum_changes(snapshot, user_id, since, progress_version, current_day):
+    """Days whose lesson or progress flags changed after the since version, or None to send everything."""
+    parts = (since or '').split('.')
+    if len(parts) != 4 or parts[0] != snapshot.source_digest[:12]:
+        return None
+    try:
+        since_revision, since_version, since_day = (int(part) for part in parts[1:])
+    except ValueError:
+        return None
+    if since_revision > snapshot.revision or not can_sync_since(user_id, since_version, progress_version):
+        return None
+
+    days = set()
+    if since_revision < snapshot.revision:
+        days.update(snapshot.unlocked_by(curriculum_edits.records_since(since_revision)[1]))
+    if since_version < progress_version:
+        changes = progress_service.changes_since(user_id, since_version)
+        days.update(snapshot.unlocked_by(change['day'] for change in changes))
+    low, high = sorted((since_day or 1, current_day or 1))
+    days.update(day for day in snapshot.days() if low < day <= high)
+    return days
+
+@app.route('/api/curriculum/content', methods=['GET'])
+@jwt_required()
+def get_curriculum_content():
+    """The curriculum without any per-user fields, with a strong ETag.
+
+    Pair it with /api/curriculum/overlay for the user's progress.
+    """
+    try:
+        etag, content = curriculum_service.get_index().content()
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+        return compression.mark_static(with_etag(Response(content, mimetype='application/json'), etag))
+
+    except Exception as e:
+        logger.error(f"Error retrieving curriculum: {str(e)}")
+        return jsonify({
+            'error': True,
+            'message': f'Error retrieving curriculum: {str(e)}'
+        }), 500
+
+@app.route('/api/curriculum/overlay', methods=['GET'])
+@jwt_required()
+def get_curriculum_overlay():
+    """The user's completed and accessible days for /api/curriculum/content."""
+    try:
+        snapshot = curriculum_service.get_index().snapshot()
+        current_user_id = get_jwt_identity()
+        progress = Progress.query.filter_by(user_id=current_user_id).first()
+        if not progress:
+            return jsonify({
+                'error': True,
+                'message': 'User progress not found'
+            }), 404
+
+        current_day, completed_days = progress_state(current_user_id, progress)
+        etag = progress_etag(snapshot.etag, current_day, completed_days)
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+
+        completed = set(completed_days)
+        accessible_days = [
+            day for day in snapshot.days()
+            if day <= current_day or day - 1 in completed
+        ]
+        return with_etag(jsonify({
+            'curriculum_etag': snapshot.etag,
+            'current_day': current_day,
+            'completed_days': completed_days,
+            'accessible_days': sorted(accessible_days)
+        }), etag)
+
+    except Exception as e:
+        logger.error(f"Error retrieving curriculum overlay: {str(e)}")
+        return jsonify({
+            'error': True,
+            'message': f'Error retrieving curriculum overlay: {str(e)}'
+        }), 500
+
+@app.route('/api/curriculum/summary', methods=['GET'])
+@jwt_required()
+def get_curriculum_summary():
+    """Belts with each lesson's day, title and progress flags, for the belt map.
+
+    Lesson bodies are left out; fetch them from /api/lesson/<day> when opened.
+    """
+    try:
+        snapshot = curriculum_service.get_index().snapshot()
+        current_user_id = get_jwt_identity()
+        progress = Progress.query.filter_by(user_id=current_user_id).first()
+        if not progress:
+            return jsonify({
+                'error': True,
+                'message': 'User progress not found'
+            }), 404
+
+        current_day, completed_days = progress_state(current_user_id, progress)
+        etag = progress_etag(snapshot.etag, current_day, completed_days, 'summary')
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+
+        lessons, _ = snapshot.list_lessons(
+            ('day', 'title', 'is_completed', 'is_accessible'),
+            completed_days,
+            current_day,
+            limit=None
+        )
+        belts = [dict(belt, lessons=[], total=0, completed=0) for belt in snapshot.belts]
+        for lesson, summary in zip(lessons, snapshot.summaries):
+            belt = belts[summary[2]]
+            belt['lessons'].append(lesson)
+            belt['total'] += 1
+            belt['completed'] += lesson['is_completed']
+
+        return with_etag(jsonify({
+            'curriculum_etag': snapshot.etag,
+            'current_day': current_day,
+            'belts': belts
+        }), etag)
+
+    except Exception as e:
+        logger.error(f"Error retrieving curriculum summary: {str(e)}")
+        return jsonify({
+            'error': True,
+            'message': f'Error retrieving curriculum summary: {str(e)}'
+        }), 500
+
+LESSON_PAGE_SIZE = 50
+MAX_LESSON_PAGE_SIZE = 200
+
+def encode_cursor(day):
+    return base64.urlsafe_b64encode(json.dumps({'after': day}).encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))['after']
+
+@app.route('/api/lessons', methods=['GET'])
+@jwt_required()
+def list_lessons():
+    """Lessons a page at a time, with only the fields asked for.
+
+    Query parameters:
+        fields  comma-separated subset of day, title, belt, is_completed,
+                is_accessible, content and exercise (default: all but the
+                last two)
+        belt    belt name, e.g. 'White Belt' or 'white'
+        limit   page size, up to MAX_LESSON_PAGE_SIZE
+        cursor  next_cursor from the previous page
+    """
+    try:
+        snapshot = curriculum_service.get_index().snapshot()
+
+        fields = request.args.get('fields')
+        fields = ([field.strip() for field in fields.split(',') if field.strip()]
+                  if fields else list(curriculum_service.SUMMARY_FIELDS))
+        unknown = [field for field in fields if field not in curriculum_service.LESSON_FIELDS]
+        if unknown:
+            return jsonify({
+                'error': True,
+                'message': f"Unknown fields: {', '.join(unknown)}. "
+                           f"Choose from {', '.join(curriculum_service.LESSON_FIELDS)}"
+            }), 400
+
+        belt_index = None
+        if request.args.get('belt'):
+            belt_index = snapshot.belt_index(request.args['belt'])
+            if belt_index is None:
+                return jsonify({'error': True, 'message': f"Unknown belt: {request.args['belt']}"}), 400
+
+        try:
+            limit = min(max(int(request.args.get('limit', LESSON_PAGE_SIZE)), 1), MAX_LESSON_PAGE_SIZE)
+            after_day = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+        except (ValueError, KeyError, TypeError):
+            return jsonify({'error': True, 'message': 'Invalid limit or cursor'}), 400
+
+        current_user_id = get_jwt_identity()
+        progress = Progress.query.filter_by(user_id=current_user_id).first()
+        if not progress:
+            return jsonify({
+                'error': True,
+                'message': 'User progress not found'
+            }), 404
+
+        current_day, completed_days = progress_state(current_user_id, progress)
+        etag = progress_etag(snapshot.etag, current_day, completed_days, fields, belt_index, limit, after_day)
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+
+        lessons, next_day = snapshot.list_lessons(
+            fields,
+            completed_days,
+            current_day,
+            belt_index=belt_index,
+            after_day=after_day,
+            limit=limit
+        )
+        return with_etag(jsonify({
+            'lessons': lessons,
+            'next_cursor': encode_cursor(next_day) if next_day is not None else None,
+            'curriculum_etag': snapshot.etag
+        }), etag)
+
+    except Exception as e:
+        logger.error(f"Error listing lessons: {str(e)}")
+        return jsonify({
+            'error': True,
+            'message': f'Error listing lessons: {str(e)}'
+        }), 500
+
+SEARCH_RESULT_LIMIT = 10
+MAX_SEARCH_RESULT_LIMIT = 50
+
+@app.route('/api/search', methods=['GET'])
+@jwt_required()
+def search_lessons():
+    """Search lesson titles, content, exercises and hints.
+
+    Query parameters: q (required), limit and belt. Results are ranked
+    best first and carry a snippet with the matched words in <mark> tags.
+    """
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': True, 'message': 'Query parameter q is required'}), 400
+        try:
+            limit = min(max(int(request.args.get('limit', SEARCH_RESULT_LIMIT)), 1), MAX_SEARCH_RESULT_LIMIT)
+        except ValueError:
+            return jsonify({'error': True, 'message': 'Invalid limit'}), 400
+
+        belt = request.args.get('belt')
+        if belt:
+            snapshot = curriculum_service.get_index().snapshot()
+            belt_index = snapshot.belt_index(belt)
+            if belt_index is None:
+                return jsonify({'error': True, 'message': f'Unknown belt: {belt}'}), 400
+            belt = snapshot.belts[belt_index]['name']
+
+        results, took_ms = search_service.search(query, limit=limit, belt=belt)
+        return jsonify({'query': query, 'results': results, 'took_ms': took_ms})
+
+    except Exception as e:
+        logger.error(f"Error searching lessons: {str(e)}")
+        return jsonify({
+            'error': True,
+            'message': f'Error searching lessons: {str(e)}'
+        }), 500
+
 @app.route('/api/curriculum', methods=['GET'])
 @jwt_required()
 def get_curriculum():
     try:
-        # Load the curriculum
-        with open('curriculum.json', 'r', encoding='utf-8') as f:
-            curriculum = json.load(f)
+        snapshot = curriculum_service.get_index().snapshot()
 
         # Get user's progress
         current_user_id = get_jwt_identity()
@@ -307,14 +642,31 @@ def get_curriculum():
                 'message': 'User progress not found'
             }), 404
 
-        # Add progress information to each lesson
-        completed_days = json.loads(progress.completed_days)
-        for belt in curriculum['belts']:
-            for lesson in belt['days']:
-                lesson['is_completed'] = lesson['day'] in completed_days
-                lesson['is_accessible'] = lesson['day'] <= progress.current_day or lesson['day'] - 1 in completed_days
-
-        return jsonify(curriculum)
+        current_day, completed_days = progress_state(current_user_id, progress)
+        progress_version = progress_service.version(current_user_id)
+        version = curriculum_sync_version(snapshot, progress_version, current_day)
+        since = request.args.get('since')
+        if since is not None:
+            days = curriculum_changes(snapshot, current_user_id, since, progress_version, current_day)
+            if days is not None:
+                if since == version:
+                    return no_changes(version)
+                lessons = snapshot.user_lessons(days, completed_days, current_day)
+                body = b''.join([
+                    b'{"delta":true,"version":', json.dumps(version).encode('utf-8'),
+                    b',"current_day":', json.dumps(current_day).encode('utf-8'),
+                    b',"lessons":', lessons, b'}'
+                ])
+                return with_sync_version(Response(body, mimetype='application/json'), version)
+
+        etag = progress_etag(snapshot.etag, current_day, completed_days)
+        cached = not_modified(etag)
+        if cached is not None:
+            return with_sync_version(cached, version)
+
+        # Progress flags are spliced into lessons serialized once per curriculum version
+        body = snapshot.user_view(completed_days, current_day)
+        return with_sync_version(with_etag(Response(body, mimetype='application/json'), etag), version)
 
     except Exception as e:
         logger.error(f"Error retrieving curriculum: {str(e)}")
@@ -342,34 +694,9 @@ def get_lesson(day):
             db.session.add(progress)
             db.session.commit()
         
-        # Load the curriculum
-        try:
-            with open('curriculum.json', 'r', encoding='utf-8') as f:
-                curriculum = json.load(f)
-        except Exception as e:
-            logger.error(f"Error loading curriculum: {str(e)}")
-            return jsonify({
-                'error': True,
-                'message': 'Error loading curriculum'
-            }), 500
-
         # Find the lesson and belt for the requested day
-        lesson = None
-        current_belt = None
-        for belt in curriculum['belts']:
-            for belt_lesson in belt['days']:
-                if belt_lesson['day'] == day:
-                    lesson = belt_lesson
-                    current_belt = {
-                        'name': belt['name'],
-                        'color': belt['color'],
-                        'startDay': belt['startDay'],
-                        'endDay': belt['endDay'],
-                        'description': belt['description']
-                    }
-                    break
-            if lesson:
-                break
+        snapshot = curriculum_service.get_index().snapshot()
+        lesson, current_belt = snapshot.lesson(day)
 
         if not lesson:
             return jsonify({
@@ -377,14 +704,8 @@ def get_lesson(day):
                 'message': f'No lesson found for day {day}'
             }), 404
 
-        # Parse completed days
-        try:
-            completed_days = json.loads(progress.completed_days) if progress.completed_days else []
-            completed_days = [int(d) for d in completed_days]  # Ensure all days are integers
-        except (json.JSONDecodeError, ValueError):
-            completed_days = []
-            progress.completed_days = '[]'
-            db.session.commit()
+        current_day, completed_days = progress_state(current_user_id, progress)
+        completed = set(completed_days)
 
         # For day 1, always allow access
         # For other days:
@@ -393,9 +714,9 @@ def get_lesson(day):
         # 3. Allow if it's already completed
         is_accessible = (
             day == 1 or
-            day <= progress.current_day or
-            (day - 1) in completed_days or
-            day in completed_days
+            day <= current_day or
+            (day - 1) in completed or
+            day in completed
         )
 
         if not is_accessible:
@@ -404,14 +725,47 @@ def get_lesson(day):
                 'message': 'Previous lessons must be completed first'
             }), 403
 
-        # Add progress information to the lesson
-        lesson['is_completed'] = day in completed_days
-        lesson['current_progress'] = progress.current_day
+        etag = progress_etag(snapshot.etag, current_day, completed_days, day)
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+
+        # Add progress information to a copy of the shared lesson
+        lesson = dict(lesson)
+        lesson['is_completed'] = day in completed
+        lesson['current_progress'] = current_day
         lesson['completed_days'] = completed_days
         lesson['belt'] = current_belt
         lesson['next_day'] = day + 1 if day < 60 else None
 
-        return jsonify(lesson)
+        return with_etag(jsonify(lesson), etag)
+
+    except Exception as e:
+        logger.error(f"Error retrieving lesson: {str(e)}")
+        return jsonify({
+            'error': True,
+            'message': f'Error retrieving lesson: {str(e)}'
+        }), 500
+
+@app.route('/api/lesson/<int:day>/content', methods=['GET'])
+@jwt_required()
+def get_lesson_content(day):
+    """One lesson without any per-user fields, with a strong ETag.
+
+    Like /api/curriculum/content the body only changes when the lesson
+    does, so it is compressed once and served from memory.
+    """
+    try:
+        etag, content = curriculum_service.get_index().snapshot().lesson_content(day)
+        if content is None:
+            return jsonify({
+                'error': True,
+                'message': f'No lesson found for day {day}'
+            }), 404
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+        return compression.mark_static(with_etag(Response(content, mimetype='application/json'), etag))
 
     except Exception as e:
         logger.error(f"Error retrieving lesson: {str(e)}")
@@ -423,112 +777,285 @@ def get_lesson(day):
 @app.route('/api/run_code', methods=['POST'])
 @jwt_required()
 def run_code():
+    """Run and grade a submission, waiting for the result.
+
+    Runs go through the same per-user fair queue as /api/run_code/jobs. If
+    the submission is still waiting after JOB_QUEUE['SYNC_WAIT'] seconds,
+    the response is a 202 with the job's queue position and status URL.
+    """
     try:
         data = request.get_json()
         if not data:
             return jsonify({'error': 'No data provided'}), 400
-            
-        code = data.get('code', '')
-        day = data.get('day', '')
-        user_input = data.get('userInput', '')
-        
-        if not code or not day:
-            return jsonify({'error': 'Code and day are required'}), 400
 
-        # Modify the code to inject the input
-        modified_code = f'''
-import sys
-import io
+        # Code that does not compile never takes a queue slot
+        syntax_error = execution_service.precheck(data.get('code', ''))
+        if syntax_error:
+            return jsonify(syntax_error), 400
 
-# Redirect stdin to use our input
-sys.stdin = io.StringIO("""{user_input}\\n""")
+        current_user_id = get_jwt_identity()
+        job_queue = execution_service.get_job_queue()
+        try:
+            job = job_queue.submit(current_user_id, run_submission_job, data, current_user_id)
+        except QueueFullError as e:
+            return queue_full_response(e)
 
-{code}
-'''
+        if not job.finished.wait(JOB_QUEUE['SYNC_WAIT']):
+            return jsonify(queued_job_state(job_queue, job)), 202
+        if job.status == FAILED:
+            return jsonify({'error': True, 'message': f'Server error: {job.error}'}), 500
+        return jsonify(job.result['body']), job.result['status_code']
 
-        # Create a temporary file with the modified code
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-            f.write(modified_code)
-            temp_file = f.name
+    except Exception as e:
+        logger.error(f"Error in run_code: {str(e)}", exc_info=True)
+        return jsonify({
+            'error': True,
+            'message': f'Server error: {str(e)}'
+        }), 500
 
-        try:
-            # Run the code without input (since we've injected it)
-            process = subprocess.Popen(
-                ['python', temp_file],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-            
-            output, error = process.communicate()
-            
-            # Clean up temp file
-            try:
-                os.unlink(temp_file)
-            except:
-                pass
-            
-            if error:
-                logger.error(f"Code execution error: {error}")
-                return jsonify({'error': error}), 400
-
-            # Get the current lesson
-            lesson = get_lesson_by_day(day)
-            if not lesson:
-                return jsonify({'error': 'Lesson not found'}), 404
-
-            # Check if output matches any test case
-            success = False
-            for test_case in lesson['exercise']['test_cases']:
-                expected = test_case['expected']
-                actual_output = output
-                logger.debug(f"Expected output (raw): '{expected}'")
-                logger.debug(f"Actual output (raw): '{actual_output}'")
-                logger.debug(f"Expected output (hex): {expected.encode().hex()}")
-                logger.debug(f"Actual output (hex): {actual_output.encode().hex()}")
-                logger.debug(f"Expected length: {len(expected)}")
-                logger.debug(f"Actual length: {len(actual_output)}")
-                if actual_output == expected:
-                    success = True
-                    break
-
-            if success:
-                # Update progress
-                current_user_id = get_jwt_identity()
-                progress = Progress.query.filter_by(user_id=current_user_id).first()
-                if not progress:
-                    return jsonify({'error': 'User progress not found'}), 404
-
-                completed_days = json.loads(progress.completed_days)
-                if day not in completed_days:
-                    completed_days.append(day)
-                    progress.completed_days = json.dumps(completed_days)
-                    db.session.commit()
+@app.route('/api/run_code/jobs', methods=['POST'])
+@jwt_required()
+def submit_run_code_job():
+    """Queue a submission and return immediately with a job id.
 
-                return jsonify({
-                    'success': True,
-                    'output': output,
-                    'message': 'Great job! Moving to next lesson...',
-                    'next_day': str(int(day) + 1)
-                })
-            else:
-                return jsonify({
-                    'success': False,
-                    'output': output,
-                    'message': 'Output does not match expected result. Try again!'
-                })
+    Poll /api/run_code/jobs/<job_id> or read its /events stream for the
+    result, which has the same body /api/run_code would have returned.
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
 
-        except Exception as e:
-            logger.error(f"Error running code: {str(e)}")
-            return jsonify({'error': f'Error running code: {str(e)}'}), 400
+        # Code that does not compile never takes a queue slot
+        syntax_error = execution_service.precheck(data.get('code', ''))
+        if syntax_error:
+            return jsonify(syntax_error), 400
+
+        current_user_id = get_jwt_identity()
+        job_queue = execution_service.get_job_queue()
+        try:
+            job = job_queue.submit(current_user_id, run_submission_job, data, current_user_id)
+        except QueueFullError as e:
+            return queue_full_response(e)
+
+        return jsonify(queued_job_state(job_queue, job)), 202
 
     except Exception as e:
-        logger.error(f"Error in run_code: {str(e)}", exc_info=True)
+        logger.error(f"Error queueing code: {str(e)}", exc_info=True)
         return jsonify({
             'error': True,
             'message': f'Server error: {str(e)}'
         }), 500
 
+def queued_job_state(job_queue, job):
+    state = job_queue.describe(job)
+    state['status_url'] = f'/api/run_code/jobs/{job.id}'
+    state['events_url'] = f'/api/run_code/jobs/{job.id}/events'
+    return state
+
+def queue_full_response(error):
+    response = jsonify({'error': str(error)})
+    response.headers['Retry-After'] = '2'
+    return response, 429
+
+@app.route('/api/run_code/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_run_code_job(job_id):
+    job_queue = execution_service.get_job_queue()
+    job = job_queue.get(job_id, owner=get_jwt_identity())
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job_queue.describe(job))
+
+@app.route('/api/run_code/jobs/<job_id>/events', methods=['GET'])
+@jwt_required()
+def stream_run_code_job(job_id):
+    """Server-Sent Events stream of a job's status until it finishes.
+
+    Needs the Authorization header, so read it with fetch() rather than
+    EventSource.
+    """
+    job_queue = execution_service.get_job_queue()
+    job = job_queue.get(job_id, owner=get_jwt_identity())
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+
+    def events():
+        deadline = time.monotonic() + JOB_QUEUE['STREAM_TIMEOUT']
+        last_state = None
+        last_sent = time.monotonic()
+        while True:
+            finished = job.finished.is_set()
+            state = job_queue.describe(job)
+            if state != last_state:
+                yield f"event: {state['status']}\ndata: {json.dumps(state)}\n\n"
+                last_state = state
+                last_sent = time.monotonic()
+            if finished:
+                return
+            if time.monotonic() > deadline:
+                yield 'event: timeout\ndata: {}\n\n'
+                return
+            if not job.finished.wait(1) and time.monotonic() - last_sent > 15:
+                yield ': keep-alive\n\n'
+                last_sent = time.monotonic()
+
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def run_submission_job(data, user_id):
+    """Body of a queued run_code job; runs on a job queue thread."""
+    with app.app_context():
+        body, status = evaluate_submission(data, user_id)
+        return {'status_code': status, 'body': body}
+
+def evaluate_submission(data, user_id):
+    """Run and grade a submission; returns (response body, HTTP status)."""
+    code = data.get('code', '')
+    day = data.get('day', '')
+    user_input = data.get('userInput', '')
+
+    if not code or not day:
+        return {'error': 'Code and day are required'}, 400
+
+    # Batched grading: run every test case's input in one worker
+    if data.get('mode') == 'batch':
+        return run_code_batch(code, day, user_id)
+
+    # Get the current lesson
+    lesson = get_lesson_by_day(day)
+    if not lesson:
+        return {'error': 'Lesson not found'}, 404
+
+    try:
+        result = execution_service.execute(code, f'{user_input}\n', lesson)
+        output, error = result['stdout'], result['stderr']
+        record_submission(user_id, day, code, lesson, not error and bool(result['matched']), user_input=user_input,
+                          duration_ms=result.get('duration_ms'))
+
+        if error:
+            logger.error(f"Code execution error: {error}")
+            return {
+                'error': error,
+                'limit_exceeded': result.get('limit_exceeded'),
+                'resources': result.get('resources')
+            }, 400
+
+        # The worker graded the output against the lesson's test cases as it streamed
+        if result['matched']:
+            # Update progress
+            if not mark_day_completed(user_id, day):
+                return {'error': 'User progress not found'}, 404
+
+            return {
+                'success': True,
+                'output': output,
+                'message': 'Great job! Moving to next lesson...',
+                'next_day': str(int(day) + 1),
+                'resources': result.get('resources')
+            }, 200
+        else:
+            return {
+                'success': False,
+                'output': output,
+                'message': 'Output does not match expected result. Try again!',
+                'note': result.get('note'),
+                'resources': result.get('resources')
+            }, 200
+
+    except Exception as e:
+        logger.error(f"Error running code: {str(e)}")
+        return {'error': f'Error running code: {str(e)}'}, 400
+
+def run_code_batch(code, day, user_id):
+    """Grade a submission against all of the lesson's test cases at once."""
+    lesson = get_lesson_by_day(day)
+    if not lesson:
+        return {'error': 'Lesson not found'}, 404
+
+    test_cases = lesson['exercise']['test_cases']
+    try:
+        results = execution_service.execute_batch(
+            code,
+            [f"{test_case.get('input', '')}\n" for test_case in test_cases],
+            lesson
+        )
+    except Exception as e:
+        logger.error(f"Error running code: {str(e)}")
+        return {'error': f'Error running code: {str(e)}'}, 400
+
+    cases = []
+    for test_case, result in zip(test_cases, results):
+        cases.append({
+            'description': test_case.get('description', ''),
+            'input': test_case.get('input', ''),
+            'passed': not result['stderr'] and bool(result['matched']),
+            'output': result['stdout'],
+            'error': result['stderr'],
+            'duration_ms': result['duration_ms'],
+            'limit_exceeded': result.get('limit_exceeded'),
+            'note': result.get('note'),
+            'resources': result.get('resources'),
+            'cached': result.get('cached', False)
+        })
+
+    passed = sum(1 for case in cases if case['passed'])
+    success = bool(cases) and passed == len(cases)
+    record_submission(user_id, day, code, lesson, success, mode='batch',
+                      duration_ms=sum(case['duration_ms'] for case in cases))
+    if success and not mark_day_completed(user_id, day):
+        return {'error': 'User progress not found'}, 404
+
+    return {
+        'success': success,
+        'passed': passed,
+        'total': len(cases),
+        'cases': cases,
+        'message': 'Great job! Moving to next lesson...' if success else f'{passed} of {len(cases)} test cases passed. Try again!',
+        'next_day': str(int(day) + 1) if success else None
+    }, 200
+
+def record_submission(user_id, day, code, lesson, passed, user_input='', mode='single', duration_ms=None):
+    """Count the attempt and keep the submission that counts for (user, day) so it can be re-graded.
+
+    A passing submission is never replaced by a later failing attempt.
+    """
+    buffer = progress_buffer.get_buffer()
+    if buffer is not None:
+        buffer.record_attempt(user_id, day, passed, duration_ms, submission={
+            'code': code,
+            'version': lesson_version(lesson),
+            'user_input': user_input,
+            'mode': mode
+        })
+        return
+    try:
+        progress_service.record_attempt(user_id, day, passed, duration_ms)
+        progress_service.save_submission(user_id, day, code, lesson_version(lesson), passed,
+                                         user_input=user_input, mode=mode)
+        db.session.commit()
+    except Exception as e:
+        # Grading already happened; a failed write must not fail the request
+        db.session.rollback()
+        logger.error(f"Error recording submission: {str(e)}")
+
+def mark_day_completed(user_id, day):
+    """Record day as completed for the user; False if they have no progress."""
+    progress = Progress.query.filter_by(user_id=user_id).first()
+    if not progress:
+        return False
+
+    buffer = progress_buffer.get_buffer()
+    if buffer is not None:
+        buffer.complete(user_id, day)
+        return True
+    progress_service.set_completed(user_id, day)
+    progress_service.mirror_completed_days(progress)
+    db.session.commit()
+    return True
+
 @app.route('/api/progress/init', methods=['POST'])
 @jwt_required()
 def init_progress():
@@ -570,11 +1097,26 @@ def get_progress():
                 'message': 'No progress found'
             }), 404
             
-        return jsonify({
-            'current_day': progress.current_day,
+        version = progress_service.version(current_user_id)
+        since = request.args.get('since', type=int)
+        if can_sync_since(current_user_id, since, version):
+            if since == version:
+                return no_changes(version)
+            return with_sync_version(jsonify({
+                'version': version,
+                'since': since,
+                'current_day': progress.current_day,
+                'current_belt_id': progress.current_belt_id,
+                'changes': progress_service.changes_since(current_user_id, since)
+            }), version)
+
+        current_day, completed_days = progress_state(current_user_id, progress)
+        return with_sync_version(jsonify({
+            'version': version,
+            'current_day': current_day,
             'current_belt_id': progress.current_belt_id,
-            'completed_days': json.loads(progress.completed_days)
-        })
+            'completed_days': completed_days
+        }), version)
     except Exception as e:
         logger.error(f"Error getting progress: {str(e)}")
         return jsonify({
@@ -636,7 +1178,7 @@ def get_child_progress(child_id):
             'current_belt': current_belt.name,
             'completed_lessons': child.completed_lessons,
             'progress': {
-                'completed_days': progress.completed_days,
+                'completed_days': progress_service.completed_days(child_id),
                 'current_day': progress.current_day,
                 'current_belt': {
                     'id': current_belt.id,
@@ -715,35 +1257,34 @@ def update_progress():
             db.session.commit()
 
         # Update completed days
-        try:
-            completed_days = json.loads(progress.completed_days) if progress.completed_days else []
-            completed_days = [int(d) for d in completed_days]  # Ensure all days are integers
-        except (json.JSONDecodeError, ValueError):
-            completed_days = []
-
+        current_day, completed_days = progress_state(current_user_id, progress)
         if completed_day not in completed_days:
-            completed_days.append(completed_day)
-            completed_days.sort()
-            progress.completed_days = json.dumps(completed_days)
-            
+            completed_days = sorted(completed_days + [completed_day])
             # Update current day to the next day if this was the current day
-            if completed_day >= progress.current_day:
-                progress.current_day = completed_day + 1
+            if completed_day >= current_day:
+                current_day = completed_day + 1
 
-            try:
-                db.session.commit()
-            except Exception as e:
-                db.session.rollback()
-                logger.error(f"Error saving progress: {str(e)}")
-                return jsonify({
-                    'error': True,
-                    'message': 'Failed to save progress'
-                }), 500
+            buffer = progress_buffer.get_buffer()
+            if buffer is not None:
+                buffer.complete(current_user_id, completed_day, current_day=current_day)
+            else:
+                progress_service.set_completed(current_user_id, completed_day)
+                progress_service.mirror_completed_days(progress)
+                progress_service.set_current_day(progress, current_day)
+                try:
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Error saving progress: {str(e)}")
+                    return jsonify({
+                        'error': True,
+                        'message': 'Failed to save progress'
+                    }), 500
 
         return jsonify({
             'success': True,
             'message': f'Successfully completed day {completed_day}',
-            'current_day': progress.current_day,
+            'current_day': current_day,
             'completed_days': completed_days
         })
 
@@ -754,20 +1295,110 @@ def update_progress():
             'message': str(e)
         }), 500
 
+# Most completion events one /api/progress/sync request may carry
+SYNC_MAX_EVENTS = 500
+
+@app.route('/api/progress/sync', methods=['POST'])
+@jwt_required()
+def sync_progress():
+    """Apply a batch of completion events, such as those queued while offline, in one transaction.
+
+    Body: {"events": [{"key": "<idempotency key>", "day": 3, "completed_at": "<ISO 8601>"}]}.
+    Events whose key was applied before are skipped, so a client can retry
+    a sync that timed out. Returns the merged progress.
+    """
+    data = request.get_json(silent=True) or {}
+    events = data.get('events')
+    if not isinstance(events, list) or not events:
+        return jsonify({
+            'error': True,
+            'message': 'events must be a non-empty list'
+        }), 400
+    if len(events) > SYNC_MAX_EVENTS:
+        return jsonify({
+            'error': True,
+            'message': f'At most {SYNC_MAX_EVENTS} events can be synced at once'
+        }), 400
+
+    try:
+        current_user_id = get_jwt_identity()
+        snapshot = curriculum_service.get_index().snapshot()
+
+        # A concurrent retry of the same batch can insert a key first; the
+        # second pass then sees those events as duplicates
+        for attempt in range(2):
+            progress = Progress.query.filter_by(user_id=current_user_id).first()
+            if not progress:
+                progress = Progress(
+                    user_id=current_user_id,
+                    current_day=1,
+                    current_belt_id=1,
+                    completed_days='[]'
+                )
+                db.session.add(progress)
+            try:
+                applied, duplicates, rejected = progress_service.apply_sync(
+                    progress, events, lambda day: snapshot.lesson(day)[0] is not None
+                )
+                db.session.commit()
+                break
+            except IntegrityError:
+                db.session.rollback()
+                if attempt:
+                    raise
+
+        current_day, completed_days = progress_state(current_user_id, progress)
+        return jsonify({
+            'applied': applied,
+            'duplicates': duplicates,
+            'rejected': rejected,
+            'current_day': current_day,
+            'completed_days': completed_days
+        })
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error syncing progress: {str(e)}")
+        return jsonify({
+            'error': True,
+            'message': f'Error syncing progress: {str(e)}'
+        }), 500
+
+LEADERBOARD_LIMIT = 10
+MAX_LEADERBOARD_LIMIT = 100
+
+@app.route('/api/leaderboard', methods=['GET'])
+@jwt_required()
+def get_leaderboard():
+    """The top users by lessons completed, with streaks, and the caller's own rank.
+
+    Query parameter: limit. me is null until the caller completes a lesson.
+    """
+    try:
+        try:
+            limit = min(max(int(request.args.get('limit', LEADERBOARD_LIMIT)), 1), MAX_LEADERBOARD_LIMIT)
+        except ValueError:
+            return jsonify({'error': True, 'message': 'Invalid limit'}), 400
+
+        index = leaderboard_service.get_index()
+        return jsonify({
+            'top': index.top(limit),
+            'me': index.rank(int(get_jwt_identity())),
+            'total': index.size()
+        })
+
+    except Exception as e:
+        logger.error(f"Error retrieving leaderboard: {str(e)}")
+        return jsonify({
+            'error': True,
+            'message': f'Error retrieving leaderboard: {str(e)}'
+        }), 500
+
 def get_lesson_by_day(day):
     """Get lesson details from curriculum.json by day number."""
     try:
-        # Load curriculum
-        with open('curriculum.json', 'r', encoding='utf-8') as f:
-            curriculum = json.load(f)
-
-        # Find the lesson for the given day
-        day = int(day)
-        for belt in curriculum['belts']:
-            for belt_lesson in belt['days']:
-                if belt_lesson['day'] == day:
-                    return belt_lesson
-        return None
+        lesson, belt = curriculum_service.get_lesson(day)
+        return lesson
     except Exception as e:
         logger.error(f"Error getting lesson: {str(e)}")
         return None
@@ -902,38 +1533,23 @@ if not os.path.exists(UPLOAD_FOLDER):
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
 def load_curriculum():
+    """A mutable copy of the curriculum, or None if it cannot be loaded."""
     try:
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        curriculum_path = os.path.join(current_dir, 'curriculum.json')
-        logger.debug(f"Loading curriculum from: {curriculum_path}")
-
-        if not os.path.exists(curriculum_path):
-            logger.error(f"curriculum.json not found at {curriculum_path}")
-            return None
-
-        with open(curriculum_path, 'r', encoding='utf-8') as f:
-            curriculum = json.load(f)
-
-        if not curriculum or not isinstance(curriculum, dict) or 'belts' not in curriculum:
-            logger.error("Invalid curriculum format")
-            return None
-
-        # Validate belt structure
-        for belt in curriculum['belts']:
-            if not all(key in belt for key in ['name', 'color', 'startDay', 'endDay', 'days']):
-                logger.error(f"Invalid belt format: {belt.get('name', 'unknown')}")
-                return None
-
-        logger.info(f"Successfully loaded curriculum with {len(curriculum['belts'])} belts")
-        return curriculum
-
-    except json.JSONDecodeError as e:
-        logger.error(f"JSON decode error: {str(e)}")
-        return None
+        return curriculum_service.thaw(curriculum_service.get_curriculum())
     except Exception as e:
         logger.error(f"Error loading curriculum: {str(e)}", exc_info=True)
         return None
 
+def warm_curriculum():
+    """Build the curriculum index, so the first request does not pay for it."""
+    try:
+        curriculum_service.get_index()
+    except Exception as e:
+        logger.error(f"Error loading curriculum: {str(e)}", exc_info=True)
+
+# Index curriculum.json once per process, before the first request
+warm_curriculum()
+
 def create_demo_accounts():
     with app.app_context():
         try:
@@ -959,6 +1575,7 @@ def create_demo_accounts():
                         last_login=datetime.utcnow()
                     )
                     db.session.add(user)
+                    analytics_service.user_registered(role)
                     logger.debug(f"Created {role} account: {email} with password_hash: {user.password_hash[:20]}...")
                 else:
                     logger.debug(f"User {email} already exists")
@@ -1025,6 +1642,6 @@ if __name__ == '__main__':
         create_demo_accounts()
         
         # Initialize curriculum
-        load_curriculum()
+        warm_curriculum()
         
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -6,6 +6,7 @@ import re
 import sqlite3
 import os
 from models import db, User, ChildProfile
+from services import analytics_service
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -96,6 +97,7 @@ def register():
                 'INSERT INTO user_progress (user_id, current_belt_id, current_day, completed_days) VALUES (?, ?, ?, ?)',
                 (user_id, 1, 1, '[]')
             )
+        analytics_service.user_registered(role, current_day=1 if role == 'student' else None, conn=conn)
         
         # Commit changes
         conn.commit()
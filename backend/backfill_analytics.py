@@ -0,0 +1,42 @@
+"""Rebuild the admin analytics rollups from users, progress and completions.
+
+Run it once after the migration that adds the analytics tables, and again
+whenever the rollups are suspected to have drifted. It is safe to run while
+the app is serving; the rebuild is a single transaction.
+
+    python backfill_analytics.py
+"""
+
+import sys
+import time
+
+from flask import Flask
+
+from models import db
+from services import analytics_service
+
+app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///hackdojo.db'
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+db.init_app(app)
+
+
+def main():
+    started = time.monotonic()
+    with app.app_context():
+        try:
+            analytics_service.backfill()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        summary = analytics_service.summary()
+    print(f"Rebuilt analytics rollups in {(time.monotonic() - started) * 1000:.0f}ms: "
+          f"{summary['user_stats']['total_users']} users, "
+          f"{sum(summary['completion']['lessons'].values())} completions over "
+          f"{len(summary['completion']['lessons'])} lessons")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Micro-benchmark of building the /api/curriculum response body.
+
+Compares the original per-request path (read and parse curriculum.json,
+write the progress flags into every lesson with list membership tests,
+then encode everything) with the shared snapshot's user_view, for
+synthetic curricula of 100 and 1,000 days. The user has completed half
+of the days.
+
+    python bench_curriculum.py
+    python bench_curriculum.py --days 100 1000 5000 --repeat 50
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from services import curriculum_service
+
+DAYS_PER_BELT = 10
+
+
+def synthetic_curriculum(days):
+    """A curriculum of the given length, built by repeating the real lessons."""
+    with open(curriculum_service.CURRICULUM_PATH, 'r', encoding='utf-8') as f:
+        source = json.load(f)
+    templates = [lesson for belt in source['belts'] for lesson in belt['days']]
+    belts = []
+    for start in range(1, days + 1, DAYS_PER_BELT):
+        end = min(start + DAYS_PER_BELT - 1, days)
+        belts.append({
+            'name': f'Belt {len(belts) + 1}',
+            'color': '#FFFFFF',
+            'startDay': start,
+            'endDay': end,
+            'requiredDays': end - start + 1,
+            'description': 'Synthetic belt',
+            'days': [dict(templates[(day - 1) % len(templates)], day=day) for day in range(start, end + 1)]
+        })
+    return {'belts': belts}
+
+
+def original_view(path, completed_days, current_day):
+    """get_curriculum as it was: parse, mutate and encode on every request."""
+    with open(path, 'r', encoding='utf-8') as f:
+        curriculum = json.load(f)
+    for belt in curriculum['belts']:
+        for lesson in belt['days']:
+            lesson['is_completed'] = lesson['day'] in completed_days
+            lesson['is_accessible'] = lesson['day'] <= current_day or lesson['day'] - 1 in completed_days
+    # jsonify sorts keys by default
+    return json.dumps(curriculum, sort_keys=True).encode('utf-8')
+
+
+def measure(fn, repeat):
+    fn()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--repeat', type=int, default=30)
+    args = parser.parse_args()
+
+    print(f"{'days':>6}  {'original':>10}  {'user_view':>10}  {'speedup':>8}  {'body':>10}")
+    for days in args.days:
+        document = synthetic_curriculum(days)
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump(document, f)
+            path = f.name
+        try:
+            snapshot = curriculum_service.CurriculumSnapshot.from_document(document)
+            completed_days = list(range(1, days // 2 + 1))
+            current_day = days // 2 + 1
+
+            before, size = measure(lambda: original_view(path, completed_days, current_day), args.repeat)
+            after, _ = measure(lambda: snapshot.user_view(completed_days, current_day), args.repeat)
+            print(f"{days:>6}  {before:>8.2f}ms  {after:>8.2f}ms  {before / after:>7.1f}x  {size / 1024:>8.0f}KB")
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
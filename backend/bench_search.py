@@ -0,0 +1,61 @@
+"""Latency benchmark of /api/search's index.
+
+Indexes a synthetic curriculum (built the same way as bench_curriculum.py)
+into a temporary database, then times a set of typical queries and an
+incremental re-sync after one lesson changes.
+
+    python bench_search.py
+    python bench_search.py --days 5000 --repeat 500
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from bench_curriculum import synthetic_curriculum
+from services import curriculum_service, search_service
+
+QUERIES = ['loop', 'print function', 'list comprehension', 'variables and data', 'dict', 'error handling', 'str']
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    document = synthetic_curriculum(args.days)
+    snapshot = curriculum_service.CurriculumSnapshot.from_document(document)
+    with tempfile.TemporaryDirectory() as directory:
+        index = search_service.SearchIndex(os.path.join(directory, 'search.db'))
+
+        started = time.perf_counter()
+        index.sync(snapshot)
+        print(f"Indexed {args.days} lessons in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+        timings = []
+        for _ in range(args.repeat):
+            for query in QUERIES:
+                started = time.perf_counter()
+                index.search(query)
+                timings.append((time.perf_counter() - started) * 1000)
+        print(f"{len(timings)} queries: p50 {statistics.median(timings):.2f}ms, "
+              f"p99 {percentile(timings, 0.99):.2f}ms, max {max(timings):.2f}ms")
+
+        document['belts'][0]['days'][0]['title'] = 'Changed title'
+        changed = curriculum_service.CurriculumSnapshot.from_document(document)
+        started = time.perf_counter()
+        updated, removed = index.sync(changed)
+        print(f"Re-synced after one edit in {(time.perf_counter() - started) * 1000:.0f}ms "
+              f"({updated} lesson rewritten, {removed} removed)")
+
+
+if __name__ == '__main__':
+    main()
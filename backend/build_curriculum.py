@@ -0,0 +1,29 @@
+"""Compile curriculum.json and lessons.py into curriculum.snapshot.
+
+Run it as part of the build so API processes can map the snapshot at
+startup instead of compiling it themselves. The app also rebuilds the
+snapshot whenever it finds it older than its sources.
+
+    python build_curriculum.py
+"""
+
+import sys
+import time
+
+from services import curriculum_service, curriculum_store
+
+
+def main():
+    started = time.monotonic()
+    warnings = curriculum_service.build_snapshot()
+    snapshot = curriculum_service.CurriculumSnapshot(curriculum_service.map_snapshot(curriculum_store.SNAPSHOT_PATH))
+    for warning in warnings:
+        print(f"warning: {warning}")
+    print(f"Wrote {curriculum_store.SNAPSHOT_PATH}: {len(snapshot.ordinals)} lessons in "
+          f"{len(snapshot.belts)} belts, version {snapshot.digest[:12]} "
+          f"({(time.monotonic() - started) * 1000:.0f}ms)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
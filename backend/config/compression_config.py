@@ -0,0 +1,25 @@
+"""Response compression configuration for HackDojo"""
+
+import os
+
+COMPRESSION = {
+    'ENABLED': os.environ.get('COMPRESSION_ENABLED', 'true').lower() == 'true',
+    # Dynamic responses smaller than this many bytes are sent uncompressed
+    'MIN_SIZE': int(os.environ.get('COMPRESSION_MIN_SIZE', 1024)),
+    # Levels for responses compressed on every request; cheap, so they do not cost more CPU than they save
+    'GZIP_LEVEL': int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6)),
+    'BROTLI_QUALITY': int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 4)),
+    # Levels for static payloads, which are compressed once per ETag and then served from memory
+    'STATIC_GZIP_LEVEL': int(os.environ.get('COMPRESSION_STATIC_GZIP_LEVEL', 9)),
+    'STATIC_BROTLI_QUALITY': int(os.environ.get('COMPRESSION_STATIC_BROTLI_QUALITY', 11)),
+    # Compressed bytes of static payloads kept per API process
+    'CACHE_MAX_BYTES': int(os.environ.get('COMPRESSION_CACHE_MAX_BYTES', 32 * 1024 * 1024)),
+    'MIMETYPES': [
+        'application/json',
+        'application/javascript',
+        'text/html',
+        'text/css',
+        'text/plain',
+        'image/svg+xml',
+    ],
+}
@@ -0,0 +1,86 @@
+"""Code execution configuration for HackDojo"""
+
+import os
+
+# Warm worker pool for /api/run_code
+EXECUTION_POOL = {
+    # Number of pre-started interpreter workers per API process
+    # (0 starts a throwaway worker for every run instead)
+    'SIZE': int(os.environ.get('EXECUTION_POOL_SIZE', 4)),
+    # Restart a worker after it has served this many jobs
+    'RECYCLE_AFTER': int(os.environ.get('EXECUTION_POOL_RECYCLE_AFTER', 200)),
+    # Seconds a request may wait for a free worker before giving up
+    'ACQUIRE_TIMEOUT': float(os.environ.get('EXECUTION_POOL_ACQUIRE_TIMEOUT', 30)),
+    # Modules imported once by each worker so student code finds them warm
+    'PRELOAD_MODULES': [
+        'random',
+        'math',
+        'string',
+        'time',
+        'datetime',
+        'json',
+        're',
+        'collections',
+    ],
+}
+
+# Content-addressed cache of execution results
+RESULT_CACHE = {
+    'ENABLED': os.environ.get('RESULT_CACHE_ENABLED', 'true').lower() == 'true',
+    'MAX_ENTRIES': int(os.environ.get('RESULT_CACHE_MAX_ENTRIES', 2048)),
+    # Seconds before a cached result expires
+    'TTL': int(os.environ.get('RESULT_CACHE_TTL', 3600)),
+    # Optional SQLite file shared by all API processes (empty keeps the cache in memory only)
+    'SQLITE_PATH': os.environ.get('RESULT_CACHE_DB', ''),
+}
+
+# Fair per-user queue behind /api/run_code and /api/run_code/jobs. Jobs are
+# held in the API process's memory, so a job's status and events URLs only
+# work on the process that accepted it; the Procfile and Dockerfile run a
+# single gunicorn worker for that reason.
+JOB_QUEUE = {
+    # Threads running queued submissions per API process
+    'WORKERS': int(os.environ.get('JOB_QUEUE_WORKERS', EXECUTION_POOL['SIZE'] or 4)),
+    # Submissions allowed to wait; beyond this the API answers 429
+    'MAX_PENDING': int(os.environ.get('JOB_QUEUE_MAX_PENDING', 64)),
+    # Seconds a finished job's result stays available
+    'RESULT_TTL': int(os.environ.get('JOB_QUEUE_RESULT_TTL', 300)),
+    # Longest an /events stream stays open
+    'STREAM_TIMEOUT': int(os.environ.get('JOB_QUEUE_STREAM_TIMEOUT', 60)),
+    # Runs one user may have executing at once, per API process
+    'MAX_RUNNING_PER_USER': int(os.environ.get('JOB_QUEUE_MAX_RUNNING_PER_USER', 1)),
+    # Submissions one user may have waiting per API process; beyond this the API answers 429
+    'MAX_PENDING_PER_USER': int(os.environ.get('JOB_QUEUE_MAX_PENDING_PER_USER', 3)),
+    # Seconds /api/run_code waits before answering 202 with the queue position
+    'SYNC_WAIT': float(os.environ.get('JOB_QUEUE_SYNC_WAIT', 25)),
+}
+
+# Default resource limits for every execution. A lesson can override any of
+# them with an "exercise.limits" object in curriculum.json.
+EXECUTION_LIMITS = {
+    # RLIMIT_CPU, in seconds
+    'cpu_seconds': int(os.environ.get('EXECUTION_CPU_SECONDS', 5)),
+    # RLIMIT_AS, in megabytes
+    'memory_mb': int(os.environ.get('EXECUTION_MEMORY_MB', 256)),
+    # Wall-clock deadline, in seconds; covers programs blocked on sleep or I/O
+    'wall_seconds': float(os.environ.get('EXECUTION_WALL_SECONDS', 10)),
+    # RLIMIT_NPROC. It counts every process of the user student code runs as,
+    # so 0 stops student code from starting processes or threads. Root
+    # ignores it, another reason student code runs as EXECUTION_RUN_AS.
+    'max_processes': int(os.environ.get('EXECUTION_MAX_PROCESSES', 0)),
+    # Combined stdout and stderr bytes kept before the program is stopped
+    'max_output_bytes': int(os.environ.get('EXECUTION_MAX_OUTPUT_BYTES', 64 * 1024)),
+}
+
+# Sandbox user and group student code is switched to (nobody/nogroup by
+# default). It must own nothing the server uses, and switching needs a root
+# server; otherwise runs are refused.
+EXECUTION_RUN_AS = {
+    'UID': int(os.environ.get('EXECUTION_RUN_AS_UID', 65534)),
+    'GID': int(os.environ.get('EXECUTION_RUN_AS_GID', 65534)),
+    # Local development only: a server that is not root runs student code as itself
+    'ALLOW_SERVER_USER': os.environ.get('EXECUTION_ALLOW_SERVER_USER', 'false').lower() == 'true',
+}
+
+# Submissions larger than this are rejected before they are compiled
+MAX_CODE_BYTES = int(os.environ.get('EXECUTION_MAX_CODE_BYTES', 64 * 1024))
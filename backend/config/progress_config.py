@@ -0,0 +1,20 @@
+"""Progress write configuration for HackDojo"""
+
+import os
+
+# Write-behind buffer for lesson attempts and completions. The buffer lives in
+# each API process, so reads only include writes buffered by the same
+# process; with several workers a completion can be missing from another
+# worker's responses for up to FLUSH_INTERVAL_MS. Enable it on single-worker
+# deployments (the Procfile and Dockerfile run one) or where that lag is fine.
+PROGRESS_BUFFER = {
+    # Off by default: every attempt is committed as it happens
+    'ENABLED': os.environ.get('PROGRESS_BUFFER_ENABLED', 'false').lower() == 'true',
+    # Longest a buffered write waits before it is committed; at most this much is lost in a crash
+    'FLUSH_INTERVAL_MS': int(os.environ.get('PROGRESS_BUFFER_FLUSH_INTERVAL_MS', 250)),
+    # Flush early once this many events are waiting
+    'MAX_EVENTS': int(os.environ.get('PROGRESS_BUFFER_MAX_EVENTS', 200)),
+    # Failed flushes in a row before each user's writes are committed on their
+    # own, and those that still fail are logged and dropped
+    'MAX_FLUSH_FAILURES': int(os.environ.get('PROGRESS_BUFFER_MAX_FLUSH_FAILURES', 3)),
+}
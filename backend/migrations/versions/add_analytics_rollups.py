@@ -0,0 +1,53 @@
+"""add analytics rollup tables
+
+Revision ID: add_analytics_rollups
+Revises: add_progress_versions
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_analytics_rollups'
+down_revision = 'add_progress_versions'
+branch_labels = None
+depends_on = None
+
+# The tables start empty; python backfill_analytics.py fills them from the existing data
+
+def upgrade():
+    op.create_table('analytics_daily',
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('active_users', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('completions', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('date')
+    )
+    op.create_table('analytics_daily_users',
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('date', 'user_id')
+    )
+    op.create_table('analytics_lessons',
+        sa.Column('day', sa.Integer(), nullable=False),
+        sa.Column('completions', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('day')
+    )
+    op.create_table('analytics_belts',
+        sa.Column('belt', sa.String(length=100), nullable=False),
+        sa.Column('students', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('belt')
+    )
+    op.create_table('analytics_roles',
+        sa.Column('role', sa.String(length=20), nullable=False),
+        sa.Column('users', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('role')
+    )
+
+def downgrade():
+    op.drop_table('analytics_roles')
+    op.drop_table('analytics_belts')
+    op.drop_table('analytics_lessons')
+    op.drop_table('analytics_daily_users')
+    op.drop_table('analytics_daily')
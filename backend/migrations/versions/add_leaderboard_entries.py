@@ -0,0 +1,70 @@
+"""add leaderboard entries, backfilled from lesson_completion
+
+Revision ID: add_leaderboard_entries
+Revises: add_analytics_rollups
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from datetime import datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_leaderboard_entries'
+down_revision = 'add_analytics_rollups'
+branch_labels = None
+depends_on = None
+
+def streaks(dates):
+    """(current, longest) runs of consecutive dates in a sorted list; current ends at the last date."""
+    current = longest = 0
+    previous = None
+    for date in dates:
+        current = current + 1 if previous is not None and date == previous + timedelta(days=1) else 1
+        longest = max(longest, current)
+        previous = date
+    return current, longest
+
+def upgrade():
+    leaderboard_entries = op.create_table('leaderboard_entries',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('score', sa.Integer(), nullable=False),
+        sa.Column('reached_at', sa.DateTime(), nullable=False),
+        sa.Column('current_streak', sa.Integer(), nullable=False),
+        sa.Column('longest_streak', sa.Integer(), nullable=False),
+        sa.Column('last_active_date', sa.Date(), nullable=True),
+        sa.Column('seq', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index('ix_leaderboard_entries_seq', 'leaderboard_entries', ['seq'], unique=False)
+
+    bind = op.get_bind()
+    by_user = {}
+    for user_id, day, completed_at in bind.execute(sa.text(
+            'SELECT user_id, date(completed_at), MAX(completed_at) FROM lesson_completion '
+            'WHERE completed_at IS NOT NULL GROUP BY user_id, date(completed_at)')):
+        by_user.setdefault(user_id, []).append((datetime.strptime(day, '%Y-%m-%d').date(), completed_at))
+    # Completions with no known time count towards the score but not the streaks
+    counts = {user_id: (count, updated_at) for user_id, count, updated_at in bind.execute(sa.text(
+        'SELECT user_id, COUNT(*), MAX(updated_at) FROM lesson_completion WHERE completed GROUP BY user_id'))}
+
+    rows = []
+    for seq, (user_id, (count, updated_at)) in enumerate(sorted(counts.items()), start=1):
+        days = sorted(by_user.get(user_id, []))
+        current, longest = streaks([day for day, _ in days])
+        reached_at = days[-1][1] if days else updated_at
+        if isinstance(reached_at, str):
+            reached_at = datetime.fromisoformat(reached_at)
+        rows.append({
+            'user_id': user_id, 'score': count, 'reached_at': reached_at or datetime.utcnow(),
+            'current_streak': current, 'longest_streak': longest,
+            'last_active_date': days[-1][0] if days else None, 'seq': seq
+        })
+    if rows:
+        op.bulk_insert(leaderboard_entries, rows)
+
+def downgrade():
+    op.drop_index('ix_leaderboard_entries_seq', table_name='leaderboard_entries')
+    op.drop_table('leaderboard_entries')
@@ -0,0 +1,97 @@
+"""add lesson completion table, backfilled from user_progress.completed_days
+
+Revision ID: add_lesson_completion_table
+Revises: add_lesson_records_table
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+import json
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_lesson_completion_table'
+down_revision = 'add_lesson_records_table'
+branch_labels = None
+depends_on = None
+
+def completed_days(value):
+    """Whole days from a completed_days blob, which holds ints and numeric strings."""
+    try:
+        days = json.loads(value) if value else []
+    except (TypeError, ValueError):
+        return set()
+    result = set()
+    for day in days if isinstance(days, list) else []:
+        try:
+            result.add(int(float(day)))
+        except (TypeError, ValueError):
+            continue
+    return result
+
+def parse_time(value):
+    """A timestamp column read through raw SQL, which SQLite returns as text."""
+    if value is None or isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+def upgrade():
+    lesson_completion = op.create_table('lesson_completion',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Integer(), nullable=False),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.Column('completed', sa.Boolean(), nullable=False, server_default='0'),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('best_time', sa.Float(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'day')
+    )
+    op.create_index('ix_lesson_completion_day_completed_at', 'lesson_completion', ['day', 'completed_at'], unique=False)
+    op.create_index('ix_lesson_completion_completed_at', 'lesson_completion', ['completed_at'], unique=False)
+
+    bind = op.get_bind()
+    if 'user_progress' not in sa.inspect(bind).get_table_names():
+        return
+
+    # The blob never recorded when a day was completed. A day takes the time of
+    # its passing submission, the user's latest day the time their progress
+    # row was last updated, and any other day stays undated (completed_at NULL)
+    # so the activity rollups and streaks skip it rather than count every old
+    # completion on the day of the migration.
+    passed_at = {}
+    if 'submissions' in sa.inspect(bind).get_table_names():
+        for user_id, day, submitted_at in bind.execute(sa.text(
+                'SELECT user_id, day, submitted_at FROM submissions WHERE passed AND submitted_at IS NOT NULL')):
+            passed_at[(user_id, day)] = parse_time(submitted_at)
+
+    now = datetime.utcnow()
+    by_user = {}
+    updated_at = {}
+    for user_id, value, progress_updated_at in bind.execute(sa.text(
+            'SELECT user_id, completed_days, updated_at FROM user_progress')):
+        by_user.setdefault(user_id, set()).update(completed_days(value))
+        progress_updated_at = parse_time(progress_updated_at)
+        if progress_updated_at is not None:
+            updated_at[user_id] = max(progress_updated_at, updated_at.get(user_id, progress_updated_at))
+
+    rows = []
+    for user_id, days in by_user.items():
+        for day in sorted(days):
+            completed_at = passed_at.get((user_id, day))
+            if completed_at is None and day == max(days):
+                completed_at = updated_at.get(user_id)
+            rows.append({'user_id': user_id, 'day': day, 'completed_at': completed_at, 'completed': True,
+                         'attempts': 1, 'best_time': None, 'updated_at': now})
+    if rows:
+        op.bulk_insert(lesson_completion, rows)
+
+def downgrade():
+    op.drop_index('ix_lesson_completion_completed_at', table_name='lesson_completion')
+    op.drop_index('ix_lesson_completion_day_completed_at', table_name='lesson_completion')
+    op.drop_table('lesson_completion')
@@ -0,0 +1,43 @@
+"""add lesson records and curriculum revision tables
+
+Revision ID: add_lesson_records_table
+Revises: add_submissions_table
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_lesson_records_table'
+down_revision = 'add_submissions_table'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('lesson_records',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('data', sa.Text(), nullable=False),
+        sa.Column('revision', sa.Integer(), nullable=False),
+        sa.Column('created_by', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('day', 'version', name='uq_lesson_records_day_version')
+    )
+    op.create_index(op.f('ix_lesson_records_revision'), 'lesson_records', ['revision'], unique=False)
+
+    curriculum_revision = op.create_table('curriculum_revision',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('revision', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.bulk_insert(curriculum_revision, [{'id': 1, 'revision': 0}])
+
+def downgrade():
+    op.drop_table('curriculum_revision')
+    op.drop_index(op.f('ix_lesson_records_revision'), table_name='lesson_records')
+    op.drop_table('lesson_records')
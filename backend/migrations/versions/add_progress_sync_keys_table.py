@@ -0,0 +1,30 @@
+"""add progress sync keys table
+
+Revision ID: add_progress_sync_keys_table
+Revises: add_lesson_completion_table
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_progress_sync_keys_table'
+down_revision = 'add_lesson_completion_table'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('progress_sync_keys',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('key', sa.String(length=64), nullable=False),
+        sa.Column('day', sa.Integer(), nullable=False),
+        sa.Column('applied_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'key')
+    )
+    op.create_index(op.f('ix_progress_sync_keys_applied_at'), 'progress_sync_keys', ['applied_at'], unique=False)
+
+def downgrade():
+    op.drop_index(op.f('ix_progress_sync_keys_applied_at'), table_name='progress_sync_keys')
+    op.drop_table('progress_sync_keys')
@@ -0,0 +1,33 @@
+"""add progress change versions
+
+Revision ID: add_progress_versions
+Revises: add_progress_sync_keys_table
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_progress_versions'
+down_revision = 'add_progress_sync_keys_table'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('progress_versions',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    # Existing completions predate versioning; a client without a version gets them in full
+    with op.batch_alter_table('lesson_completion') as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='0'))
+    op.create_index('ix_lesson_completion_user_version', 'lesson_completion', ['user_id', 'version'], unique=False)
+
+def downgrade():
+    op.drop_index('ix_lesson_completion_user_version', table_name='lesson_completion')
+    with op.batch_alter_table('lesson_completion') as batch_op:
+        batch_op.drop_column('version')
+    op.drop_table('progress_versions')
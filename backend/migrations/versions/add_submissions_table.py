@@ -0,0 +1,37 @@
+"""add submissions table
+
+Revision ID: add_submissions_table
+Revises: add_ftc_progress_table
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_submissions_table'
+down_revision = 'add_ftc_progress_table'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('submissions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Integer(), nullable=False),
+        sa.Column('code', sa.Text(), nullable=False),
+        sa.Column('user_input', sa.Text(), nullable=True),
+        sa.Column('mode', sa.String(length=20), nullable=True),
+        sa.Column('passed', sa.Boolean(), nullable=True),
+        sa.Column('lesson_version', sa.String(length=16), nullable=True),
+        sa.Column('submitted_at', sa.DateTime(), nullable=True),
+        sa.Column('graded_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'day', name='uq_submissions_user_day')
+    )
+    op.create_index(op.f('ix_submissions_day'), 'submissions', ['day'], unique=False)
+
+def downgrade():
+    op.drop_index(op.f('ix_submissions_day'), table_name='submissions')
+    op.drop_table('submissions')
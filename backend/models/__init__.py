@@ -9,3 +9,10 @@ from .badge import Badge
 from .notification import Notification
 from .belt import Belt
 from .ftc_progress import FTCProgress
+from .submission import Submission
+from .lesson_record import LessonRecord, CurriculumRevision
+from .lesson_completion import LessonCompletion
+from .progress_sync_key import ProgressSyncKey
+from .progress_version import ProgressVersion
+from .analytics_rollup import DailyRollup, DailyActiveUser, LessonRollup, BeltRollup, RoleRollup
+from .leaderboard_entry import LeaderboardEntry
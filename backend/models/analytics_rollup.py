@@ -0,0 +1,52 @@
+from . import db
+
+class DailyRollup(db.Model):
+    """Active users and lesson completions for one UTC date."""
+    __tablename__ = 'analytics_daily'
+
+    date = db.Column(db.Date, primary_key=True)
+    active_users = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    completions = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    def __repr__(self):
+        return f'<DailyRollup {self.date}>'
+
+class DailyActiveUser(db.Model):
+    """Users seen on each date, so a user counts once towards DailyRollup.active_users."""
+    __tablename__ = 'analytics_daily_users'
+
+    date = db.Column(db.Date, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+
+    def __repr__(self):
+        return f'<DailyActiveUser {self.date}:{self.user_id}>'
+
+class LessonRollup(db.Model):
+    """Number of users who have completed each lesson."""
+    __tablename__ = 'analytics_lessons'
+
+    day = db.Column(db.Integer, primary_key=True)
+    completions = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    def __repr__(self):
+        return f'<LessonRollup {self.day}>'
+
+class BeltRollup(db.Model):
+    """Number of students whose current day falls in each curriculum belt."""
+    __tablename__ = 'analytics_belts'
+
+    belt = db.Column(db.String(100), primary_key=True)
+    students = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    def __repr__(self):
+        return f'<BeltRollup {self.belt}>'
+
+class RoleRollup(db.Model):
+    """Number of users with each role."""
+    __tablename__ = 'analytics_roles'
+
+    role = db.Column(db.String(20), primary_key=True)
+    users = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    def __repr__(self):
+        return f'<RoleRollup {self.role}>'
@@ -0,0 +1,26 @@
+from . import db
+from datetime import datetime
+
+class LeaderboardEntry(db.Model):
+    """A user's leaderboard score (lessons completed) and completion streaks.
+
+    seq is a table-wide counter set on every change, so each process's
+    in-memory leaderboard fetches only the rows changed since it last looked.
+    """
+    __tablename__ = 'leaderboard_entries'
+    __table_args__ = (
+        db.Index('ix_leaderboard_entries_seq', 'seq'),
+    )
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    score = db.Column(db.Integer, nullable=False, default=0)
+    # When the user reached their score; earlier ranks first among equal scores
+    reached_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Consecutive UTC dates with a completion, ending at last_active_date
+    current_streak = db.Column(db.Integer, nullable=False, default=0)
+    longest_streak = db.Column(db.Integer, nullable=False, default=0)
+    last_active_date = db.Column(db.Date, nullable=True)
+    seq = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<LeaderboardEntry {self.user_id}:{self.score}>'
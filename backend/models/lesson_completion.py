@@ -0,0 +1,30 @@
+from . import db
+from datetime import datetime
+
+class LessonCompletion(db.Model):
+    """A user's record for one lesson: graded attempts, when it was completed and the fastest passing run.
+
+    completed says whether the lesson is passed and completed_at when. Rows
+    backfilled from the old completed_days blob may be completed with no
+    known time; date-based rollups and streaks skip them.
+    """
+    __tablename__ = 'lesson_completion'
+    __table_args__ = (
+        db.Index('ix_lesson_completion_day_completed_at', 'day', 'completed_at'),
+        db.Index('ix_lesson_completion_completed_at', 'completed_at'),
+        db.Index('ix_lesson_completion_user_version', 'user_id', 'version'),
+    )
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    day = db.Column(db.Integer, primary_key=True)
+    completed_at = db.Column(db.DateTime, nullable=True)
+    completed = db.Column(db.Boolean, nullable=False, default=False, server_default='0')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    # Fastest passing run, in milliseconds
+    best_time = db.Column(db.Float, nullable=True)
+    # The user's change version when completed_at last changed
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<LessonCompletion {self.user_id}:{self.day}>'
@@ -0,0 +1,39 @@
+from . import db
+from datetime import datetime
+
+class LessonRecord(db.Model):
+    """One version of a lesson written through the admin API.
+
+    Records are never updated; each edit adds the next version of its day,
+    and the highest version is the one served. They are applied on top of
+    curriculum.json when the curriculum snapshot is compiled.
+    """
+    __tablename__ = 'lesson_records'
+    __table_args__ = (db.UniqueConstraint('day', 'version', name='uq_lesson_records_day_version'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Integer, nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+    # The lesson as curriculum.json stores it, encoded as JSON
+    data = db.Column(db.Text, nullable=False)
+    # Value of the curriculum revision counter this record was written at
+    revision = db.Column(db.Integer, nullable=False, index=True)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<LessonRecord {self.day}v{self.version}>'
+
+class CurriculumRevision(db.Model):
+    """Single-row counter bumped by every curriculum write.
+
+    API processes poll it to learn that their curriculum snapshot is stale.
+    """
+    __tablename__ = 'curriculum_revision'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    revision = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<CurriculumRevision {self.revision}>'
@@ -0,0 +1,18 @@
+from . import db
+from datetime import datetime
+
+class ProgressSyncKey(db.Model):
+    """Idempotency key of a completion event applied by /api/progress/sync.
+
+    A client retrying a sync sends the same keys again; events whose key is
+    already here are skipped.
+    """
+    __tablename__ = 'progress_sync_keys'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    key = db.Column(db.String(64), primary_key=True)
+    day = db.Column(db.Integer, nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f'<ProgressSyncKey {self.user_id}:{self.key}>'
@@ -0,0 +1,14 @@
+from . import db
+
+class ProgressVersion(db.Model):
+    """Per-user change counter, bumped by every change to the user's visible progress.
+
+    Clients pass the version they last saw to fetch only what changed since.
+    """
+    __tablename__ = 'progress_versions'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<ProgressVersion {self.user_id}:{self.version}>'
@@ -0,0 +1,27 @@
+from . import db
+from datetime import datetime
+
+class Submission(db.Model):
+    """The submission that counts for a user's day.
+
+    A passing submission is only replaced by a later passing one, so
+    re-grading re-checks the code that earned the day.
+    """
+    __tablename__ = 'submissions'
+    __table_args__ = (db.UniqueConstraint('user_id', 'day', name='uq_submissions_user_day'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    day = db.Column(db.Integer, nullable=False, index=True)
+    code = db.Column(db.Text, nullable=False)
+    user_input = db.Column(db.Text, default='')
+    mode = db.Column(db.String(20), default='single')
+    passed = db.Column(db.Boolean, default=False)
+    lesson_version = db.Column(db.String(16))
+    submitted_at = db.Column(db.DateTime, default=datetime.utcnow)
+    graded_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    user = db.relationship('User', backref=db.backref('submissions', lazy=True))
+    
+    def __repr__(self):
+        return f'<Submission {self.user_id}:{self.day}>'
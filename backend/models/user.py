@@ -11,7 +11,5 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    ftc_progress = db.relationship('FTCProgress', backref='user', lazy=True)
-    
     def __repr__(self):
         return f'<User {self.email}>'
@@ -0,0 +1,228 @@
+"""Re-grade stored submissions against the current curriculum.
+
+By default every submission graded against an older version of its
+lesson's test cases is re-run. Progress is checkpointed so an interrupted
+run resumes where it stopped, and the differences are written to a report.
+
+    python regrade.py                    # submissions for lessons that changed
+    python regrade.py --day 3 --day 7    # every submission for days 3 and 7
+    python regrade.py --apply            # also update submissions and completed days
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from flask import Flask
+
+from config.execution_config import EXECUTION_POOL
+from models import db, Progress, Submission
+from services import curriculum_service, execution_service, progress_service
+from services.result_cache import lesson_version
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///hackdojo.db'
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+db.init_app(app)
+
+
+def grade(submission, lesson):
+    """Grade a stored submission the way /api/run_code would; True if it passes."""
+    if submission['mode'] == 'batch':
+        test_cases = lesson['exercise']['test_cases']
+        results = execution_service.execute_batch(
+            submission['code'],
+            [f"{test_case.get('input', '')}\n" for test_case in test_cases],
+            lesson
+        )
+        return bool(results) and all(not result['stderr'] and result['matched'] for result in results)
+
+    result = execution_service.execute(submission['code'], f"{submission['user_input'] or ''}\n", lesson)
+    return not result['stderr'] and bool(result['matched'])
+
+
+def select_submissions(lessons, versions, days):
+    query = Submission.query
+    if days:
+        query = query.filter(Submission.day.in_(days))
+
+    selected = []
+    for submission in query.order_by(Submission.id).all():
+        if submission.day not in lessons:
+            print(f"Skipping submission {submission.id}: day {submission.day} has no lesson")
+            continue
+        if not days and submission.lesson_version == versions[submission.day]:
+            continue
+        selected.append({
+            'id': submission.id,
+            'user_id': submission.user_id,
+            'day': submission.day,
+            'code': submission.code,
+            'user_input': submission.user_input,
+            'mode': submission.mode,
+            'passed': bool(submission.passed)
+        })
+    return selected
+
+
+def load_checkpoint(path, versions):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        checkpoint = json.load(f)
+    # Results graded against a lesson that has changed since are stale
+    return {
+        int(submission_id): result
+        for submission_id, result in checkpoint.get('results', {}).items()
+        if versions.get(result['day']) == result['lesson_version']
+    }
+
+
+def save_checkpoint(path, results):
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({'results': {str(k): v for k, v in results.items()}}, f)
+    os.replace(temp_path, path)
+
+
+def regrade(submissions, lessons, versions, results, workers, checkpoint_path, checkpoint_every):
+    """Grade submissions on the worker pool, adding to results as they finish."""
+    todo = [submission for submission in submissions if submission['id'] not in results]
+    total = len(submissions)
+    print(f"{total - len(todo)} of {total} submissions already graded; {len(todo)} to go")
+    if not todo:
+        return 0
+
+    started = time.monotonic()
+    done = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(grade, submission, lessons[submission['day']]): submission
+            for submission in todo
+        }
+        for future in as_completed(futures):
+            submission = futures[future]
+            try:
+                passed, error = future.result(), None
+            except Exception as e:
+                passed, error = None, str(e)
+            results[submission['id']] = {
+                'day': submission['day'],
+                'lesson_version': versions[submission['day']],
+                'passed': passed,
+                'error': error
+            }
+            done += 1
+            if done % checkpoint_every == 0 or done == len(todo):
+                save_checkpoint(checkpoint_path, results)
+                elapsed = time.monotonic() - started
+                print(f"Graded {total - len(todo) + done}/{total} "
+                      f"({done / elapsed:.1f} submissions/s, {elapsed:.1f}s elapsed)")
+    return done
+
+
+def build_report(submissions, results):
+    report = {'generated_at': datetime.utcnow().isoformat(), 'newly_failing': [], 'newly_passing': [], 'errors': []}
+    for submission in submissions:
+        result = results.get(submission['id'])
+        if result is None:
+            continue
+        entry = {'submission_id': submission['id'], 'user_id': submission['user_id'], 'day': submission['day']}
+        if result['error']:
+            report['errors'].append(dict(entry, error=result['error']))
+        elif submission['passed'] and not result['passed']:
+            report['newly_failing'].append(entry)
+        elif not submission['passed'] and result['passed']:
+            report['newly_passing'].append(entry)
+    report['summary'] = {
+        'regraded': len(submissions),
+        'newly_failing': len(report['newly_failing']),
+        'newly_passing': len(report['newly_passing']),
+        'errors': len(report['errors'])
+    }
+    return report
+
+
+def apply_results(submissions, results, report):
+    """Store the new grades and update each user's completed days, in one transaction."""
+    now = datetime.utcnow()
+    by_id = {submission['id']: submission for submission in submissions}
+    try:
+        for submission in Submission.query.filter(Submission.id.in_(list(by_id))).all():
+            result = results[submission.id]
+            if result['error']:
+                continue
+            submission.passed = result['passed']
+            submission.lesson_version = result['lesson_version']
+            submission.graded_at = now
+
+        changes = {}
+        for entry in report['newly_failing']:
+            changes.setdefault(entry['user_id'], {})[entry['day']] = False
+        for entry in report['newly_passing']:
+            changes.setdefault(entry['user_id'], {})[entry['day']] = True
+        for user_id, days in changes.items():
+            for day, passed in days.items():
+                progress_service.set_completed(user_id, day, passed)
+            progress = Progress.query.filter_by(user_id=user_id).first()
+            if progress:
+                progress_service.mirror_completed_days(progress)
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--day', type=int, action='append', dest='days',
+                        help='re-grade every submission for this day (repeatable)')
+    parser.add_argument('--workers', type=int, default=EXECUTION_POOL['SIZE'] or 4,
+                        help='execution workers to run submissions on')
+    parser.add_argument('--checkpoint', default=os.path.join(BASE_DIR, 'regrade_checkpoint.json'))
+    parser.add_argument('--checkpoint-every', type=int, default=25,
+                        help='save progress after this many submissions')
+    parser.add_argument('--report', default=os.path.join(BASE_DIR, 'regrade_report.json'))
+    parser.add_argument('--apply', action='store_true',
+                        help='write new grades and completed days back to the database')
+    args = parser.parse_args()
+
+    # Each worker is a separate interpreter process; one thread drives each
+    EXECUTION_POOL['SIZE'] = max(1, args.workers)
+
+    lessons = curriculum_service.get_index().lessons()
+    versions = {day: lesson_version(lesson) for day, lesson in lessons.items()}
+
+    with app.app_context():
+        submissions = select_submissions(lessons, versions, args.days)
+        results = load_checkpoint(args.checkpoint, versions)
+
+        started = time.monotonic()
+        graded = regrade(submissions, lessons, versions, results,
+                         EXECUTION_POOL['SIZE'], args.checkpoint, max(1, args.checkpoint_every))
+        elapsed = time.monotonic() - started
+        if graded:
+            print(f"Re-graded {graded} submissions in {elapsed:.1f}s ({graded / elapsed:.1f}/s)")
+
+        report = build_report(submissions, results)
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        summary = report['summary']
+        print(f"{summary['newly_failing']} newly failing, {summary['newly_passing']} newly passing, "
+              f"{summary['errors']} errors; report written to {args.report}")
+
+        if args.apply:
+            apply_results(submissions, results, report)
+            print("Applied new grades to the database")
+            if os.path.exists(args.checkpoint):
+                os.remove(args.checkpoint)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+"""Rollups behind the admin analytics dashboard.
+
+Completions, attempts, current day moves and registrations adjust a few
+counter rows (the analytics_* tables) in the same transaction as the change
+they count, so the dashboard reads precomputed rows instead of counting
+users and completions on every request. backfill() rebuilds the rollups
+from the source tables; run backfill_analytics.py after the migration and
+whenever they are suspected to have drifted.
+
+Functions take an optional sqlite3 connection for callers that write with
+raw SQL, such as registration; otherwise they use the app's session.
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from models import db, BeltRollup, DailyRollup, LessonRollup, RoleRollup, User
+from services import curriculum_service
+
+# Days of daily rollups the dashboard shows
+ACTIVITY_WINDOW_DAYS = 30
+
+
+def _execute(sql, params=None, conn=None):
+    """Run sql on conn, or on the session when conn is None; returns the affected row count."""
+    if conn is None:
+        return db.session.execute(text(sql), params or {}).rowcount
+    return conn.execute(sql, params or {}).rowcount
+
+
+def _add(table, key_column, key, column, by, conn=None):
+    """Add by to one counter, creating its row at zero first."""
+    _execute(
+        f'INSERT INTO {table} ({key_column}, {column}) VALUES (:key, :by) '
+        f'ON CONFLICT ({key_column}) DO UPDATE SET {column} = {column} + :by',
+        {'key': key, 'by': by}, conn
+    )
+
+
+def _date(at):
+    return (at or datetime.utcnow()).date().isoformat()
+
+
+def belt_for_day(day, snapshot=None):
+    """Name of the curriculum belt a current day falls in: the last one starting on or before it."""
+    snapshot = snapshot or curriculum_service.get_index().snapshot()
+    if not snapshot.belts or day is None:
+        return None
+    name = snapshot.belts[0]['name']
+    for belt in snapshot.belts:
+        if belt.get('startDay') is not None and belt['startDay'] <= day:
+            name = belt['name']
+    return name
+
+
+def record_activity(user_id, at=None, conn=None):
+    """Count user_id as active on the date of at, once per date."""
+    date = _date(at)
+    added = _execute('INSERT OR IGNORE INTO analytics_daily_users (date, user_id) VALUES (:date, :user_id)',
+                     {'date': date, 'user_id': int(user_id)}, conn)
+    if added:
+        _add('analytics_daily', 'date', date, 'active_users', 1, conn)
+
+
+def completion_changed(user_id, day, old_at, new_at, was_completed, completed):
+    """Move a lesson completion between dates and in or out of the lesson's count.
+
+    old_at and new_at are the completion's previous and new times; a
+    completion with no known time (None while completed) only counts
+    towards its lesson, not towards any date.
+    """
+    if old_at is None or new_at is None or _date(old_at) != _date(new_at):
+        if old_at is not None:
+            _add('analytics_daily', 'date', _date(old_at), 'completions', -1)
+        if new_at is not None:
+            _add('analytics_daily', 'date', _date(new_at), 'completions', 1)
+            record_activity(user_id, new_at)
+    if was_completed != completed:
+        _add('analytics_lessons', 'day', int(day), 'completions', 1 if completed else -1)
+
+
+def current_day_changed(user_id, old_day, new_day):
+    """Move a student between belts when their current day crosses a belt boundary.
+
+    Only students are counted in belts, as in user_registered and backfill.
+    """
+    if db.session.query(User.role).filter_by(id=int(user_id)).scalar() != 'student':
+        return
+    snapshot = curriculum_service.get_index().snapshot()
+    old_belt, new_belt = belt_for_day(old_day, snapshot), belt_for_day(new_day, snapshot)
+    if old_belt == new_belt:
+        return
+    if old_belt is not None:
+        _add('analytics_belts', 'belt', old_belt, 'students', -1)
+    if new_belt is not None:
+        _add('analytics_belts', 'belt', new_belt, 'students', 1)
+
+
+def user_registered(role, current_day=None, conn=None):
+    """Count a new user; current_day places a new student in a belt."""
+    _add('analytics_roles', 'role', role, 'users', 1, conn)
+    belt = belt_for_day(current_day)
+    if belt is not None:
+        _add('analytics_belts', 'belt', belt, 'students', 1, conn)
+
+
+def role_changed(old_role, new_role):
+    if old_role == new_role:
+        return
+    if old_role is not None:
+        _add('analytics_roles', 'role', old_role, 'users', -1)
+    _add('analytics_roles', 'role', new_role, 'users', 1)
+
+
+def summary(now=None):
+    """The dashboard's figures, read from the rollups only."""
+    today = (now or datetime.utcnow()).date()
+    since = today - timedelta(days=ACTIVITY_WINDOW_DAYS - 1)
+    daily = DailyRollup.query.filter(DailyRollup.date >= since).order_by(DailyRollup.date).all()
+    roles = {row.role: row.users for row in RoleRollup.query.all()}
+    return {
+        'user_stats': {
+            'total_users': sum(roles.values()),
+            'students': roles.get('student', 0),
+            'parents': roles.get('parent', 0),
+            'by_role': roles
+        },
+        'activity': {
+            'last_30_days': sum(row.completions for row in daily),
+            'active_users_today': next((row.active_users for row in daily if row.date == today), 0),
+            'daily': [{
+                'date': row.date.isoformat(),
+                'active_users': row.active_users,
+                'completions': row.completions
+            } for row in daily]
+        },
+        'completion': {
+            'total_lessons': len(curriculum_service.get_index().snapshot().ordinals),
+            'belt_distribution': {row.belt: row.students for row in BeltRollup.query.all() if row.students},
+            'lessons': {row.day: row.completions for row in LessonRollup.query.order_by(LessonRollup.day)}
+        }
+    }
+
+
+def backfill():
+    """Rebuild every rollup from users, progress, completions and submissions; the caller commits.
+
+    The rebuild runs in one write transaction, so events recorded meanwhile
+    land either in the source rows it reads or on top of its result.
+    """
+    for table in ('analytics_daily', 'analytics_daily_users', 'analytics_lessons', 'analytics_belts',
+                  'analytics_roles'):
+        _execute(f'DELETE FROM {table}')
+
+    # Active means a graded submission or a completion that day
+    _execute(
+        'INSERT INTO analytics_daily_users (date, user_id) '
+        'SELECT date(completed_at), user_id FROM lesson_completion WHERE completed_at IS NOT NULL '
+        'UNION SELECT date(submitted_at), user_id FROM submissions WHERE submitted_at IS NOT NULL'
+    )
+    _execute(
+        'INSERT INTO analytics_daily (date, active_users, completions) '
+        'SELECT date, COUNT(*), 0 FROM analytics_daily_users GROUP BY date'
+    )
+    _execute(
+        'INSERT INTO analytics_daily (date, active_users, completions) '
+        'SELECT date(completed_at), 0, COUNT(*) FROM lesson_completion WHERE completed_at IS NOT NULL '
+        'GROUP BY date(completed_at) '
+        'ON CONFLICT (date) DO UPDATE SET completions = excluded.completions'
+    )
+    _execute(
+        'INSERT INTO analytics_lessons (day, completions) '
+        'SELECT day, COUNT(*) FROM lesson_completion WHERE completed GROUP BY day'
+    )
+    _execute('INSERT INTO analytics_roles (role, users) SELECT role, COUNT(*) FROM users GROUP BY role')
+
+    # One row per distinct current day, folded into belts here
+    snapshot = curriculum_service.get_index().snapshot()
+    belts = {}
+    rows = db.session.execute(text(
+        "SELECT up.current_day, COUNT(*) FROM user_progress up JOIN users u ON u.id = up.user_id "
+        "WHERE u.role = 'student' GROUP BY up.current_day"
+    ))
+    for current_day, students in rows:
+        belt = belt_for_day(current_day or 1, snapshot)
+        if belt is not None:
+            belts[belt] = belts.get(belt, 0) + students
+    for belt, students in belts.items():
+        _add('analytics_belts', 'belt', belt, 'students', students)
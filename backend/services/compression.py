@@ -0,0 +1,156 @@
+"""gzip and brotli response compression.
+
+Static payloads, such as the curriculum document and each lesson's
+content, are compressed once per ETag at the highest levels and served from
+memory afterwards. Other responses are compressed on the fly at cheap
+levels when they are large enough to be worth it.
+
+brotli is used when the brotli package is installed and the client accepts
+it; gzip otherwise.
+"""
+
+import gzip
+import logging
+import threading
+from collections import OrderedDict
+
+from flask import request
+
+from config.compression_config import COMPRESSION
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+
+def choose_encoding(accept_encodings):
+    """The encoding to answer a request with ('br' or 'gzip'), or None."""
+    gzip_quality = accept_encodings['gzip']
+    if brotli is not None:
+        brotli_quality = accept_encodings['br']
+        if brotli_quality and brotli_quality >= gzip_quality:
+            return 'br'
+    return 'gzip' if gzip_quality else None
+
+
+def compress(data, encoding, static=False):
+    if encoding == 'br':
+        quality = COMPRESSION['STATIC_BROTLI_QUALITY' if static else 'BROTLI_QUALITY']
+        return brotli.compress(data, quality=quality)
+    level = COMPRESSION['STATIC_GZIP_LEVEL' if static else 'GZIP_LEVEL']
+    # A fixed mtime keeps the output identical for identical input
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+class CompressedCache:
+    """LRU of compressed static payloads keyed by (ETag, encoding), bounded in bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        # Compressing at the static levels is slow; only one thread does it at a time
+        self._compress_lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def get(self, etag, encoding, data):
+        """data compressed with encoding, from the cache when etag has been seen before."""
+        key = (etag, encoding)
+        compressed = self._get(key)
+        if compressed is not None:
+            self.hits += 1
+            return compressed
+
+        with self._compress_lock:
+            # Another request may have compressed it while this one waited
+            compressed = self._get(key)
+            if compressed is not None:
+                self.hits += 1
+                return compressed
+            self.misses += 1
+            compressed = compress(data, encoding, static=True)
+
+        if len(compressed) > self.max_bytes:
+            return compressed
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = compressed
+                self._size += len(compressed)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+        return compressed
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._size, 'hits': self.hits, 'misses': self.misses}
+
+
+_cache = CompressedCache(COMPRESSION['CACHE_MAX_BYTES'])
+
+
+def mark_static(response):
+    """Flag a response whose body is fully determined by its ETag, so its compressed forms are cached."""
+    response.static_payload = True
+    return response
+
+
+def compress_response(response, accept_encodings):
+    """Compress response in place for a client that sent accept_encodings."""
+    if not COMPRESSION['ENABLED'] or response.mimetype not in COMPRESSION['MIMETYPES']:
+        return response
+    # The body depends on Accept-Encoding, so shared caches must key on it too
+    response.vary.add('Accept-Encoding')
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    encoding = choose_encoding(accept_encodings)
+    if encoding is None:
+        return response
+
+    data = response.get_data()
+    etag, _ = response.get_etag()
+    if etag and getattr(response, 'static_payload', False):
+        compressed = _cache.get(etag, encoding, data)
+    elif len(data) >= COMPRESSION['MIN_SIZE']:
+        compressed = compress(data, encoding)
+    else:
+        return response
+    if len(compressed) >= len(data):
+        return response
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    if etag:
+        # The encoded body is a different representation; a weak ETag still
+        # matches If-None-Match, which compares weakly
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_app(app):
+    @app.after_request
+    def compress_after_request(response):
+        try:
+            return compress_response(response, request.accept_encodings)
+        except Exception as e:
+            logger.error(f"Error compressing response: {str(e)}")
+            return response
+
+
+def get_stats():
+    return dict(_cache.stats(), brotli=brotli is not None)
@@ -0,0 +1,130 @@
+"""Versioned lesson records written through the admin API.
+
+Every write adds a record for one lesson and bumps the curriculum revision
+counter in the same transaction. Both live in the app database (the
+lesson_records and curriculum_revision tables). API processes compare the
+counter with the revision their snapshot was compiled at, so noticing
+another worker's write costs one indexed read, and only the records newer
+than that revision have to be fetched.
+
+The tables are read and written with sqlite3 directly so the curriculum
+index can poll them outside a Flask app context.
+"""
+
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+from services.curriculum_store import BACKEND_DIR
+
+EDITS_DB_PATH = os.environ.get('CURRICULUM_EDITS_DB', os.path.join(BACKEND_DIR, 'hackdojo.db'))
+
+
+class VersionConflictError(Exception):
+    """Raised when a lesson was changed since the version the writer last read."""
+
+    def __init__(self, day, expected_version, current_version):
+        super().__init__(f'Lesson {day} is at version {current_version}, not {expected_version}')
+        self.day = day
+        self.expected_version = expected_version
+        self.current_version = current_version
+
+
+def _connect_readonly(path):
+    # mode=ro never creates the database, so a fresh checkout simply has no edits
+    return sqlite3.connect(f'file:{path}?mode=ro', uri=True, timeout=5)
+
+
+def revision(path=EDITS_DB_PATH):
+    """The current curriculum revision; 0 when nothing has been written yet."""
+    try:
+        db = _connect_readonly(path)
+    except sqlite3.OperationalError:
+        return 0
+    try:
+        row = db.execute('SELECT revision FROM curriculum_revision WHERE id = 1').fetchone()
+        return row[0] if row else 0
+    except sqlite3.OperationalError:
+        # The migration adding the tables has not run
+        return 0
+    finally:
+        db.close()
+
+
+def records_since(since_revision=0, path=EDITS_DB_PATH):
+    """(revision, {day: lesson}) with the newest version of each lesson written after since_revision."""
+    try:
+        db = _connect_readonly(path)
+    except sqlite3.OperationalError:
+        return 0, {}
+    try:
+        # One snapshot of the database for both reads
+        db.execute('BEGIN')
+        row = db.execute('SELECT revision FROM curriculum_revision WHERE id = 1').fetchone()
+        current = row[0] if row else 0
+        lessons = {}
+        for day, data in db.execute(
+                'SELECT day, data FROM lesson_records WHERE revision > ? AND revision <= ? ORDER BY revision',
+                (since_revision, current)):
+            lessons[day] = json.loads(data)
+        return current, lessons
+    except sqlite3.OperationalError:
+        return 0, {}
+    finally:
+        db.close()
+
+
+def save_lesson(lesson, expected_version=None, author=None, path=EDITS_DB_PATH):
+    """Store lesson as the next version of its day; returns (version, curriculum revision).
+
+    With expected_version, the write only succeeds if the day is still at
+    that version (0 for a day without records), so two admins editing the
+    same lesson cannot silently overwrite each other.
+    """
+    day = lesson['day']
+    db = sqlite3.connect(path, timeout=10)
+    try:
+        with db:
+            # Take the write lock first, so concurrent writers queue up instead of racing
+            db.execute('BEGIN IMMEDIATE')
+            row = db.execute('SELECT MAX(version) FROM lesson_records WHERE day = ?', (day,)).fetchone()
+            current_version = row[0] or 0
+            if expected_version is not None and expected_version != current_version:
+                raise VersionConflictError(day, expected_version, current_version)
+
+            now = datetime.utcnow()
+            updated = db.execute('UPDATE curriculum_revision SET revision = revision + 1, updated_at = ? WHERE id = 1',
+                                 (now,)).rowcount
+            if not updated:
+                db.execute('INSERT INTO curriculum_revision (id, revision, updated_at) VALUES (1, 1, ?)', (now,))
+            new_revision = db.execute('SELECT revision FROM curriculum_revision WHERE id = 1').fetchone()[0]
+
+            db.execute(
+                'INSERT INTO lesson_records (day, version, data, revision, created_by, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (day, current_version + 1, json.dumps(lesson), new_revision, author, now)
+            )
+        return current_version + 1, new_revision
+    finally:
+        db.close()
+
+
+def history(day, path=EDITS_DB_PATH):
+    """Every stored version of a day's lesson, newest first."""
+    try:
+        db = _connect_readonly(path)
+    except sqlite3.OperationalError:
+        return []
+    try:
+        return [
+            {'version': version, 'revision': rev, 'created_by': created_by,
+             'created_at': created_at, 'lesson': json.loads(data)}
+            for version, rev, created_by, created_at, data in db.execute(
+                'SELECT version, revision, created_by, created_at, data FROM lesson_records '
+                'WHERE day = ? ORDER BY version DESC', (day,))
+        ]
+    except sqlite3.OperationalError:
+        return []
+    finally:
+        db.close()
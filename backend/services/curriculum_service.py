@@ -0,0 +1,497 @@
+"""In-memory curriculum index over the compiled snapshot, with hot reload"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import sqlite3
+import threading
+import time
+
+from services import curriculum_edits, curriculum_store
+
+logger = logging.getLogger(__name__)
+
+CURRICULUM_PATH = curriculum_store.CURRICULUM_JSON_PATH
+
+# Seconds between checks of the sources' and snapshot's mtimes
+RELOAD_CHECK_INTERVAL = 1.0
+
+# Per-user fields appended to each pre-serialized lesson, keyed by (is_completed, is_accessible)
+USER_FLAGS = {
+    (completed, accessible): json.dumps(
+        {'is_completed': completed, 'is_accessible': accessible}, separators=(',', ':')
+    )[1:].encode('utf-8')
+    for completed in (False, True)
+    for accessible in (False, True)
+}
+
+# Fields /api/lessons can return; the body fields make it decode the lesson
+LESSON_FIELDS = ('day', 'title', 'belt', 'is_completed', 'is_accessible', 'content', 'exercise')
+LESSON_BODY_FIELDS = ('content', 'exercise')
+SUMMARY_FIELDS = ('day', 'title', 'belt', 'is_completed', 'is_accessible')
+
+# Bump when the serialized form of the content document changes, so old ETags stop matching
+CONTENT_FORMAT = 'c1'
+
+
+class FrozenDict(dict):
+    """A dict that refuses to change.
+
+    It is still a dict, so jsonify and json.dumps encode it directly.
+    Handlers that need to add fields copy it first with dict(lesson).
+    """
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError('Curriculum data is read-only; copy it with dict() first')
+
+    __setitem__ = __delitem__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+
+def freeze(value):
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    """A plain, mutable copy of frozen curriculum data."""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+def day_key(day):
+    """Normalize a day from a URL, JSON body or the database to an index key."""
+    if isinstance(day, str):
+        day = float(day)
+    if isinstance(day, float) and day.is_integer():
+        return int(day)
+    return day
+
+
+class CurriculumSnapshot:
+    """One compiled curriculum, usually a memory-mapped snapshot file; never modified.
+
+    Responses are assembled from slices of the snapshot. Lessons are only
+    decoded into (read-only) dicts when a handler asks for one.
+    """
+
+    def __init__(self, buffer, stat_key=None):
+        contents, base = curriculum_store.read_contents(buffer)
+        view = memoryview(buffer)
+
+        def region(offset_length):
+            offset, length = offset_length
+            return view[base + offset:base + offset + length]
+
+        self.stat_key = stat_key
+        self.digest = contents['digest']
+        self.source_digest = contents['source_digest']
+        # Curriculum revision of the newest lesson record compiled in
+        self.revision = contents['revision']
+        self.etag = f'{CONTENT_FORMAT}-{self.digest[:32]}'
+        self._content = region(contents['content'])
+        self._references_region = region(contents['references'])
+        self._references = None
+        self._document = None
+        self._decoded = {}
+        self._lesson_etags = {}
+
+        self.belts = [FrozenDict(belt['summary']) for belt in contents['belts']]
+        # Position of each day in document order; a user's completed days are a bitset over these
+        self.ordinals = {}
+        self._lessons = {}
+        # (ordinal, day, belt index, ordinal of the previous day, title) in document order
+        self.summaries = []
+        belt_lessons = [[] for _ in contents['belts']]
+        for ordinal, (day, offset_length, belt_index, previous, title) in enumerate(contents['lessons']):
+            key = day_key(day)
+            fragment = region(offset_length)
+            self.ordinals.setdefault(key, ordinal)
+            self._lessons[key] = (fragment, belt_index)
+            self.summaries.append((ordinal, key, belt_index, previous, title))
+            belt_lessons[belt_index].append((fragment, ordinal, previous, key))
+        self._fragments = (
+            region(contents['document_open']),
+            [(region(belt['open']), lessons) for belt, lessons in zip(contents['belts'], belt_lessons)]
+        )
+
+    @classmethod
+    def from_document(cls, document, references=None):
+        return cls(curriculum_store.compile_snapshot(document, references))
+
+    @property
+    def document(self):
+        """The whole curriculum as read-only dicts, decoded on first use."""
+        if self._document is None:
+            self._document = freeze(json.loads(bytes(self._content).decode('utf-8')))
+        return self._document
+
+    def days(self):
+        return list(self._lessons)
+
+    def lesson(self, day):
+        """(lesson, belt summary) for a day, or (None, None)."""
+        try:
+            key = day_key(day)
+        except (TypeError, ValueError):
+            return None, None
+        entry = self._lessons.get(key)
+        if entry is None:
+            return None, None
+        lesson = self._decoded.get(key)
+        if lesson is None:
+            fragment, belt_index = entry
+            # A fragment is the lesson's JSON with the closing brace replaced by a comma
+            lesson = freeze(json.loads(bytes(fragment[:-1]).decode('utf-8') + '}'))
+            self._decoded[key] = lesson
+        return lesson, self.belts[entry[1]]
+
+    def lessons(self):
+        """Every lesson keyed by day."""
+        return {day: self.lesson(day)[0] for day in self._lessons}
+
+    def lesson_content(self, day):
+        """(strong ETag, JSON bytes) of one lesson as curriculum.json has it, or (None, None).
+
+        The ETag hashes the lesson alone, so it survives edits to other lessons.
+        """
+        try:
+            key = day_key(day)
+        except (TypeError, ValueError):
+            return None, None
+        entry = self._lessons.get(key)
+        if entry is None:
+            return None, None
+        body = bytes(entry[0][:-1]) + b'}'
+        etag = self._lesson_etags.get(key)
+        if etag is None:
+            etag = f'{CONTENT_FORMAT}-{hashlib.sha256(body).hexdigest()[:32]}'
+            self._lesson_etags[key] = etag
+        return etag, body
+
+    def _reference_table(self):
+        if self._references is None:
+            self._references = freeze(json.loads(bytes(self._references_region).decode('utf-8')))
+        return self._references
+
+    def reference(self, day):
+        """The lessons.py reference exercise for a day, or None."""
+        try:
+            return self._reference_table().get(str(day_key(day)))
+        except (TypeError, ValueError):
+            return None
+
+    def references(self):
+        """Every lessons.py reference exercise keyed by day."""
+        return {day_key(day): thaw(reference) for day, reference in self._reference_table().items()}
+
+    def content(self):
+        """The content document as JSON bytes."""
+        return bytes(self._content)
+
+    def completed_bits(self, completed_days):
+        """completed_days as an int with the bit of each completed lesson's ordinal set."""
+        bits = 0
+        for day in completed_days:
+            try:
+                ordinal = self.ordinals.get(day_key(day))
+            except (TypeError, ValueError):
+                continue
+            if ordinal is not None:
+                bits |= 1 << ordinal
+        return bits
+
+    def fragments(self):
+        """Each lesson serialized once, without its closing brace, grouped by belt.
+
+        Returns (document prefix, [(belt prefix, [(lesson prefix, ordinal,
+        ordinal of the previous day or None, day)])]).
+        """
+        return self._fragments
+
+    def belt_index(self, belt):
+        """Index of the belt named belt ('White Belt' or just 'white'), or None."""
+        wanted = str(belt).strip().lower()
+        for index, summary in enumerate(self.belts):
+            name = (summary.get('name') or '').lower()
+            if wanted in (name, name.split(' ')[0]):
+                return index
+        return None
+
+    def list_lessons(self, fields, completed_days, current_day, belt_index=None, after_day=None, limit=50):
+        """One page of lessons with only the requested fields.
+
+        Titles, days and belts come from the table of contents and the
+        progress flags from the completed-days bitset; a lesson is only
+        decoded when content or exercise is asked for. Returns (lessons,
+        day to pass as after_day for the next page, or None on the last page).
+        """
+        bits = self.completed_bits(completed_days)
+        current_day = current_day or 1
+        decode = any(field in LESSON_BODY_FIELDS for field in fields)
+        page = []
+        last_day = None
+        for ordinal, day, index, previous, title in self.summaries:
+            if belt_index is not None and index != belt_index:
+                continue
+            if after_day is not None and day <= after_day:
+                continue
+            if len(page) == limit:
+                return page, last_day
+            lesson = self.lesson(day)[0] if decode else None
+            item = {}
+            for field in fields:
+                if field == 'day':
+                    item['day'] = day
+                elif field == 'title':
+                    item['title'] = title
+                elif field == 'belt':
+                    item['belt'] = self.belts[index].get('name')
+                elif field == 'is_completed':
+                    item['is_completed'] = bits >> ordinal & 1 == 1
+                elif field == 'is_accessible':
+                    item['is_accessible'] = day <= current_day or (previous is not None and bits >> previous & 1 == 1)
+                else:
+                    item[field] = lesson.get(field)
+            page.append(item)
+            last_day = day
+        return page, None
+
+    def user_view(self, completed_days, current_day):
+        """The document as JSON bytes with is_completed and is_accessible on every lesson.
+
+        A lesson is accessible up to the user's current day and the day
+        after any completed one. Only the flags are encoded per request.
+        """
+        bits = self.completed_bits(completed_days)
+        current_day = current_day or 1
+        document_open, belts = self.fragments()
+        parts = [document_open, b'"belts":[']
+        for index, (belt_open, lessons) in enumerate(belts):
+            if index:
+                parts.append(b',')
+            parts.append(belt_open)
+            parts.append(b'"days":[')
+            if lessons:
+                for fragment, ordinal, previous, day in lessons:
+                    parts.append(fragment)
+                    parts.append(USER_FLAGS[
+                        bits >> ordinal & 1 == 1,
+                        day <= current_day or (previous is not None and bits >> previous & 1 == 1)
+                    ])
+                    parts.append(b',')
+                parts.pop()
+            parts.append(b']}')
+        parts.append(b']}')
+        return b''.join(parts)
+
+    def unlocked_by(self, days):
+        """days, plus the lesson whose access each of them gates, as index keys."""
+        following = {previous: day for _, day, _, previous, _ in self.summaries if previous is not None}
+        keys = set()
+        for day in days:
+            key = day_key(day)
+            if key in self._lessons:
+                keys.add(key)
+                if self.ordinals[key] in following:
+                    keys.add(following[self.ordinals[key]])
+        return keys
+
+    def user_lessons(self, days, completed_days, current_day):
+        """JSON bytes of a list of the given days' lessons with their progress flags, in document order.
+
+        The lessons are flagged the same way user_view flags them.
+        """
+        wanted = {day_key(day) for day in days}
+        bits = self.completed_bits(completed_days)
+        current_day = current_day or 1
+        parts = []
+        for ordinal, day, _, previous, _ in self.summaries:
+            if day not in wanted:
+                continue
+            parts.append(self._lessons[day][0])
+            parts.append(USER_FLAGS[
+                bits >> ordinal & 1 == 1,
+                day <= current_day or (previous is not None and bits >> previous & 1 == 1)
+            ])
+            parts.append(b',')
+        if parts:
+            parts.pop()
+        return b'[' + b''.join(parts) + b']'
+
+
+def validate(document):
+    if not isinstance(document, dict) or 'belts' not in document:
+        raise ValueError('Invalid curriculum format')
+    for belt in document['belts']:
+        missing = [key for key in ('name', 'color', 'startDay', 'endDay', 'days') if key not in belt]
+        if missing:
+            raise ValueError(f"Invalid belt format: {belt.get('name', 'unknown')} is missing {', '.join(missing)}")
+
+
+def map_snapshot(path):
+    with open(path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def build_snapshot(path=curriculum_store.SNAPSHOT_PATH):
+    """Compile curriculum.json and lessons.py into the snapshot file; returns the warnings."""
+    revision, records = curriculum_edits.records_since(0)
+    data, warnings = curriculum_store.build(validate=validate, records=records, revision=revision)
+    curriculum_store.write_snapshot(data, path)
+    return warnings
+
+
+class CurriculumIndex:
+    """Serves the compiled curriculum snapshot, rebuilding it when a source changes.
+
+    The snapshot file is memory-mapped, so its pages are shared by every
+    worker process. If curriculum.json or lessons.py no longer match the
+    snapshot, it is recompiled and rewritten first. The same happens when
+    the curriculum revision counter in the database has moved past the
+    snapshot's; if only lesson records changed, just the new records are
+    applied to the loaded curriculum. A reload swaps in the
+    new snapshot with a single assignment, so a request sees either the old
+    curriculum or the new one, never a mix. If the sources do not parse, the
+    old snapshot stays in service.
+    """
+
+    def __init__(self, snapshot_path=curriculum_store.SNAPSHOT_PATH, check_interval=RELOAD_CHECK_INTERVAL,
+                 sources=(curriculum_store.CURRICULUM_JSON_PATH, curriculum_store.LESSONS_PY_PATH),
+                 edits_path=curriculum_edits.EDITS_DB_PATH):
+        self.snapshot_path = snapshot_path
+        self.sources = sources
+        self.edits_path = edits_path
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reloads = 0
+        self.reload()
+
+    def _stat_key(self, revision):
+        key = []
+        for path in self.sources + (self.snapshot_path,):
+            try:
+                stat = os.stat(path)
+                key.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                key.append(None)
+        key.append(revision)
+        return tuple(key)
+
+    def _load(self, current):
+        source = curriculum_store.source_digest(self.sources)
+        revision = curriculum_edits.revision(self.edits_path)
+        try:
+            snapshot = CurriculumSnapshot(map_snapshot(self.snapshot_path))
+            if snapshot.source_digest == source and snapshot.revision == revision:
+                return snapshot
+        except (OSError, ValueError):
+            pass
+
+        if current is not None and current.source_digest == source and current.revision < revision:
+            revision, records = curriculum_edits.records_since(current.revision, self.edits_path)
+            document = thaw(current.document)
+            warnings = curriculum_store.apply_records(document, records)
+            data = curriculum_store.compile_snapshot(document, current.references(), source, revision)
+            logger.info(f"Applying {len(records)} changed lessons at curriculum revision {revision}")
+        else:
+            revision, records = curriculum_edits.records_since(0, self.edits_path)
+            data, warnings = curriculum_store.build(*self.sources, validate=validate,
+                                                    records=records, revision=revision)
+        for warning in warnings:
+            logger.warning(f"Curriculum: {warning}")
+        try:
+            curriculum_store.write_snapshot(data, self.snapshot_path)
+            return CurriculumSnapshot(map_snapshot(self.snapshot_path))
+        except OSError as e:
+            logger.error(f"Could not write the curriculum snapshot, serving it from memory: {str(e)}")
+            return CurriculumSnapshot(data)
+
+    def reload(self, force=True):
+        """Reload if a source or the snapshot file changed (or always, with force); returns the snapshot."""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            current = self._snapshot
+            try:
+                stat_key = self._stat_key(curriculum_edits.revision(self.edits_path))
+                if not force and current is not None and stat_key == current.stat_key:
+                    return current
+                snapshot = self._load(current)
+                # Stat again: the snapshot file may just have been rewritten
+                snapshot.stat_key = self._stat_key(snapshot.revision)
+                if current is not None and snapshot.digest == current.digest:
+                    # Touched but unchanged; remember the new stats so it is not re-read
+                    current.stat_key = snapshot.stat_key
+                else:
+                    self._snapshot = snapshot
+                    self.reloads += 1
+                    logger.info(f"Loaded curriculum {snapshot.digest[:12]} with {len(snapshot.ordinals)} lessons")
+            except (OSError, ValueError, SyntaxError, sqlite3.Error) as e:
+                if current is None:
+                    raise
+                logger.error(f"Keeping the loaded curriculum; reload failed: {str(e)}")
+            return self._snapshot
+
+    def snapshot(self):
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            return self.reload(force=False)
+        return self._snapshot
+
+    def document(self):
+        return self.snapshot().document
+
+    def version(self):
+        return self.snapshot().digest
+
+    def content(self):
+        """(strong ETag, JSON bytes) of the static curriculum document."""
+        snapshot = self.snapshot()
+        return snapshot.etag, snapshot.content()
+
+    def lesson(self, day):
+        """(lesson, belt summary) for a day, or (None, None)."""
+        return self.snapshot().lesson(day)
+
+    def lessons(self):
+        """Every lesson keyed by day."""
+        return self.snapshot().lessons()
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = CurriculumIndex()
+    return _index
+
+
+def get_curriculum():
+    return get_index().document()
+
+
+def get_lesson(day):
+    return get_index().lesson(day)
@@ -0,0 +1,235 @@
+"""Compiled curriculum snapshot built from curriculum.json and lessons.py.
+
+The snapshot is one file: a fixed header, a JSON table of contents and a
+body of pre-serialized JSON. The table of contents gives the byte range of
+the full content document and of every lesson, so the app can memory-map
+the file and answer requests with slices of it instead of parsing and
+re-encoding the curriculum in every gunicorn worker. The mapped pages are
+shared between workers through the page cache.
+
+curriculum.json is the curriculum students see. lessons.py contributes its
+reference exercises, stored in a separate section that is never part of
+the content document, and any of its whole-numbered days that
+curriculum.json does not have yet. Lessons written through the admin API
+(see curriculum_edits) replace or add to both.
+"""
+
+import ast
+import hashlib
+import json
+import os
+import struct
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CURRICULUM_JSON_PATH = os.path.join(BACKEND_DIR, 'curriculum.json')
+LESSONS_PY_PATH = os.path.join(BACKEND_DIR, 'lessons.py')
+SNAPSHOT_PATH = os.environ.get('CURRICULUM_SNAPSHOT', os.path.join(BACKEND_DIR, 'curriculum.snapshot'))
+
+MAGIC = b'HDCURR01'
+# Bump when the table of contents changes; snapshots in another format are rebuilt
+FORMAT = 3
+# Magic, then the length of the JSON table of contents that follows
+HEADER = struct.Struct('>8sI')
+
+
+class SnapshotError(ValueError):
+    """Raised for a snapshot file that is truncated, corrupt or of another format."""
+
+
+def encode(value):
+    return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+
+def open_object(obj):
+    """obj as JSON bytes without the closing brace, ready for more keys."""
+    encoded = encode(obj)
+    return encoded[:-1] + (b',' if obj else b'')
+
+
+def source_digest(paths=(CURRICULUM_JSON_PATH, LESSONS_PY_PATH)):
+    """SHA-256 over the source files; a snapshot built from other sources is stale."""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(path.encode('utf-8'))
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+def read_lessons_py(path=LESSONS_PY_PATH):
+    """The `curriculum` dict from lessons.py, read without importing the module."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+                isinstance(target, ast.Name) and target.id == 'curriculum' for target in node.targets):
+            return ast.literal_eval(node.value)
+    return {}
+
+
+def reference_exercise(lesson):
+    reference = {
+        'title': lesson['title'],
+        'code': lesson['exercise'],
+        'test_inputs': lesson.get('test_inputs', [])
+    }
+    for key in ('expected_output_contains', 'expected_output', 'hint'):
+        if key in lesson:
+            reference[key] = lesson[key]
+    return reference
+
+
+def as_curriculum_lesson(lesson):
+    """A lessons.py lesson in curriculum.json's shape, graded by its expectations."""
+    test_case = {'input': '\n'.join(lesson.get('test_inputs', []))}
+    if 'expected_output_contains' in lesson:
+        test_case['expected_output_contains'] = lesson['expected_output_contains']
+    else:
+        test_case['match'] = 'whitespace'
+        test_case['expected'] = lesson.get('expected_output', '')
+    return {
+        'day': lesson['day'],
+        'title': lesson['title'],
+        'content': lesson.get('content', ''),
+        'exercise': {
+            'title': lesson['title'],
+            'description': '',
+            'starterCode': '',
+            'hint': lesson.get('hint', ''),
+            'test_cases': [test_case]
+        }
+    }
+
+
+def merge_sources(document, lessons_py):
+    """Merge lessons.py into a curriculum.json document.
+
+    Returns (document, references by day, warnings). The document is
+    changed in place.
+    """
+    warnings = []
+    references = {}
+    known_days = {lesson['day'] for belt in document['belts'] for lesson in belt['days']}
+
+    for belt_key, belt_data in lessons_py.items():
+        for lesson in belt_data.get('lessons', []):
+            day = lesson['day']
+            references[day] = reference_exercise(lesson)
+            if day in known_days:
+                continue
+            if not float(day).is_integer():
+                warnings.append(f'lessons.py day {day} ({belt_key}) is kept as a reference only; days must be whole numbers')
+                continue
+            belt = next((b for b in document['belts'] if b['startDay'] <= day <= b['endDay']), None)
+            if belt is None:
+                warnings.append(f'lessons.py day {day} ({belt_key}) falls outside every belt')
+                continue
+            belt['days'].append(as_curriculum_lesson(lesson))
+            belt['days'].sort(key=lambda item: item['day'])
+            known_days.add(day)
+
+    for belt in document['belts']:
+        if not belt['days']:
+            warnings.append(f"{belt['name']} (days {belt['startDay']}-{belt['endDay']}) has no lessons")
+    return document, references, warnings
+
+
+def apply_records(document, lessons):
+    """Put admin-written lessons into their belts, replacing a lesson for the same day.
+
+    Returns the warnings. The document is changed in place.
+    """
+    warnings = []
+    for day, lesson in sorted(lessons.items()):
+        belt = next((b for b in document['belts'] if b['startDay'] <= day <= b['endDay']), None)
+        if belt is None:
+            warnings.append(f'Lesson record for day {day} falls outside every belt')
+            continue
+        for other in document['belts']:
+            other['days'] = [item for item in other['days'] if item['day'] != day]
+        belt['days'].append(lesson)
+        belt['days'].sort(key=lambda item: item['day'])
+    return warnings
+
+
+def compile_snapshot(document, references=None, source='', revision=0):
+    """Serialize a curriculum into snapshot bytes."""
+    body = bytearray()
+
+    def add(data):
+        offset = len(body)
+        body.extend(data)
+        return [offset, len(data)]
+
+    belts = []
+    lessons = []
+    ordinals = {}
+    for belt in document['belts']:
+        for lesson in belt['days']:
+            ordinals.setdefault(lesson['day'], len(ordinals))
+    for belt_index, belt in enumerate(document['belts']):
+        belts.append({
+            'open': add(open_object({key: value for key, value in belt.items() if key != 'days'})),
+            'summary': {key: belt.get(key) for key in ('name', 'color', 'startDay', 'endDay', 'description')}
+        })
+        for lesson in belt['days']:
+            day = lesson['day']
+            previous = ordinals.get(day - 1) if isinstance(day, (int, float)) else None
+            lessons.append([day, add(open_object(lesson)), belt_index, previous, lesson.get('title', '')])
+
+    contents = {
+        'format': FORMAT,
+        'source_digest': source,
+        'revision': revision,
+        'content': add(encode(document)),
+        'document_open': add(open_object({key: value for key, value in document.items() if key != 'belts'})),
+        'belts': belts,
+        'lessons': lessons,
+        'references': add(encode({str(day): reference for day, reference in (references or {}).items()}))
+    }
+    contents['digest'] = hashlib.sha256(bytes(body)).hexdigest()
+    table = encode(contents)
+    return HEADER.pack(MAGIC, len(table)) + table + bytes(body)
+
+
+def read_contents(buffer):
+    """(table of contents, body offset) of snapshot bytes or a mapped snapshot file."""
+    if len(buffer) < HEADER.size:
+        raise SnapshotError('Curriculum snapshot is truncated')
+    magic, length = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise SnapshotError('Not a curriculum snapshot')
+    if len(buffer) < HEADER.size + length:
+        raise SnapshotError('Curriculum snapshot is truncated')
+    contents = json.loads(bytes(buffer[HEADER.size:HEADER.size + length]).decode('utf-8'))
+    if contents.get('format') != FORMAT:
+        raise SnapshotError(f"Curriculum snapshot format {contents.get('format')} is not {FORMAT}")
+    return contents, HEADER.size + length
+
+
+def build(json_path=CURRICULUM_JSON_PATH, lessons_path=LESSONS_PY_PATH, validate=None, records=None, revision=0):
+    """Merge the sources and the lesson records at revision and compile them.
+
+    Returns (snapshot bytes, warnings).
+    """
+    source = source_digest((json_path, lessons_path))
+    with open(json_path, 'r', encoding='utf-8') as f:
+        document = json.load(f)
+    if validate is not None:
+        validate(document)
+    document, references, warnings = merge_sources(document, read_lessons_py(lessons_path))
+    warnings += apply_records(document, records or {})
+    return compile_snapshot(document, references, source, revision), warnings
+
+
+def write_snapshot(data, path=SNAPSHOT_PATH):
+    """Write snapshot bytes atomically; mapped copies of the old file stay valid."""
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
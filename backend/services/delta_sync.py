@@ -0,0 +1,31 @@
+"""Helpers for ?since= polling of progress and curriculum endpoints.
+
+A response carries the state's version in the X-Sync-Version header. A
+client sends it back as ?since= and gets an empty 204 when nothing changed,
+or only what changed after that version.
+"""
+
+from flask import make_response
+
+from services import progress_buffer
+
+SYNC_VERSION_HEADER = 'X-Sync-Version'
+
+
+def with_sync_version(response, version):
+    response.headers[SYNC_VERSION_HEADER] = str(version)
+    return response
+
+
+def no_changes(version):
+    """The empty answer to a ?since= poll when nothing changed."""
+    return with_sync_version(make_response('', 204), version)
+
+
+def can_sync_since(user_id, since, version):
+    """Whether changes after version since can be served as a delta.
+
+    Writes still in the progress buffer have no version yet, so a user with
+    any gets the full state until they are flushed.
+    """
+    return since is not None and 0 <= since <= version and not progress_buffer.has_pending(user_id)
@@ -0,0 +1,463 @@
+"""Student code execution service for HackDojo"""
+
+import json
+import logging
+import os
+import select
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+
+from config.execution_config import (EXECUTION_LIMITS, EXECUTION_POOL, EXECUTION_RUN_AS, JOB_QUEUE, MAX_CODE_BYTES,
+                                     RESULT_CACHE)
+from services import output_matchers, result_cache
+from services.job_queue import JobQueue
+from services.execution_worker import (
+    FRAME_JOB, FRAME_READY, FRAME_RESULT, SOURCE_NAME, read_frame, write_frame
+)
+
+logger = logging.getLogger(__name__)
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'execution_worker.py')
+
+
+class WorkerError(Exception):
+    """Raised when a pooled worker dies or breaks protocol."""
+
+
+def worker_env():
+    """The worker's entire environment; none of the server's secrets reach student code."""
+    return {
+        'PATH': os.environ.get('PATH', os.defpath),
+        'LANG': os.environ.get('LANG', 'C.UTF-8'),
+        'EXECUTION_RUN_AS': f"{EXECUTION_RUN_AS['UID']}:{EXECUTION_RUN_AS['GID']}",
+        'EXECUTION_ALLOW_SERVER_USER': '1' if EXECUTION_RUN_AS['ALLOW_SERVER_USER'] else '',
+    }
+
+
+class ExecutionWorker:
+    """One pre-started interpreter that forks a fresh child for every job."""
+
+    def __init__(self, preload_modules):
+        # An empty directory away from the backend's files; each child works in its own subdirectory
+        self.scratch_dir = tempfile.mkdtemp(prefix='hackdojo-worker-')
+        # Searchable but not listable, so a child switched to EXECUTION_RUN_AS can reach its own directory
+        os.chmod(self.scratch_dir, 0o711)
+        self.process = subprocess.Popen(
+            [sys.executable, '-I', WORKER_SCRIPT] + list(preload_modules),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            close_fds=True,
+            bufsize=0,
+            cwd=self.scratch_dir,
+            env=worker_env()
+        )
+        self.jobs_run = 0
+        frame_type, _ = read_frame(self.process.stdout)
+        if frame_type != FRAME_READY:
+            self.close()
+            raise WorkerError('Worker failed to start')
+
+    def is_alive(self):
+        return self.process.poll() is None
+
+    def run(self, job, timeout=None):
+        try:
+            write_frame(self.process.stdin, FRAME_JOB, json.dumps(job).encode('utf-8'))
+            ready, _, _ = select.select([self.process.stdout], [], [], timeout)
+            if not ready:
+                self.process.kill()
+                raise WorkerError('Worker did not answer before its deadline')
+            frame_type, payload = read_frame(self.process.stdout)
+        except (BrokenPipeError, OSError) as e:
+            raise WorkerError(f'Worker pipe failed: {str(e)}')
+
+        if frame_type != FRAME_RESULT:
+            raise WorkerError('Worker exited before returning a result')
+        self.jobs_run += 1
+        return json.loads(payload)
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+        except Exception:
+            pass
+        try:
+            self.process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        shutil.rmtree(self.scratch_dir, ignore_errors=True)
+
+
+class WorkerPool:
+    """Fixed-size pool of warm workers, recycled after a number of jobs."""
+
+    def __init__(self, size, recycle_after, acquire_timeout, preload_modules=()):
+        self.size = size
+        self.recycle_after = recycle_after
+        self.acquire_timeout = acquire_timeout
+        self.preload_modules = list(preload_modules)
+
+        self._idle = []
+        self._started = 0
+        self._waiting = 0
+        self._lock = threading.Condition()
+
+        self.jobs_run = 0
+        self.workers_recycled = 0
+
+    def _acquire(self):
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._lock:
+            self._waiting += 1
+            try:
+                while not self._idle and self._started >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError('No execution worker available')
+                    self._lock.wait(remaining)
+                if self._idle:
+                    return self._idle.pop()
+                self._started += 1
+            finally:
+                self._waiting -= 1
+
+        try:
+            return ExecutionWorker(self.preload_modules)
+        except Exception:
+            with self._lock:
+                self._started -= 1
+                self._lock.notify()
+            raise
+
+    def _release(self, worker, healthy):
+        recycle = not healthy or not worker.is_alive() or worker.jobs_run >= self.recycle_after
+        if recycle:
+            worker.close()
+        with self._lock:
+            self.jobs_run += 1
+            if recycle:
+                self._started -= 1
+                self.workers_recycled += 1
+            else:
+                self._idle.append(worker)
+            self._lock.notify()
+
+    def run(self, job, timeout=None):
+        worker = self._acquire()
+        healthy = False
+        try:
+            result = worker.run(job, timeout)
+            healthy = True
+            return result
+        finally:
+            self._release(worker, healthy)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'started': self._started,
+                'idle': len(self._idle),
+                'busy': self._started - len(self._idle),
+                'queue_depth': self._waiting,
+                'jobs_run': self.jobs_run,
+                'workers_recycled': self.workers_recycled,
+                'recycle_after': self.recycle_after
+            }
+
+    def shutdown(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._started -= len(idle)
+        for worker in idle:
+            worker.close()
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return this process's worker pool, creating it lazily.
+
+    gunicorn forks its workers after importing the app, so the pool is keyed
+    on the pid and never shared across processes.
+    """
+    global _pool, _pool_pid
+    if EXECUTION_POOL['SIZE'] <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = WorkerPool(
+                size=EXECUTION_POOL['SIZE'],
+                recycle_after=EXECUTION_POOL['RECYCLE_AFTER'],
+                acquire_timeout=EXECUTION_POOL['ACQUIRE_TIMEOUT'],
+                preload_modules=EXECUTION_POOL['PRELOAD_MODULES']
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+_cache = None
+_cache_pid = None
+
+
+def get_cache():
+    """Return this process's result cache, or None when caching is disabled."""
+    global _cache, _cache_pid
+    if not RESULT_CACHE['ENABLED']:
+        return None
+    with _pool_lock:
+        if _cache is None or _cache_pid != os.getpid():
+            _cache = result_cache.ResultCache(
+                max_entries=RESULT_CACHE['MAX_ENTRIES'],
+                ttl=RESULT_CACHE['TTL'],
+                sqlite_path=RESULT_CACHE['SQLITE_PATH'] or None
+            )
+            _cache_pid = os.getpid()
+        return _cache
+
+
+_job_queue = None
+_job_queue_pid = None
+
+
+def get_job_queue():
+    """Return this process's background job queue, creating it lazily.
+
+    Jobs are not shared between processes; deployments run one API worker.
+    """
+    global _job_queue, _job_queue_pid
+    with _pool_lock:
+        if _job_queue is None or _job_queue_pid != os.getpid():
+            _job_queue = JobQueue(
+                workers=JOB_QUEUE['WORKERS'],
+                max_pending=JOB_QUEUE['MAX_PENDING'],
+                result_ttl=JOB_QUEUE['RESULT_TTL'],
+                max_running_per_owner=JOB_QUEUE['MAX_RUNNING_PER_USER'],
+                max_pending_per_owner=JOB_QUEUE['MAX_PENDING_PER_USER']
+            )
+            _job_queue_pid = os.getpid()
+        return _job_queue
+
+
+def invalidate_day(day):
+    """Drop cached results for a day after its lesson changes."""
+    cache = get_cache()
+    if cache is not None:
+        cache.invalidate_day(day)
+
+
+_precheck_lock = threading.Lock()
+_precheck_stats = {'checked': 0, 'rejected': 0}
+
+
+def precheck(code):
+    """Compile a submission in the API process before it is dispatched.
+
+    Returns None when the code compiles, otherwise an error dict with the
+    formatted message under 'error' and the position under 'syntax_error'.
+    Nothing is executed here.
+    """
+    error = None
+    encoded_size = len(code.encode('utf-8', 'replace'))
+    if encoded_size > MAX_CODE_BYTES:
+        error = {
+            'error': f'Your code is {encoded_size} bytes; the limit is {MAX_CODE_BYTES} bytes.',
+            'syntax_error': {'type': 'CodeTooLarge', 'message': 'Code too large', 'line': None, 'column': None}
+        }
+    else:
+        try:
+            compile(code, SOURCE_NAME, 'exec', dont_inherit=True)
+        except SyntaxError as e:
+            error = {
+                'error': ''.join(traceback.format_exception_only(type(e), e)),
+                'syntax_error': {
+                    'type': type(e).__name__,
+                    'message': e.msg,
+                    'line': e.lineno,
+                    'column': e.offset,
+                    'end_line': getattr(e, 'end_lineno', None),
+                    'end_column': getattr(e, 'end_offset', None),
+                    'text': e.text.rstrip('\n') if e.text else None
+                }
+            }
+        except (ValueError, RecursionError, MemoryError) as e:
+            error = {
+                'error': f'{type(e).__name__}: {str(e)}',
+                'syntax_error': {'type': type(e).__name__, 'message': str(e), 'line': None, 'column': None}
+            }
+
+    with _precheck_lock:
+        _precheck_stats['checked'] += 1
+        if error is not None:
+            _precheck_stats['rejected'] += 1
+    return error
+
+
+_io_lock = threading.Lock()
+_io_stats = {'executions': 0, 'disk_write_bytes': 0}
+
+
+def limits_for(lesson):
+    """Default execution limits overridden by the lesson's exercise.limits."""
+    limits = dict(EXECUTION_LIMITS)
+    if lesson:
+        limits.update(lesson.get('exercise', {}).get('limits') or {})
+    return limits
+
+
+def run_once(job, timeout=None):
+    """Run one job on a throwaway worker; used when the pool is disabled.
+
+    It speaks the same pipe protocol as pooled workers, so code and stdin
+    never touch the disk on this path either.
+    """
+    worker = ExecutionWorker([])
+    try:
+        return worker.run(job, timeout)
+    finally:
+        worker.close()
+
+
+def _record_disk_writes(results):
+    with _io_lock:
+        for result in results:
+            resources = result.get('resources') or {}
+            _io_stats['executions'] += 1
+            _io_stats['disk_write_bytes'] += resources.get('disk_write_bytes') or 0
+
+
+_expectations_lock = threading.Lock()
+_expectations = {}
+
+
+def expectations_for(lesson):
+    """Matcher specs for each of the lesson's test cases, compiled once per lesson version."""
+    key = (str(lesson['day']), result_cache.lesson_version(lesson))
+    with _expectations_lock:
+        specs = _expectations.get(key)
+    if specs is None:
+        specs = [output_matchers.compile_test_case(test_case)
+                 for test_case in lesson.get('exercise', {}).get('test_cases', [])]
+        with _expectations_lock:
+            if len(_expectations) > 512:
+                _expectations.clear()
+            _expectations[key] = specs
+    return specs
+
+
+def _cache_keys(code, stdin_values, lesson, expect):
+    """Cache keys for each stdin value, or None when the run must not be cached."""
+    if lesson is None or get_cache() is None or not result_cache.is_cacheable(code):
+        return None
+    version = result_cache.lesson_version(lesson)
+    return [
+        result_cache.make_key(code, stdin_data, lesson['day'], f'{version}:{output_matchers.spec_digest(specs)}')
+        for stdin_data, specs in zip(stdin_values, expect or [None] * len(stdin_values))
+    ]
+
+
+def _run_batch(code, stdin_values, limits, expect):
+    pool = get_pool()
+    run_job = pool.run if pool is not None else run_once
+
+    # The worker enforces the per-case deadline; this only guards against a hung worker
+    timeout = (limits.get('wall_seconds') or 60) * len(stdin_values) + 5
+    job = {'code': code, 'limits': limits, 'expect': expect}
+    if len(stdin_values) == 1:
+        job['stdin'] = stdin_values[0]
+        results = [run_job(job, timeout)]
+    else:
+        job['batch'] = list(stdin_values)
+        results = run_job(job, timeout)['cases']
+    _record_disk_writes(results)
+    return results
+
+
+def execute(code, stdin_data='', lesson=None):
+    """Run student code and return its stdout, stderr, exit code and timing.
+
+    With a lesson, 'matched' tells whether the output satisfies any of its
+    test cases, and the run is stopped as soon as none of them can match.
+    """
+    expect = [expectations_for(lesson)] if lesson else None
+    return _execute(code, [stdin_data], lesson, expect)[0]
+
+
+def execute_batch(code, stdin_values, lesson=None):
+    """Run student code once per stdin value inside a single worker.
+
+    The code is compiled once and every case runs in its own forked child,
+    so interpreter state is reset between cases. Returns one result per
+    stdin value, in order. With a lesson, the values are taken to be its
+    test cases' inputs and each result's 'matched' is graded against the
+    matching test case.
+    """
+    stdin_values = list(stdin_values)
+    expect = None
+    if lesson:
+        specs = expectations_for(lesson)
+        if len(specs) == len(stdin_values):
+            expect = [[spec] for spec in specs]
+    return _execute(code, stdin_values, lesson, expect)
+
+
+def _execute(code, stdin_values, lesson, expect):
+    """Shared body of execute() and execute_batch().
+
+    Every run is bounded by the default limits, overridden by the lesson's
+    own. When the lesson is given, results are cached by (code, stdin, day,
+    lesson version, expectations) and only the cache misses are executed.
+    """
+    limits = limits_for(lesson)
+    keys = _cache_keys(code, stdin_values, lesson, expect)
+    if keys is None:
+        return _run_batch(code, stdin_values, limits, expect)
+
+    cache = get_cache()
+    results = [cache.get(key) for key in keys]
+    for result in results:
+        if result is not None:
+            result['cached'] = True
+
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        fresh = _run_batch(
+            code,
+            [stdin_values[i] for i in missing],
+            limits,
+            [expect[i] for i in missing] if expect else None
+        )
+        for i, result in zip(missing, fresh):
+            # A blown deadline may just reflect server load, so it is not remembered
+            if result.get('limit_exceeded') != 'wall_clock':
+                cache.put(keys[i], lesson['day'], result)
+            results[i] = result
+    return results
+
+
+def get_stats():
+    pool = get_pool()
+    cache = get_cache()
+    with _precheck_lock:
+        precheck_stats = dict(_precheck_stats)
+    with _io_lock:
+        io_stats = dict(_io_stats)
+    io_stats['disk_write_bytes_per_execution'] = (
+        io_stats['disk_write_bytes'] / io_stats['executions'] if io_stats['executions'] else 0
+    )
+    return {
+        'pool': pool.stats() if pool is not None else {'size': 0},
+        'cache': cache.stats() if cache is not None else {'enabled': False},
+        'jobs': get_job_queue().stats(),
+        'precheck': precheck_stats,
+        'io': io_stats
+    }
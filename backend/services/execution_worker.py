@@ -0,0 +1,395 @@
+"""Warm interpreter worker for student code execution.
+
+Started by services.execution_service as ``python -I execution_worker.py``.
+The worker imports the preload modules once, then acts as a zygote: every
+job received over stdin is run in a forked child so student code starts
+from a clean, already-warm interpreter and can never leak state into the
+next job. A job may carry several stdin values; the code is compiled once
+and a fresh child is forked for each of them. The job's limits are applied
+to every child: rlimits for CPU time, address space and process count, a
+wall-clock deadline and a cap on the bytes read from stdout and stderr.
+Each child starts in an empty temporary directory of its own, removed once
+it exits.
+When the job carries expectations, stdout is fed to output_matchers as it
+arrives and the child is killed as soon as the output can no longer match.
+Each child switches to the EXECUTION_RUN_AS sandbox user before running
+anything, and refuses to run if it cannot, since the server's own user owns
+the database and root ignores RLIMIT_NPROC. Only the standard library may be
+used here.
+
+Frames on both pipes are ``<type:1 byte><length:4 bytes big-endian><payload>``.
+"""
+
+import builtins
+import codecs
+import importlib.util
+import io
+import json
+import linecache
+import os
+import resource
+import selectors
+import shutil
+import signal
+import struct
+import sys
+import tempfile
+import time
+import traceback
+
+FRAME_HEADER = struct.Struct('>cI')
+
+# Parent -> worker
+FRAME_JOB = b'J'
+# Worker -> parent
+FRAME_READY = b'H'
+FRAME_RESULT = b'R'
+
+SOURCE_NAME = '<student>'
+
+
+def load_output_matchers():
+    # Loaded by path: under -I this file's directory is not on sys.path, and
+    # adding it would let student code import the backend's modules.
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output_matchers.py')
+    spec = importlib.util.spec_from_file_location('output_matchers', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+output_matchers = None
+
+
+def read_exact(stream, size):
+    data = b''
+    while len(data) < size:
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def read_frame(stream):
+    header = read_exact(stream, FRAME_HEADER.size)
+    if header is None:
+        return None, None
+    frame_type, length = FRAME_HEADER.unpack(header)
+    payload = read_exact(stream, length) if length else b''
+    if payload is None:
+        return None, None
+    return frame_type, payload
+
+
+def write_frame(stream, frame_type, payload=b''):
+    stream.write(FRAME_HEADER.pack(frame_type, len(payload)) + payload)
+    stream.flush()
+
+
+def compile_student_code(code):
+    """Compile in the worker so batched cases share one code object.
+
+    Returns ``(code_object, None)`` or ``(None, stderr_text)``.
+    """
+    linecache.cache[SOURCE_NAME] = (len(code), None, code.splitlines(True), SOURCE_NAME)
+    try:
+        return compile(code, SOURCE_NAME, 'exec'), None
+    except (SyntaxError, ValueError) as e:
+        return None, ''.join(traceback.format_exception_only(type(e), e))
+
+
+def run_student_code(code_object, stdin_data):
+    """Body of the forked child. Never returns."""
+    sys.stdin = io.StringIO(stdin_data)
+    # Line buffered so the worker can grade output while the program runs
+    sys.stdout = io.TextIOWrapper(io.FileIO(1, 'w', closefd=False), encoding='utf-8', errors='backslashreplace',
+                                  line_buffering=True)
+    sys.stderr = io.TextIOWrapper(io.FileIO(2, 'w', closefd=False), encoding='utf-8', errors='backslashreplace',
+                                  line_buffering=True)
+    sys.argv = ['main.py']
+
+    status = 0
+    try:
+        exec(code_object, {'__name__': '__main__', '__builtins__': builtins})
+    except SystemExit as e:
+        if e.code is None:
+            status = 0
+        elif isinstance(e.code, int):
+            status = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            status = 1
+    except BaseException as e:
+        # Drop this frame so the traceback starts in the student's code
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+        status = 1
+
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            stream.flush()
+        except Exception:
+            pass
+    os._exit(status & 0xFF)
+
+
+def run_as():
+    """(uid, gid) of the EXECUTION_RUN_AS user ("uid:gid"); raises ValueError if it is malformed."""
+    uid, gid = (int(part) for part in os.environ.get('EXECUTION_RUN_AS', '65534:65534').split(':'))
+    return uid, gid
+
+
+def drop_privileges():
+    """Switch the child to the EXECUTION_RUN_AS sandbox user; False if it cannot.
+
+    Only root (or a server granted CAP_SETUID) can switch. Otherwise student
+    code would run as the server's own user, which can rewrite the database
+    and the backend's files, so the child refuses unless
+    EXECUTION_ALLOW_SERVER_USER is set for local development.
+    """
+    if os.geteuid() != 0 and os.environ.get('EXECUTION_ALLOW_SERVER_USER') == '1':
+        return True
+    try:
+        uid, gid = run_as()
+    except ValueError:
+        return False
+    if os.geteuid() == uid:
+        # The server itself runs as the sandbox user, so there is nothing to switch to
+        return False
+    try:
+        if os.geteuid() == 0:
+            os.setgroups([])
+        os.setgid(gid)
+        os.setuid(uid)
+    except OSError:
+        return False
+    return os.geteuid() == uid and os.getuid() == uid
+
+
+def apply_limits(limits):
+    """Set rlimits in the forked child before any student code runs."""
+    rlimits = []
+    if limits.get('cpu_seconds'):
+        cpu = int(limits['cpu_seconds'])
+        rlimits.append((resource.RLIMIT_CPU, (cpu, cpu + 1)))
+    if limits.get('memory_mb'):
+        memory = int(limits['memory_mb']) * 1024 * 1024
+        rlimits.append((resource.RLIMIT_AS, (memory, memory)))
+    if limits.get('max_processes') is not None:
+        processes = int(limits['max_processes'])
+        rlimits.append((resource.RLIMIT_NPROC, (processes, processes)))
+    for which, value in rlimits:
+        try:
+            resource.setrlimit(which, value)
+        except (ValueError, OSError):
+            pass
+
+
+def kill_group(pid):
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def limit_note(limit, limits):
+    notes = {
+        'cpu': f"CPU time limit of {limits.get('cpu_seconds')}s exceeded",
+        'memory': f"memory limit of {limits.get('memory_mb')} MB exceeded",
+        'wall_clock': f"time limit of {limits.get('wall_seconds')}s exceeded",
+        'output': f"output limit of {limits.get('max_output_bytes')} bytes exceeded",
+    }
+    return f"\nLimitExceeded: {notes[limit]}\n"
+
+
+# Tells the student why their output ends early when the matcher stopped the run
+MISMATCH_NOTE = 'Stopped at the first output that did not match the expected result'
+
+
+def run_case(code_object, stdin_data, limits, matcher, protocol_fds):
+    # Inside the worker's scratch directory, its working directory
+    workdir = tempfile.mkdtemp(prefix='run-', dir=os.getcwd())
+    if os.geteuid() == 0:
+        try:
+            os.chown(workdir, *run_as())
+        except (ValueError, OSError):
+            pass
+    out_r, out_w = os.pipe()
+    err_r, err_w = os.pipe()
+    started = time.monotonic()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.setpgid(0, 0)
+            for fd in protocol_fds + [out_r, err_r]:
+                os.close(fd)
+            os.dup2(out_w, 1)
+            os.dup2(err_w, 2)
+            os.close(out_w)
+            os.close(err_w)
+            os.chdir(workdir)
+            if not drop_privileges():
+                os.write(2, b'Execution refused: could not switch to the sandbox user; run the server as root, '
+                            b'or set EXECUTION_ALLOW_SERVER_USER=true for local development\n')
+                os._exit(1)
+            apply_limits(limits)
+            run_student_code(code_object, stdin_data)
+        finally:
+            os._exit(1)
+
+    try:
+        os.setpgid(pid, pid)
+    except OSError:
+        pass
+    os.close(out_w)
+    os.close(err_w)
+
+    wall_seconds = limits.get('wall_seconds')
+    max_output = limits.get('max_output_bytes')
+    deadline = started + wall_seconds if wall_seconds else None
+
+    buffers = {out_r: [], err_r: []}
+    output_bytes = 0
+    limit = None
+    mismatch = False
+    decoder = codecs.getincrementaldecoder('utf-8')('replace')
+    selector = selectors.DefaultSelector()
+    selector.register(out_r, selectors.EVENT_READ)
+    selector.register(err_r, selectors.EVENT_READ)
+    open_fds = {out_r, err_r}
+    while open_fds and limit is None and not mismatch:
+        timeout = None
+        if deadline is not None:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                limit = 'wall_clock'
+                break
+        for key, _ in selector.select(timeout):
+            chunk = os.read(key.fd, 65536)
+            if not chunk:
+                selector.unregister(key.fd)
+                os.close(key.fd)
+                open_fds.discard(key.fd)
+                continue
+            if max_output and output_bytes + len(chunk) > max_output:
+                chunk = chunk[:max_output - output_bytes]
+                limit = 'output'
+            buffers[key.fd].append(chunk)
+            output_bytes += len(chunk)
+            if matcher is not None and key.fd == out_r and not matcher.feed(decoder.decode(chunk)):
+                # The output can no longer match, so there is no point letting it run
+                mismatch = True
+            if limit or mismatch:
+                break
+
+    if limit is not None or mismatch:
+        kill_group(pid)
+    for fd in open_fds:
+        selector.unregister(fd)
+        os.close(fd)
+    selector.close()
+
+    _, status, usage = os.wait4(pid, 0)
+    duration = time.monotonic() - started
+    # Reap anything the program left running in its process group
+    kill_group(pid)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    stdout = b''.join(buffers[out_r]).decode('utf-8', 'replace')
+    stderr = b''.join(buffers[err_r]).decode('utf-8', 'replace')
+    cpu_seconds = usage.ru_utime + usage.ru_stime
+
+    if limit is None:
+        signaled = os.WTERMSIG(status) if os.WIFSIGNALED(status) else None
+        cpu_limit = limits.get('cpu_seconds')
+        if signaled == signal.SIGXCPU or (signaled == signal.SIGKILL and cpu_limit and cpu_seconds >= cpu_limit):
+            limit = 'cpu'
+        elif stderr.rstrip().rsplit('\n', 1)[-1].startswith('MemoryError'):
+            limit = 'memory'
+    if limit is not None:
+        stderr += limit_note(limit, limits)
+
+    matched = None
+    if matcher is not None:
+        if not mismatch:
+            mismatch = not matcher.feed(decoder.decode(b'', final=True))
+        matched = not mismatch and matcher.finish()
+
+    return {
+        'stdout': stdout,
+        'stderr': stderr,
+        'returncode': os.waitstatus_to_exitcode(status),
+        'duration_ms': round(duration * 1000, 2),
+        'limit_exceeded': limit,
+        'matched': matched,
+        'stopped_on_mismatch': mismatch,
+        'note': MISMATCH_NOTE if mismatch else None,
+        'resources': {
+            'cpu_ms': round(cpu_seconds * 1000, 2),
+            'max_rss_kb': usage.ru_maxrss,
+            'wall_ms': round(duration * 1000, 2),
+            'output_bytes': output_bytes,
+            # Block output operations are counted in 512-byte units
+            'disk_write_bytes': usage.ru_oublock * 512,
+        },
+    }
+
+
+def run_job(job, protocol_fds):
+    code_object, compile_error = compile_student_code(job.get('code', ''))
+    limits = job.get('limits') or {}
+    if 'batch' in job:
+        stdin_values = job['batch']
+    else:
+        stdin_values = [job.get('stdin', '')]
+    expectations = job.get('expect') or [None] * len(stdin_values)
+
+    results = []
+    for stdin_data, specs in zip(stdin_values, expectations):
+        if code_object is None:
+            results.append({'stdout': '', 'stderr': compile_error, 'returncode': 1, 'duration_ms': 0,
+                            'limit_exceeded': None, 'matched': False if specs else None,
+                            'stopped_on_mismatch': False, 'note': None, 'resources': None})
+        else:
+            matcher = output_matchers.AnyOf(specs) if specs else None
+            results.append(run_case(code_object, stdin_data, limits, matcher, protocol_fds))
+
+    if 'batch' in job:
+        return {'cases': results}
+    return results[0]
+
+
+def main():
+    global output_matchers
+    # Keep private copies of the protocol pipes and point fds 0/1 at /dev/null,
+    # so nothing but framed messages ever reaches the parent.
+    protocol_in = os.dup(0)
+    protocol_out = os.dup(1)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+
+    reader = os.fdopen(protocol_in, 'rb', buffering=0)
+    writer = os.fdopen(protocol_out, 'wb', buffering=0)
+
+    output_matchers = load_output_matchers()
+    for module in sys.argv[1:]:
+        try:
+            __import__(module)
+        except ImportError:
+            pass
+
+    write_frame(writer, FRAME_READY)
+    while True:
+        frame_type, payload = read_frame(reader)
+        if frame_type is None:
+            break
+        if frame_type != FRAME_JOB:
+            continue
+        result = run_job(json.loads(payload), [protocol_in, protocol_out])
+        write_frame(writer, FRAME_RESULT, json.dumps(result).encode('utf-8'))
+
+
+if __name__ == '__main__':
+    main()
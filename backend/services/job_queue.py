@@ -0,0 +1,191 @@
+"""Bounded, per-user fair job queue for code execution"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class QueueFullError(Exception):
+    """Raised when the queue already holds its maximum number of pending jobs."""
+
+
+class UserQueueFullError(QueueFullError):
+    """Raised when one user already has their maximum number of pending jobs."""
+
+
+class Job:
+    def __init__(self, owner, fn, args):
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.fn = fn
+        self.args = args
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.finished = threading.Event()
+
+    def to_dict(self, position=None, queue_length=None):
+        data = {
+            'job_id': self.id,
+            'status': self.status,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at
+        }
+        if self.status == QUEUED:
+            data['queue_position'] = position
+            data['queue_length'] = queue_length
+        if self.status == DONE:
+            data['result'] = self.result
+        if self.status == FAILED:
+            data['error'] = self.error
+        return data
+
+
+class JobQueue:
+    """Runs submitted callables on a fixed number of threads.
+
+    Each owner (a JWT identity) has their own FIFO. Free threads take the
+    next job round-robin across owners, skipping owners who already have
+    max_running_per_owner jobs running, so one busy user cannot starve a
+    classroom. Submissions beyond max_pending overall, or
+    max_pending_per_owner for one owner, are rejected instead of blocking
+    the request thread. Finished jobs are kept for result_ttl seconds so
+    clients can fetch their results.
+
+    All of this state is in memory, so the caps and the rotation hold per
+    process: with N API workers one user could run N times as many jobs.
+    Deployments run a single worker (see JOB_QUEUE in execution_config).
+    """
+
+    def __init__(self, workers, max_pending, result_ttl, max_running_per_owner=1, max_pending_per_owner=None):
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self.max_running_per_owner = max_running_per_owner
+        self.max_pending_per_owner = max_pending_per_owner or max_pending
+        # owner -> deque of queued jobs; iteration order is the round-robin rotation
+        self._queues = OrderedDict()
+        self._running = {}
+        self._pending = 0
+        self._jobs = {}
+        self._lock = threading.Condition()
+        self._threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self._work, name=f'job-queue-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, owner, fn, *args):
+        with self._lock:
+            self._purge()
+            if self._pending >= self.max_pending:
+                raise QueueFullError('Too many submissions are waiting to run. Try again shortly.')
+            queue = self._queues.setdefault(owner, deque())
+            if len(queue) >= self.max_pending_per_owner:
+                raise UserQueueFullError('You already have submissions waiting to run. Wait for them to finish.')
+            job = Job(owner, fn, args)
+            self._jobs[job.id] = job
+            queue.append(job)
+            self._pending += 1
+            self._lock.notify()
+            return job
+
+    def get(self, job_id, owner=None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or (owner is not None and job.owner != owner):
+                return None
+            return job
+
+    def _position(self, job):
+        """1-based place in the round-robin dispatch order, ignoring running caps."""
+        queue = self._queues.get(job.owner)
+        if not queue or job not in queue:
+            return None
+        rank = queue.index(job)
+        ahead = rank
+        before_owner = True
+        for owner, other in self._queues.items():
+            if owner == job.owner:
+                before_owner = False
+                continue
+            # Owners earlier in the rotation get one extra turn before ours
+            ahead += min(len(other), rank + (1 if before_owner else 0))
+        return ahead + 1
+
+    def describe(self, job):
+        with self._lock:
+            position = self._position(job) if job.status == QUEUED else None
+            return job.to_dict(position, self._pending)
+
+    def _purge(self):
+        cutoff = time.time() - self.result_ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+        for owner in [owner for owner, queue in self._queues.items()
+                      if not queue and not self._running.get(owner)]:
+            del self._queues[owner]
+
+    def _next_job(self):
+        for owner, queue in self._queues.items():
+            if queue and self._running.get(owner, 0) < self.max_running_per_owner:
+                job = queue.popleft()
+                self._pending -= 1
+                self._running[owner] = self._running.get(owner, 0) + 1
+                # Move this owner to the back of the rotation
+                self._queues.move_to_end(owner)
+                return job
+        return None
+
+    def _work(self):
+        while True:
+            with self._lock:
+                job = self._next_job()
+                while job is None:
+                    self._lock.wait()
+                    job = self._next_job()
+                job.status = RUNNING
+
+            try:
+                result = job.fn(*job.args)
+                status, error = DONE, None
+            except Exception as e:
+                logger.error(f"Job {job.id} failed: {str(e)}", exc_info=True)
+                result, status, error = None, FAILED, str(e)
+
+            with self._lock:
+                job.result = result
+                job.error = error
+                job.status = status
+                job.finished_at = time.time()
+                self._running[job.owner] -= 1
+                if not self._running[job.owner]:
+                    del self._running[job.owner]
+                # A finished job may unblock another owner's capped queue
+                self._lock.notify_all()
+            job.finished.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': len(self._threads),
+                'pending': self._pending,
+                'max_pending': self.max_pending,
+                'running': sum(self._running.values()),
+                'active_users': len(self._queues),
+                'max_running_per_user': self.max_running_per_owner,
+                'max_pending_per_user': self.max_pending_per_owner,
+                'tracked_jobs': len(self._jobs)
+            }
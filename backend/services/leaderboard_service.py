@@ -0,0 +1,230 @@
+"""Leaderboard ranks and completion streaks, maintained per completion event.
+
+A user's score is the number of lessons they have completed. Ranks order
+users by score, then by who reached that score first. The leaderboard_entries
+table is the source of truth: each completion event updates the user's row
+(score, streaks and a new table-wide seq) in the writer's transaction, so
+nothing needs the completed_days JSON.
+
+Each process keeps the entries in an in-memory ordered index: a Fenwick tree
+of user counts per score plus, for every score, the users holding it sorted
+by when they reached it. Before answering, the index applies the rows whose
+seq is newer than the last one it saw, usually none, so other workers'
+writes show up without reloading the table. A rank costs O(log n) and the
+top K cost O(K) plus the number of distinct scores, whatever the number of
+users.
+"""
+
+import threading
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, text
+
+from models import db, LeaderboardEntry
+
+
+class ScoreCounts:
+    """Fenwick tree counting users per score, growing as scores do."""
+
+    def __init__(self, size=128):
+        self._tree = [0] * (size + 1)
+
+    def _grow(self, score):
+        size = len(self._tree) - 1
+        if score < size:
+            return
+        counts = [self.count_at(s) for s in range(size)]
+        while size <= score:
+            size *= 2
+        self._tree = [0] * (size + 1)
+        for s, count in enumerate(counts):
+            if count:
+                self.add(s, count)
+
+    def add(self, score, delta):
+        self._grow(score)
+        i = score + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def count_below(self, score):
+        """Number of users with a score lower than score."""
+        total = 0
+        i = min(score, len(self._tree) - 1)
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def count_at(self, score):
+        return self.count_below(score + 1) - self.count_below(score)
+
+    def total(self):
+        return self.count_below(len(self._tree) - 1)
+
+
+class LeaderboardIndex:
+    """Every user with a positive score, ordered for rank and top-K queries."""
+
+    def __init__(self):
+        self.seq = 0
+        # user id -> (score, reached_at, current_streak, longest_streak, last_active_date)
+        self._entries = {}
+        # score -> [(reached_at, user id)] in rank order
+        self._by_score = {}
+        # user id -> seq of the row last applied, so a slower request cannot apply an older row over it
+        self._seqs = {}
+        self._counts = ScoreCounts()
+        self._lock = threading.Lock()
+
+    def _remove(self, user_id):
+        entry = self._entries.pop(user_id, None)
+        if entry is None:
+            return
+        score, reached_at = entry[0], entry[1]
+        holders = self._by_score[score]
+        del holders[bisect_left(holders, (reached_at, user_id))]
+        if not holders:
+            del self._by_score[score]
+        self._counts.add(score, -1)
+
+    def apply(self, rows):
+        """Apply changed rows, each (user id, score, reached_at, current, longest, last_active_date, seq)."""
+        with self._lock:
+            for user_id, score, reached_at, current, longest, last_active, seq in rows:
+                self.seq = max(self.seq, seq)
+                if seq <= self._seqs.get(user_id, 0):
+                    continue
+                self._seqs[user_id] = seq
+                self._remove(user_id)
+                if score > 0:
+                    self._entries[user_id] = (score, reached_at, current, longest, last_active)
+                    insort(self._by_score.setdefault(score, []), (reached_at, user_id))
+                    self._counts.add(score, 1)
+
+    def _describe(self, rank, user_id, today):
+        score, _, current, longest, last_active = self._entries[user_id]
+        return {
+            'rank': rank,
+            'user_id': user_id,
+            'score': score,
+            'current_streak': current_streak(current, last_active, today),
+            'longest_streak': longest
+        }
+
+    def rank(self, user_id, today=None):
+        """The user's place on the board, or None if they have not completed a lesson."""
+        today = today or datetime.utcnow().date()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            score, reached_at = entry[0], entry[1]
+            ahead = self._counts.total() - self._counts.count_below(score + 1)
+            rank = ahead + bisect_left(self._by_score[score], (reached_at, user_id)) + 1
+            return self._describe(rank, user_id, today)
+
+    def top(self, limit, today=None):
+        """The first limit users on the board, best first."""
+        today = today or datetime.utcnow().date()
+        result = []
+        with self._lock:
+            for score in sorted(self._by_score, reverse=True):
+                for _, user_id in self._by_score[score]:
+                    if len(result) >= limit:
+                        return result
+                    result.append(self._describe(len(result) + 1, user_id, today))
+        return result
+
+    def size(self):
+        with self._lock:
+            return len(self._entries)
+
+
+def current_streak(streak, last_active_date, today):
+    """A stored streak as of today: it lapses once a whole day passes without a completion."""
+    if last_active_date is None or last_active_date < today - timedelta(days=1):
+        return 0
+    return streak
+
+
+def streaks(dates):
+    """(current, longest) runs of consecutive dates in a sorted list; current ends at the last date."""
+    current = longest = 0
+    previous = None
+    for date in dates:
+        current = current + 1 if previous is not None and date == previous + timedelta(days=1) else 1
+        longest = max(longest, current)
+        previous = date
+    return current, longest
+
+
+def _completion_dates(user_id):
+    rows = db.session.execute(text(
+        'SELECT DISTINCT date(completed_at) FROM lesson_completion '
+        'WHERE user_id = :user_id AND completed_at IS NOT NULL ORDER BY 1'
+    ), {'user_id': int(user_id)})
+    return [datetime.strptime(value, '%Y-%m-%d').date() for (value,) in rows]
+
+
+def completion_changed(user_id, old_at, new_at, was_completed, completed):
+    """Update a user's score and streaks for one completion change; the caller commits.
+
+    old_at and new_at are the completion's previous and new times. A
+    completion with no known time (None while completed) counts towards the
+    score but not the streaks.
+    """
+    entry = LeaderboardEntry.query.get(int(user_id))
+    if entry is None:
+        entry = LeaderboardEntry(user_id=int(user_id), score=0, current_streak=0, longest_streak=0)
+        db.session.add(entry)
+
+    delta = int(completed) - int(was_completed)
+    if delta:
+        entry.score = max(0, (entry.score or 0) + delta)
+        entry.reached_at = datetime.utcnow()
+
+    day = new_at.date() if new_at is not None else None
+    last = entry.last_active_date
+    if old_at is None and new_at is None:
+        pass
+    elif old_at is None and day is not None and (last is None or day >= last):
+        # The common case, a completion today: extend, keep or restart the streak
+        if last is None or day > last + timedelta(days=1):
+            entry.current_streak = 1
+        elif day == last + timedelta(days=1):
+            entry.current_streak = (entry.current_streak or 0) + 1
+        entry.last_active_date = day
+        entry.longest_streak = max(entry.longest_streak or 0, entry.current_streak)
+    else:
+        # A backdated, moved or removed completion can join or split runs; recount this user's dates
+        db.session.flush()
+        dates = _completion_dates(user_id)
+        entry.current_streak, entry.longest_streak = streaks(dates)
+        entry.last_active_date = dates[-1] if dates else None
+
+    entry.seq = select(func.coalesce(func.max(LeaderboardEntry.seq), 0) + 1).scalar_subquery()
+    return entry
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """This process's leaderboard, brought up to date with the table."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = LeaderboardIndex()
+        index = _index
+    rows = db.session.query(
+        LeaderboardEntry.user_id, LeaderboardEntry.score, LeaderboardEntry.reached_at,
+        LeaderboardEntry.current_streak, LeaderboardEntry.longest_streak, LeaderboardEntry.last_active_date,
+        LeaderboardEntry.seq
+    ).filter(LeaderboardEntry.seq > index.seq).order_by(LeaderboardEntry.seq).all()
+    if rows:
+        index.apply(rows)
+    return index
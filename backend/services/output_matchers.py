@@ -0,0 +1,193 @@
+"""Streaming comparison of program output against test case expectations.
+
+Loaded by the execution worker straight from its file path, so it may only
+use the standard library.
+
+A test case picks its comparison with ``"match"``:
+
+    exact       output must equal ``expected`` (the default)
+    whitespace  as exact, but runs of whitespace are collapsed and the ends trimmed
+    contains    every string in ``expected`` (or ``expected_output_contains``) appears
+    regex       ``pattern`` is found in the output (multiline)
+    numeric     as whitespace, but numbers may differ by ``tolerance``
+
+Matchers are fed output as it streams in. ``feed`` returns False once the
+output can no longer match, which lets the worker stop the program early.
+"""
+
+import json
+import math
+import re
+
+MODES = ('exact', 'whitespace', 'contains', 'regex', 'numeric')
+
+NUMBER_PATTERN = re.compile(r'^[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$')
+
+
+def compile_test_case(test_case):
+    """Turn a curriculum test case into a JSON-serializable matcher spec.
+
+    Raises ValueError for unknown modes and invalid patterns, so a broken
+    lesson is reported once instead of on every submission.
+    """
+    mode = test_case.get('match')
+    if mode is None:
+        mode = 'contains' if 'expected_output_contains' in test_case else 'exact'
+    if mode not in MODES:
+        raise ValueError(f'Unknown match mode: {mode}')
+
+    spec = {'mode': mode}
+    if mode == 'contains':
+        expected = test_case.get('expected_output_contains', test_case.get('expected', []))
+        spec['expected'] = [expected] if isinstance(expected, str) else list(expected)
+    elif mode == 'regex':
+        pattern = test_case.get('pattern', test_case.get('expected', ''))
+        try:
+            re.compile(pattern, re.MULTILINE)
+        except re.error as e:
+            raise ValueError(f'Invalid pattern {pattern!r}: {str(e)}')
+        spec['pattern'] = pattern
+    else:
+        spec['expected'] = test_case.get('expected', '')
+        if mode == 'numeric':
+            spec['tolerance'] = float(test_case.get('tolerance', 1e-6))
+    return spec
+
+
+def spec_digest(specs):
+    return json.dumps(specs, sort_keys=True)
+
+
+class ExactMatcher:
+    def __init__(self, expected):
+        self.expected = expected
+        self.position = 0
+        self.failed = False
+
+    def feed(self, text):
+        if self.failed:
+            return False
+        end = self.position + len(text)
+        if end > len(self.expected) or self.expected[self.position:end] != text:
+            self.failed = True
+            return False
+        self.position = end
+        return True
+
+    def finish(self):
+        return not self.failed and self.position == len(self.expected)
+
+
+class TokenMatcher:
+    """Compares whitespace-separated tokens as they complete."""
+
+    def __init__(self, expected, tolerance=None):
+        self.expected = expected.split()
+        self.tolerance = tolerance
+        self.index = 0
+        self.partial = ''
+        self.failed = False
+
+    def _same(self, actual, expected):
+        if actual == expected:
+            return True
+        if self.tolerance is None:
+            return False
+        if not (NUMBER_PATTERN.match(actual) and NUMBER_PATTERN.match(expected)):
+            return False
+        return math.isclose(float(actual), float(expected), rel_tol=self.tolerance, abs_tol=self.tolerance)
+
+    def _check(self, token):
+        if self.index >= len(self.expected) or not self._same(token, self.expected[self.index]):
+            self.failed = True
+            return False
+        self.index += 1
+        return True
+
+    def _could_extend(self, partial):
+        # A partial token is still viable if some completion could match
+        if self.index >= len(self.expected):
+            return False
+        expected = self.expected[self.index]
+        if expected.startswith(partial):
+            return True
+        return self.tolerance is not None and re.match(r'^[-+]?[\d.eE+-]*$', partial) is not None
+
+    def feed(self, text):
+        if self.failed:
+            return False
+        tokens = (self.partial + text).split()
+        ends_with_space = text[-1:].isspace()
+        self.partial = '' if ends_with_space or not tokens else tokens.pop()
+        for token in tokens:
+            if not self._check(token):
+                return False
+        if self.partial and not self._could_extend(self.partial):
+            self.failed = True
+            return False
+        return True
+
+    def finish(self):
+        if self.failed:
+            return False
+        if self.partial and not self._check(self.partial):
+            return False
+        self.partial = ''
+        return self.index == len(self.expected)
+
+
+class ContainsMatcher:
+    def __init__(self, expected):
+        self.remaining = [s for s in expected if s]
+        self.tail = ''
+        self.keep = max((len(s) for s in self.remaining), default=1) - 1
+
+    def feed(self, text):
+        window = self.tail + text
+        self.remaining = [s for s in self.remaining if s not in window]
+        self.tail = window[-self.keep:] if self.keep else ''
+        return True
+
+    def finish(self):
+        return not self.remaining
+
+
+class RegexMatcher:
+    def __init__(self, pattern):
+        self.pattern = re.compile(pattern, re.MULTILINE)
+        self.chunks = []
+
+    def feed(self, text):
+        self.chunks.append(text)
+        return True
+
+    def finish(self):
+        return self.pattern.search(''.join(self.chunks)) is not None
+
+
+def build_matcher(spec):
+    mode = spec['mode']
+    if mode == 'exact':
+        return ExactMatcher(spec['expected'])
+    if mode == 'whitespace':
+        return TokenMatcher(spec['expected'])
+    if mode == 'numeric':
+        return TokenMatcher(spec['expected'], tolerance=spec['tolerance'])
+    if mode == 'contains':
+        return ContainsMatcher(spec['expected'])
+    return RegexMatcher(spec['pattern'])
+
+
+class AnyOf:
+    """Passes if any of its matchers passes; fails early only when all have failed."""
+
+    def __init__(self, specs):
+        self.matchers = [build_matcher(spec) for spec in specs]
+        self.alive = list(self.matchers)
+
+    def feed(self, text):
+        self.alive = [matcher for matcher in self.alive if matcher.feed(text)]
+        return bool(self.alive)
+
+    def finish(self):
+        return any(matcher.finish() for matcher in self.alive)
@@ -0,0 +1,261 @@
+"""Write-behind buffer for lesson attempts and completions.
+
+When PROGRESS_BUFFER is enabled, graded attempts, completions and current
+day moves are merged per user and day in memory. A background thread
+commits them in one transaction every FLUSH_INTERVAL_MS, or as soon as
+MAX_EVENTS are waiting. A class submitting the same exercise then costs one
+SQLite write transaction per interval instead of one per submission.
+
+Requests served by the same process see their own writes: readers merge
+pending() into what they load from the database, including writes whose
+flush is in progress. The buffer is per process, so with several API
+workers a write buffered by one is invisible to the others until it is
+flushed. A crash loses at most the writes of one interval.
+
+A batch that fails to commit is put back and retried. After
+MAX_FLUSH_FAILURES failures in a row, each user's writes are committed on
+their own, and a user whose writes still fail has them logged and dropped
+so one bad row cannot hold back everyone else's.
+"""
+
+import atexit
+import logging
+import os
+import threading
+from datetime import datetime
+
+from config.progress_config import PROGRESS_BUFFER
+from models import db, Progress
+from services import progress_service
+
+logger = logging.getLogger(__name__)
+
+
+def new_entry():
+    return {'attempts': 0, 'passed': False, 'completed_at': None, 'best_time': None, 'submission': None}
+
+
+def merge_entry(entry, older):
+    """Fold an older entry for the same user and day into entry."""
+    entry['attempts'] += older['attempts']
+    entry['passed'] = entry['passed'] or older['passed']
+    if older['completed_at'] is not None and (entry['completed_at'] is None
+                                              or older['completed_at'] < entry['completed_at']):
+        entry['completed_at'] = older['completed_at']
+    if older['best_time'] is not None and (entry['best_time'] is None or older['best_time'] < entry['best_time']):
+        entry['best_time'] = older['best_time']
+    # A failing submission never replaces a passing one
+    if older['submission'] is not None and (entry['submission'] is None or
+                                            (older['submission']['passed'] and not entry['submission']['passed'])):
+        entry['submission'] = older['submission']
+
+
+class ProgressBuffer:
+    def __init__(self, app, flush_interval, max_events, max_failures=3):
+        self.app = app
+        self.flush_interval = flush_interval
+        self.max_events = max_events
+        self.max_failures = max_failures
+        # Failed flushes in a row, and the number of events dropped after them
+        self.failures = 0
+        self.dropped = 0
+        # user id -> day -> entry
+        self._pending = {}
+        # user id -> highest current day requested
+        self._current_days = {}
+        # The batch being committed; still visible to readers until the commit finishes
+        self._flushing = ({}, {})
+        self._events = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+
+        self._thread = threading.Thread(target=self._run, name='progress-buffer', daemon=True)
+        self._thread.start()
+
+    def _entry(self, user_id, day):
+        days = self._pending.setdefault(int(user_id), {})
+        entry = days.get(int(day))
+        if entry is None:
+            entry = new_entry()
+            days[int(day)] = entry
+        return entry
+
+    def _added(self):
+        self._events += 1
+        if self._events >= self.max_events:
+            self._wake.set()
+
+    def record_attempt(self, user_id, day, passed, duration_ms=None, submission=None):
+        """Buffer a graded attempt, and the submission to keep for it (Submission fields as a dict)."""
+        now = datetime.utcnow()
+        with self._lock:
+            entry = self._entry(user_id, day)
+            entry['attempts'] += 1
+            if passed:
+                entry['passed'] = True
+                if entry['completed_at'] is None:
+                    entry['completed_at'] = now
+                if duration_ms is not None and (entry['best_time'] is None or duration_ms < entry['best_time']):
+                    entry['best_time'] = duration_ms
+            if submission is not None and (passed or entry['submission'] is None
+                                           or not entry['submission']['passed']):
+                entry['submission'] = dict(submission, passed=passed, at=now)
+            self._added()
+
+    def complete(self, user_id, day, current_day=None):
+        """Buffer a completed day, optionally moving the user's current day forward to current_day."""
+        with self._lock:
+            entry = self._entry(user_id, day)
+            if entry['completed_at'] is None:
+                entry['completed_at'] = datetime.utcnow()
+            if current_day is not None:
+                self._current_days[int(user_id)] = max(current_day, self._current_days.get(int(user_id), 0))
+            self._added()
+
+    def pending(self, user_id):
+        """(days completed, highest current day or None) for a user that are not committed yet."""
+        user_id = int(user_id)
+        days = set()
+        current_day = None
+        with self._lock:
+            for pending, current_days in (self._flushing, (self._pending, self._current_days)):
+                days.update(day for day, entry in pending.get(user_id, {}).items() if entry['completed_at'])
+                if user_id in current_days:
+                    current_day = max(current_day or 0, current_days[user_id])
+        return days, current_day
+
+    def flush(self):
+        """Commit everything buffered in one transaction; returns the number of events written."""
+        with self._flush_lock:
+            with self._lock:
+                pending, current_days, events = self._pending, self._current_days, self._events
+                if not events:
+                    return 0
+                self._flushing = (pending, current_days)
+                self._pending, self._current_days, self._events = {}, {}, 0
+
+            try:
+                with self.app.app_context():
+                    self._apply(pending, current_days)
+            except Exception as e:
+                self.failures += 1
+                if self.failures >= self.max_failures:
+                    logger.error(f"Error flushing {events} progress events ({self.failures} failures in a row), "
+                                 f"committing each user's writes separately: {str(e)}")
+                    self.failures = 0
+                    self._apply_each(pending, current_days)
+                    with self._lock:
+                        self._flushing = ({}, {})
+                    return events
+                logger.error(f"Error flushing {events} progress events, will retry: {str(e)}")
+                with self._lock:
+                    # Put the batch back under anything buffered since
+                    for user_id, days in pending.items():
+                        for day, older in days.items():
+                            merge_entry(self._entry(user_id, day), older)
+                    for user_id, day in current_days.items():
+                        self._current_days[user_id] = max(day, self._current_days.get(user_id, 0))
+                    self._events += events
+                    self._flushing = ({}, {})
+                return 0
+
+            self.failures = 0
+            with self._lock:
+                self._flushing = ({}, {})
+            return events
+
+    def _apply_each(self, pending, current_days):
+        """Commit each user's writes in their own transaction, dropping those that still fail."""
+        for user_id in set(pending) | set(current_days):
+            days = {user_id: pending[user_id]} if user_id in pending else {}
+            current_day = {user_id: current_days[user_id]} if user_id in current_days else {}
+            try:
+                with self.app.app_context():
+                    self._apply(days, current_day)
+            except Exception as e:
+                self.dropped += len(days.get(user_id, {})) + len(current_day)
+                logger.error(f"Dropping buffered progress for user {user_id} after repeated failures: "
+                             f"days={days.get(user_id, {})} current_day={current_day.get(user_id)}: {str(e)}")
+
+    def _apply(self, pending, current_days):
+        try:
+            for user_id, days in pending.items():
+                for day, entry in days.items():
+                    if entry['attempts']:
+                        progress_service.record_attempt(user_id, day, entry['passed'], entry['best_time'],
+                                                        attempts=entry['attempts'], at=entry['completed_at'])
+                    if entry['completed_at'] is not None:
+                        progress_service.set_completed(user_id, day, at=entry['completed_at'])
+                    if entry['submission'] is not None:
+                        progress_service.save_submission(user_id, day, **entry['submission'])
+
+            for user_id in set(pending) | set(current_days):
+                progress = Progress.query.filter_by(user_id=user_id).first()
+                if progress is None:
+                    continue
+                if current_days.get(user_id, 0) > (progress.current_day or 0):
+                    progress_service.set_current_day(progress, current_days[user_id])
+                if any(entry['completed_at'] for entry in pending.get(user_id, {}).values()):
+                    progress_service.mirror_completed_days(progress)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        self._stopped = True
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self.flush()
+
+
+_app = None
+_buffer = None
+_buffer_pid = None
+_buffer_lock = threading.Lock()
+
+
+def init_app(app):
+    global _app
+    _app = app
+
+
+def get_buffer():
+    """This process's progress buffer, or None when writes go straight to the database."""
+    global _buffer, _buffer_pid
+    if not PROGRESS_BUFFER['ENABLED'] or _app is None:
+        return None
+    with _buffer_lock:
+        # The flush thread does not survive gunicorn's fork, so each worker starts its own
+        if _buffer is None or _buffer_pid != os.getpid():
+            _buffer = ProgressBuffer(
+                _app,
+                flush_interval=PROGRESS_BUFFER['FLUSH_INTERVAL_MS'] / 1000,
+                max_events=PROGRESS_BUFFER['MAX_EVENTS'],
+                max_failures=PROGRESS_BUFFER['MAX_FLUSH_FAILURES']
+            )
+            _buffer_pid = os.getpid()
+        return _buffer
+
+
+def has_pending(user_id):
+    """Whether this process holds completions or day moves for a user that are not committed yet."""
+    buffer = get_buffer()
+    if buffer is None:
+        return False
+    pending_days, pending_current_day = buffer.pending(user_id)
+    return bool(pending_days) or pending_current_day is not None
+
+
+@atexit.register
+def _flush_at_exit():
+    if _buffer is not None and _buffer_pid == os.getpid():
+        _buffer.close()
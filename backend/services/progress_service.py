@@ -0,0 +1,208 @@
+"""Lesson completion records: which days a user has completed, and how"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert, update
+
+from models import db, LessonCompletion, ProgressSyncKey, ProgressVersion, Submission
+from services import analytics_service, leaderboard_service
+
+# Sync idempotency keys are remembered this long; a client retrying later than that could apply an event twice
+SYNC_KEY_TTL = timedelta(days=30)
+
+
+def completed_days(user_id):
+    """The days the user has completed, in order; one indexed range scan."""
+    rows = (
+        db.session.query(LessonCompletion.day)
+        .filter(LessonCompletion.user_id == int(user_id), LessonCompletion.completed.is_(True))
+        .order_by(LessonCompletion.day)
+    )
+    return [day for (day,) in rows]
+
+
+def version(user_id):
+    """The user's current change version; 0 before their first versioned change."""
+    return db.session.query(ProgressVersion.version).filter_by(user_id=int(user_id)).scalar() or 0
+
+
+def bump_version(user_id):
+    """Advance the user's change version in the caller's transaction and return it.
+
+    The increment happens in SQL, so concurrent writers each get their own version.
+    """
+    user_id = int(user_id)
+    db.session.execute(insert(ProgressVersion).prefix_with('OR IGNORE').values(user_id=user_id, version=0))
+    db.session.execute(
+        update(ProgressVersion).where(ProgressVersion.user_id == user_id)
+        .values(version=ProgressVersion.version + 1)
+    )
+    return version(user_id)
+
+
+def changes_since(user_id, since):
+    """Completion changes after version since, oldest first; one indexed range scan."""
+    rows = (
+        LessonCompletion.query
+        .filter(LessonCompletion.user_id == int(user_id), LessonCompletion.version > since)
+        .order_by(LessonCompletion.version)
+    )
+    return [{
+        'day': row.day,
+        'completed': row.completed,
+        'completed_at': row.completed_at.isoformat() if row.completed_at else None
+    } for row in rows]
+
+
+def set_current_day(progress, day):
+    """Move the user's current day, bumping their change version if it moved; the caller commits."""
+    if day != progress.current_day:
+        analytics_service.current_day_changed(progress.user_id, progress.current_day, day)
+        progress.current_day = day
+        bump_version(progress.user_id)
+
+
+def _completion(user_id, day):
+    completion = LessonCompletion.query.get((int(user_id), int(day)))
+    if completion is None:
+        completion = LessonCompletion(user_id=int(user_id), day=int(day), completed=False, attempts=0)
+        db.session.add(completion)
+    return completion
+
+
+def record_attempt(user_id, day, passed, duration_ms=None, attempts=1, at=None):
+    """Count graded attempts; a passing one completes the day and may set a new best time.
+
+    The caller commits.
+    """
+    completion = _completion(user_id, day)
+    completion.attempts = (completion.attempts or 0) + attempts
+    analytics_service.record_activity(user_id, at)
+    if passed:
+        if not completion.completed:
+            completion.completed = True
+            completion.completed_at = at or datetime.utcnow()
+            completion.version = bump_version(user_id)
+            analytics_service.completion_changed(user_id, day, None, completion.completed_at, False, True)
+            leaderboard_service.completion_changed(user_id, None, completion.completed_at, False, True)
+        if duration_ms is not None and (completion.best_time is None or duration_ms < completion.best_time):
+            completion.best_time = duration_ms
+    return completion
+
+
+def set_completed(user_id, day, completed=True, at=None):
+    """Mark a day completed (keeping the earliest completion time) or not completed; the caller commits.
+
+    A completion with no known time counts as the earliest, so it stays undated.
+    """
+    completion = _completion(user_id, day)
+    previous_at, was_completed = completion.completed_at, bool(completion.completed)
+    if completed and (not was_completed or (at is not None and previous_at is not None and at < previous_at)):
+        completion.completed = True
+        completion.completed_at = at or datetime.utcnow()
+    elif not completed and was_completed:
+        completion.completed = False
+        completion.completed_at = None
+    else:
+        return completion
+    completion.version = bump_version(user_id)
+    analytics_service.completion_changed(user_id, day, previous_at, completion.completed_at,
+                                         was_completed, completion.completed)
+    leaderboard_service.completion_changed(user_id, previous_at, completion.completed_at,
+                                           was_completed, completion.completed)
+    return completion
+
+
+def save_submission(user_id, day, code, version, passed, user_input='', mode='single', at=None):
+    """Keep the submission that counts for (user, day) so it can be re-graded; the caller commits.
+
+    A passing submission is never replaced by a later failing attempt.
+    """
+    submission = Submission.query.filter_by(user_id=user_id, day=int(day)).first()
+    if submission is None:
+        submission = Submission(user_id=user_id, day=int(day))
+        db.session.add(submission)
+    elif submission.passed and not passed:
+        return submission
+    now = at or datetime.utcnow()
+    submission.code = code
+    submission.user_input = user_input
+    submission.mode = mode
+    submission.passed = passed
+    submission.lesson_version = version
+    submission.submitted_at = now
+    submission.graded_at = now
+    return submission
+
+
+def mirror_completed_days(progress):
+    """Copy the completed days into progress.completed_days.
+
+    auth.py still reads the old JSON column with raw SQL; it is written on
+    every change to the table but never read by the API.
+    """
+    progress.completed_days = json.dumps(completed_days(progress.user_id))
+
+
+def parse_client_time(value, now):
+    """An ISO 8601 client timestamp as naive UTC, no later than now; now when missing."""
+    if value is None:
+        return now
+    if not isinstance(value, str):
+        raise ValueError('completed_at must be an ISO 8601 string')
+    # fromisoformat only accepts an explicit offset before Python 3.11
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return min(parsed, now)
+
+
+def apply_sync(progress, events, lesson_exists, now=None):
+    """Apply completion events from /api/progress/sync in the caller's transaction.
+
+    Each event is {"key", "day", "completed_at"}. Events whose key was
+    applied before are counted as duplicates, invalid ones are rejected
+    with a reason, and the rest complete their day at the client's time.
+    Returns (applied, duplicates, rejected).
+    """
+    now = now or datetime.utcnow()
+    user_id = int(progress.user_id)
+    keys = [event.get('key') for event in events if isinstance(event, dict) and isinstance(event.get('key'), str)]
+    seen = {
+        key for (key,) in db.session.query(ProgressSyncKey.key)
+        .filter(ProgressSyncKey.user_id == user_id, ProgressSyncKey.key.in_(keys))
+    } if keys else set()
+
+    applied = 0
+    duplicates = 0
+    rejected = []
+    for index, event in enumerate(events):
+        key = event.get('key') if isinstance(event, dict) else None
+        try:
+            if not isinstance(key, str) or not 0 < len(key) <= 64:
+                raise ValueError('key must be a string of 1 to 64 characters')
+            day = event.get('day')
+            if isinstance(day, bool) or not isinstance(day, int) or not lesson_exists(day):
+                raise ValueError('day is not a lesson')
+            completed_at = parse_client_time(event.get('completed_at'), now)
+        except ValueError as e:
+            rejected.append({'index': index, 'key': key, 'error': str(e)})
+            continue
+
+        if key in seen:
+            duplicates += 1
+            continue
+        seen.add(key)
+        db.session.add(ProgressSyncKey(user_id=user_id, key=key, day=day, applied_at=now))
+        set_completed(user_id, day, at=completed_at)
+        if day >= (progress.current_day or 1):
+            set_current_day(progress, day + 1)
+        applied += 1
+
+    ProgressSyncKey.query.filter(
+        ProgressSyncKey.user_id == user_id, ProgressSyncKey.applied_at < now - SYNC_KEY_TTL
+    ).delete(synchronize_session=False)
+    if applied:
+        mirror_completed_days(progress)
+    return applied, duplicates, rejected
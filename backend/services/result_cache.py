@@ -0,0 +1,136 @@
+"""Content-addressed cache of student code execution results"""
+
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Programs whose output legitimately changes between runs are never cached
+NONDETERMINISTIC_PATTERN = re.compile(r'\b(random|time|datetime|uuid|secrets|urandom|getpid)\b')
+
+
+def normalize_code(code):
+    """Normalize line endings and trailing whitespace at the end of the file.
+
+    Whitespace inside lines is kept because it may sit in a string literal.
+    """
+    return code.replace('\r\n', '\n').replace('\r', '\n').rstrip()
+
+
+def is_cacheable(code):
+    return NONDETERMINISTIC_PATTERN.search(code) is None
+
+
+def lesson_version(lesson):
+    """Short hash of a lesson's test cases and limits; changes whenever they are edited."""
+    exercise = lesson.get('exercise', {}) if lesson else {}
+    encoded = json.dumps(
+        [exercise.get('test_cases', []), exercise.get('limits')], sort_keys=True
+    ).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def make_key(code, stdin_data, day, version):
+    encoded = json.dumps([normalize_code(code), stdin_data, str(day), version]).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ResultCache:
+    """LRU + TTL cache in memory, optionally backed by a SQLite table."""
+
+    def __init__(self, max_entries, ttl, sqlite_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+        self.hits = 0
+        self.misses = 0
+
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute('''
+                CREATE TABLE IF NOT EXISTS result_cache (
+                    key TEXT PRIMARY KEY,
+                    day TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            ''')
+            self._db.execute('CREATE INDEX IF NOT EXISTS idx_result_cache_day ON result_cache(day)')
+            self._db.commit()
+
+    def _remember(self, key, day, result, created_at):
+        self._entries[key] = (str(day), result, created_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._db is not None:
+                row = self._db.execute(
+                    'SELECT day, result, created_at FROM result_cache WHERE key = ?', (key,)
+                ).fetchone()
+                if row:
+                    entry = (row[0], json.loads(row[1]), row[2])
+                    self._remember(key, *entry)
+
+            if entry is None or now - entry[2] > self.ttl:
+                if entry is not None:
+                    self._delete(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def put(self, key, day, result):
+        now = time.time()
+        with self._lock:
+            self._remember(key, day, dict(result), now)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        'INSERT OR REPLACE INTO result_cache (key, day, result, created_at) VALUES (?, ?, ?, ?)',
+                        (key, str(day), json.dumps(result), now)
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.error(f"Error persisting cached result: {str(e)}")
+
+    def _delete(self, key):
+        self._entries.pop(key, None)
+        if self._db is not None:
+            self._db.execute('DELETE FROM result_cache WHERE key = ?', (key,))
+            self._db.commit()
+
+    def invalidate_day(self, day):
+        day = str(day)
+        with self._lock:
+            for key in [k for k, entry in self._entries.items() if entry[0] == day]:
+                del self._entries[key]
+            if self._db is not None:
+                self._db.execute('DELETE FROM result_cache WHERE day = ?', (day,))
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'persistent': self._db is not None,
+                'hits': self.hits,
+                'misses': self.misses
+            }
@@ -0,0 +1,224 @@
+"""Full-text search over lessons, backed by SQLite FTS5"""
+
+import hashlib
+import html
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from services import curriculum_service
+
+logger = logging.getLogger(__name__)
+
+SEARCH_DB_PATH = os.environ.get(
+    'SEARCH_INDEX_DB',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'search_index.db')
+)
+
+# bm25 weights for the indexed columns: title, content, exercise, hint
+COLUMN_WEIGHTS = (10.0, 1.0, 4.0, 2.0)
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+# snippet() brackets matches with these private-use characters; they become
+# <mark> tags only after the lesson text around them has been HTML-escaped
+MATCH_START = '\ue000'
+MATCH_END = '\ue001'
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS search_meta (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS search_docs (
+        id INTEGER PRIMARY KEY,
+        day TEXT UNIQUE NOT NULL,
+        belt TEXT,
+        hash TEXT NOT NULL
+    );
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+        title, content, exercise, hint,
+        tokenize = 'porter unicode61'
+    );
+'''
+
+
+def lesson_document(lesson, reference=None):
+    """The text indexed for a lesson, by column."""
+    exercise = lesson.get('exercise') or {}
+    hints = [exercise.get('hint', '')]
+    if reference and reference.get('hint'):
+        hints.append(reference['hint'])
+    return {
+        'title': lesson.get('title', ''),
+        'content': lesson.get('content', ''),
+        'exercise': '\n'.join(filter(None, [exercise.get('title', ''), exercise.get('description', '')])),
+        'hint': '\n'.join(filter(None, hints))
+    }
+
+
+def highlight(snippet):
+    """An FTS5 snippet as HTML: the lesson text escaped, the matches in <mark> tags."""
+    return html.escape(snippet).replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>')
+
+
+def match_expression(query):
+    """Turn free text into an FTS5 query: every word must appear, the last one as a prefix.
+
+    Words are quoted, so FTS5 operators typed by a student are searched for
+    as text instead of raising syntax errors.
+    """
+    tokens = TOKEN_PATTERN.findall(query)
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+class SearchIndex:
+    """FTS5 index of the curriculum, kept in step with the curriculum snapshot.
+
+    Each lesson's indexed text is hashed; when the curriculum changes only
+    the lessons whose hash changed are rewritten, and lessons that are gone
+    are deleted. The snapshot digest the index was built from is stored in
+    the database, so the API processes sharing the file sync it only once
+    per change.
+    """
+
+    def __init__(self, path=SEARCH_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._sync_lock = threading.Lock()
+        self._synced_digest = None
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=10)
+        db.execute('PRAGMA journal_mode=WAL')
+        return db
+
+    def _reader(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = self._connect()
+            self._local.db = db
+        return db
+
+    def sync(self, snapshot):
+        """Bring the index up to date with snapshot; returns (added or changed, removed)."""
+        with self._sync_lock:
+            if self._synced_digest == snapshot.digest:
+                return 0, 0
+            db = self._connect()
+            try:
+                with db:
+                    # BEGIN IMMEDIATE makes other processes wait instead of syncing at the same time
+                    db.execute('BEGIN IMMEDIATE')
+                    row = db.execute("SELECT value FROM search_meta WHERE key = 'digest'").fetchone()
+                    if row and row[0] == snapshot.digest:
+                        self._synced_digest = snapshot.digest
+                        return 0, 0
+
+                    existing = {day: (doc_id, doc_hash) for doc_id, day, doc_hash
+                                in db.execute('SELECT id, day, hash FROM search_docs')}
+                    changed = 0
+                    seen = set()
+                    for day in snapshot.days():
+                        lesson, belt = snapshot.lesson(day)
+                        document = lesson_document(lesson, snapshot.reference(day))
+                        belt_name = belt.get('name') if belt else None
+                        doc_hash = hashlib.sha256(json.dumps([document, belt_name], sort_keys=True)
+                                                  .encode('utf-8')).hexdigest()
+                        key = str(day)
+                        seen.add(key)
+                        current = existing.get(key)
+                        if current and current[1] == doc_hash:
+                            continue
+                        if current:
+                            db.execute('DELETE FROM search_fts WHERE rowid = ?', (current[0],))
+                            db.execute('UPDATE search_docs SET belt = ?, hash = ? WHERE id = ?',
+                                       (belt_name, doc_hash, current[0]))
+                            doc_id = current[0]
+                        else:
+                            doc_id = db.execute('INSERT INTO search_docs (day, belt, hash) VALUES (?, ?, ?)',
+                                                (key, belt_name, doc_hash)).lastrowid
+                        db.execute(
+                            'INSERT INTO search_fts (rowid, title, content, exercise, hint) VALUES (?, ?, ?, ?, ?)',
+                            (doc_id, document['title'], document['content'], document['exercise'], document['hint'])
+                        )
+                        changed += 1
+
+                    removed = [(doc_id,) for day, (doc_id, _) in existing.items() if day not in seen]
+                    db.executemany('DELETE FROM search_fts WHERE rowid = ?', removed)
+                    db.executemany('DELETE FROM search_docs WHERE id = ?', removed)
+                    db.execute("INSERT OR REPLACE INTO search_meta (key, value) VALUES ('digest', ?)",
+                               (snapshot.digest,))
+            finally:
+                db.close()
+
+            self._synced_digest = snapshot.digest
+            if changed or removed:
+                logger.info(f"Search index updated: {changed} lessons indexed, {len(removed)} removed")
+            return changed, len(removed)
+
+    def search(self, query, limit=10, belt=None):
+        """Ranked matches for a free-text query, best first, with highlighted snippets."""
+        expression = match_expression(query)
+        if expression is None:
+            return []
+
+        sql = f'''
+            SELECT d.day, d.belt, f.title,
+                   snippet(search_fts, -1, ?, ?, '…', 12),
+                   bm25(search_fts, {', '.join(str(w) for w in COLUMN_WEIGHTS)}) AS rank
+            FROM search_fts AS f JOIN search_docs AS d ON d.id = f.rowid
+            WHERE search_fts MATCH ?
+        '''
+        params = [MATCH_START, MATCH_END, expression]
+        if belt:
+            sql += ' AND d.belt = ?'
+            params.append(belt)
+        sql += ' ORDER BY rank LIMIT ?'
+        params.append(limit)
+
+        results = []
+        for day, belt_name, title, snippet, rank in self._reader().execute(sql, params):
+            results.append({
+                'day': curriculum_service.day_key(day),
+                'title': title,
+                'belt': belt_name,
+                'snippet': highlight(snippet),
+                # bm25 is lower for better matches; flip it so higher is better
+                'score': round(-rank, 4)
+            })
+        return results
+
+
+_index = None
+_index_pid = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """This process's search index; connections are never shared across a fork."""
+    global _index, _index_pid
+    with _index_lock:
+        if _index is None or _index_pid != os.getpid():
+            _index = SearchIndex()
+            _index_pid = os.getpid()
+        return _index
+
+
+def search(query, limit=10, belt=None):
+    """Search the current curriculum; returns (results, milliseconds taken)."""
+    started = time.perf_counter()
+    index = get_index()
+    index.sync(curriculum_service.get_index().snapshot())
+    results = index.search(query, limit=limit, belt=belt)
+    return results, round((time.perf_counter() - started) * 1000, 2)
@@ -1,6 +1,8 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import db, User, Progress
+from services import progress_service
+from services.delta_sync import can_sync_since, no_changes, with_sync_version
 from datetime import datetime
 from functools import wraps
 
@@ -60,18 +62,35 @@ def get_progress():
         
         if not progress:
             return jsonify({
+                'version': 0,
                 'current_belt': 'white',
                 'current_day': 1,
                 'completed_lessons': [],
                 'progress_percentage': 0
             }), 200
-            
-        return jsonify({
+
+        # ?since=<version> returns only the lessons completed or uncompleted after it
+        version = progress_service.version(current_user_id)
+        since = request.args.get('since', type=int)
+        if can_sync_since(current_user_id, since, version):
+            if since == version:
+                return no_changes(version)
+            return with_sync_version(jsonify({
+                'version': version,
+                'since': since,
+                'current_belt': progress.current_belt,
+                'current_day': progress.current_day,
+                'changes': progress_service.changes_since(current_user_id, since),
+                'progress_percentage': (progress.current_day / 100) * 100
+            }), version), 200
+
+        return with_sync_version(jsonify({
+            'version': version,
             'current_belt': progress.current_belt,
             'current_day': progress.current_day,
-            'completed_lessons': progress.completed_lessons,
+            'completed_lessons': progress_service.completed_days(current_user_id),
             'progress_percentage': (progress.current_day / 100) * 100
-        }), 200
+        }), version), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -88,15 +107,16 @@ def update_progress():
                 user_id=current_user_id,
                 current_belt='white',
                 current_day=1,
-                completed_lessons=[]
+                completed_days='[]'
             )
             db.session.add(progress)
         
         if 'completed_lesson' in data:
             lesson_day = data['completed_lesson']
-            if lesson_day not in progress.completed_lessons:
-                progress.completed_lessons.append(lesson_day)
-                progress.current_day = max(progress.current_day, lesson_day + 1)
+            if lesson_day not in progress_service.completed_days(current_user_id):
+                progress_service.set_completed(current_user_id, lesson_day)
+                progress_service.mirror_completed_days(progress)
+                progress_service.set_current_day(progress, max(progress.current_day, lesson_day + 1))
                 
                 # Update belt based on progress
                 if lesson_day >= 96:
@@ -123,7 +143,7 @@ def update_progress():
             'message': 'Progress updated successfully',
             'current_belt': progress.current_belt,
             'current_day': progress.current_day,
-            'completed_lessons': progress.completed_lessons
+            'completed_lessons': progress_service.completed_days(current_user_id)
         }), 200
     except Exception as e:
         db.session.rollback()
@@ -0,0 +1,92 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The backend imports its modules from its own directory (from services import ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# curriculum_edits fixes its database path at import, so point it at a scratch
+# file before anything imports it; the app fixture uses the same file
+os.environ['CURRICULUM_EDITS_DB'] = os.path.join(tempfile.mkdtemp(prefix='hackdojo-tests-'), 'hackdojo.db')
+
+
+class ProgressRow:
+    """Stands in for a user_progress row, which the Progress model does not map."""
+
+    def __init__(self, user_id, current_day=1):
+        self.user_id = user_id
+        self.current_day = current_day
+        self.completed_days = '[]'
+
+
+class ProgressRows:
+    """Progress.query for the routes: filter_by(user_id=...).first() over ProgressRow objects."""
+
+    def __init__(self):
+        self.rows = {}
+
+    def add(self, user_id, current_day=1):
+        self.rows[str(user_id)] = ProgressRow(user_id, current_day)
+        return self.rows[str(user_id)]
+
+    def filter_by(self, user_id):
+        row = self.rows.get(str(user_id))
+        return type('Result', (), {'first': lambda self: row})()
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """The API app on empty tables, with its own curriculum snapshot and leaderboard."""
+    import app as app_module
+    from models import db
+    from services import curriculum_edits, curriculum_service, leaderboard_service
+
+    flask_app = app_module.app
+    flask_app.config['TESTING'] = True
+    flask_app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{curriculum_edits.EDITS_DB_PATH}'
+    with flask_app.app_context():
+        db.drop_all()
+        db.create_all()
+        monkeypatch.setattr(curriculum_service, '_index', curriculum_service.CurriculumIndex(
+            snapshot_path=str(tmp_path / 'curriculum.snapshot'), edits_path=curriculum_edits.EDITS_DB_PATH))
+        monkeypatch.setattr(leaderboard_service, '_index', None)
+        yield flask_app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def progress_rows(app, monkeypatch):
+    import app as app_module
+
+    rows = ProgressRows()
+    monkeypatch.setattr(app_module.Progress, 'query', rows)
+    return rows
+
+
+@pytest.fixture
+def auth_headers(app):
+    from flask_jwt_extended import create_access_token
+
+    def make(user_id, role='student'):
+        token = create_access_token(identity=str(user_id), additional_claims={'role': role})
+        return {'Authorization': f'Bearer {token}'}
+    return make
+
+
+@pytest.fixture
+def users(app):
+    """Adds users by id and role."""
+    from models import db, User
+
+    def add(*ids, role='student'):
+        for user_id in ids:
+            db.session.add(User(id=user_id, email=f'user{user_id}@example.com', password='x', role=role))
+        db.session.commit()
+    return add
@@ -0,0 +1,61 @@
+def lesson(day, **fields):
+    return dict({
+        'day': day,
+        'title': 'Loops Again',
+        'content': 'Practice loops.',
+        'exercise_title': 'Count',
+        'exercise_description': 'Print 1 to 3.',
+        'exercise_hint': 'Use range.',
+        'starter_code': '',
+        'test_cases': [{'expected': '1\n2\n3\n'}],
+    }, **fields)
+
+
+def test_new_lesson_is_served_right_away(client, auth_headers):
+    admin = auth_headers(1, role='admin')
+    response = client.post('/api/admin/lessons', json=lesson(31, expected_version=0), headers=admin)
+    assert response.status_code == 200
+    assert response.get_json()['version'] == 1
+
+    content = client.get('/api/lesson/31/content', headers=auth_headers(2))
+    assert content.status_code == 200
+    assert content.get_json()['title'] == 'Loops Again'
+
+
+def test_stale_expected_version_is_a_conflict(client, auth_headers):
+    admin = auth_headers(1, role='admin')
+    assert client.post('/api/admin/lessons', json=lesson(31, expected_version=0), headers=admin).status_code == 200
+
+    response = client.post('/api/admin/lessons', json=lesson(31, title='Other', expected_version=0), headers=admin)
+    assert response.status_code == 409
+    assert response.get_json()['current_version'] == 1
+
+    response = client.post('/api/admin/lessons', json=lesson(31, title='Other', expected_version=1), headers=admin)
+    assert response.status_code == 200
+    assert response.get_json()['version'] == 2
+
+    history = client.get('/api/admin/lessons/31/history', headers=admin).get_json()
+    assert [(entry['version'], entry['lesson']['title']) for entry in history['versions']] == \
+        [(2, 'Other'), (1, 'Loops Again')]
+
+
+def test_without_expected_version_the_write_always_wins(client, auth_headers):
+    admin = auth_headers(1, role='admin')
+    client.post('/api/admin/lessons', json=lesson(31), headers=admin)
+    response = client.post('/api/admin/lessons', json=lesson(31), headers=admin)
+    assert response.get_json()['version'] == 2
+
+
+def test_invalid_lessons_are_rejected(client, auth_headers):
+    admin = auth_headers(1, role='admin')
+    assert client.post('/api/admin/lessons', json=lesson(500), headers=admin).status_code == 400
+    bad_regex = lesson(31, test_cases=[{'match': 'regex', 'pattern': '('}])
+    response = client.post('/api/admin/lessons', json=bad_regex, headers=admin)
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith('Test case 1')
+    assert client.get('/api/admin/lessons/31/history', headers=admin).get_json()['versions'] == []
+
+
+def test_students_cannot_edit_lessons(client, auth_headers):
+    response = client.post('/api/admin/lessons', json=lesson(31), headers=auth_headers(2))
+    assert response.status_code == 403
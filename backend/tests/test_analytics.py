@@ -0,0 +1,97 @@
+from datetime import datetime
+
+from sqlalchemy import text
+
+MAY_1 = datetime(2024, 5, 1, 9, 0)
+MAY_2 = datetime(2024, 5, 2, 9, 0)
+
+
+def rollups():
+    from models import DailyRollup, LessonRollup
+
+    return (
+        {row.date.isoformat(): (row.active_users, row.completions) for row in DailyRollup.query},
+        {row.day: row.completions for row in LessonRollup.query if row.completions},
+    )
+
+
+def test_attempts_and_completions_move_the_rollups(app, users):
+    from models import db
+    from services import progress_service
+
+    users(1, 2)
+    progress_service.record_attempt(1, 1, passed=False, at=MAY_1)
+    progress_service.record_attempt(1, 1, passed=True, at=MAY_1)
+    progress_service.record_attempt(2, 1, passed=True, at=MAY_2)
+    progress_service.record_attempt(2, 2, passed=True, at=MAY_2)
+    db.session.commit()
+    assert rollups() == ({'2024-05-01': (1, 1), '2024-05-02': (1, 2)}, {1: 2, 2: 1})
+
+    # An earlier completion time moves the completion to that date
+    progress_service.set_completed(2, 2, at=MAY_1)
+    db.session.commit()
+    assert rollups() == ({'2024-05-01': (2, 2), '2024-05-02': (1, 1)}, {1: 2, 2: 1})
+
+    progress_service.set_completed(2, 2, completed=False)
+    db.session.commit()
+    assert rollups() == ({'2024-05-01': (2, 1), '2024-05-02': (1, 1)}, {1: 2})
+
+
+def test_undated_completions_count_only_towards_their_lesson(app, users):
+    from models import db, LessonCompletion, LessonRollup
+    from services import progress_service
+
+    users(1)
+    db.session.add(LessonCompletion(user_id=1, day=1, completed=True, completed_at=None, attempts=1))
+    db.session.add(LessonRollup(day=1, completions=1))
+    db.session.commit()
+
+    # Completing it again keeps it undated
+    progress_service.set_completed(1, 1, at=MAY_1)
+    db.session.commit()
+    assert rollups() == ({}, {1: 1})
+
+    progress_service.set_completed(1, 1, completed=False)
+    db.session.commit()
+    assert rollups() == ({}, {})
+
+
+def test_only_students_move_between_belts(app, users):
+    from models import db, BeltRollup
+    from services import analytics_service
+
+    users(1)
+    users(2, role='admin')
+    analytics_service.current_day_changed(1, 5, 15)
+    analytics_service.current_day_changed(2, 5, 15)
+    analytics_service.current_day_changed(1, 15, 16)
+    db.session.commit()
+    assert {row.belt: row.students for row in BeltRollup.query} == {'White Belt': -1, 'Yellow Belt': 1}
+
+
+def test_backfill_matches_the_incremental_rollups(app, users):
+    from models import db
+    from services import analytics_service, progress_service
+
+    users(1, 2)
+    users(3, role='parent')
+    for user_id, day, at in ((1, 1, MAY_1), (1, 2, MAY_2), (2, 1, MAY_2)):
+        progress_service.record_attempt(user_id, day, passed=True, at=at)
+    progress_service.record_attempt(2, 2, passed=False, at=MAY_2)
+    db.session.commit()
+    incremental = rollups()
+
+    # Read with raw SQL only, so there is no model to create it
+    db.session.execute(text('CREATE TABLE IF NOT EXISTS user_progress (user_id INTEGER, current_day INTEGER)'))
+    db.session.execute(text('DELETE FROM user_progress'))
+    db.session.execute(text('INSERT INTO user_progress VALUES (1, 3), (2, 15), (3, 1)'))
+    analytics_service.backfill()
+    db.session.commit()
+    assert rollups() == incremental
+
+    summary = analytics_service.summary(now=MAY_2)
+    assert summary['user_stats'] == {'total_users': 3, 'students': 2, 'parents': 1,
+                                     'by_role': {'student': 2, 'parent': 1}}
+    assert summary['activity']['last_30_days'] == 3
+    assert summary['activity']['active_users_today'] == 2
+    assert summary['completion']['belt_distribution'] == {'White Belt': 1, 'Yellow Belt': 1}
@@ -0,0 +1,72 @@
+from services.delta_sync import SYNC_VERSION_HEADER
+
+
+def get_curriculum(client, headers, since=None):
+    return client.get('/api/curriculum', query_string={'since': since} if since is not None else {}, headers=headers)
+
+
+def delta_days(response):
+    body = response.get_json()
+    assert body['delta'] is True
+    return {lesson['day']: (lesson['is_completed'], lesson['is_accessible']) for lesson in body['lessons']}
+
+
+def test_unchanged_curriculum_is_a_204(client, users, progress_rows, auth_headers):
+    users(1)
+    progress_rows.add(1)
+    headers = auth_headers(1)
+    full = get_curriculum(client, headers)
+    assert full.status_code == 200
+    assert 'belts' in full.get_json()
+
+    version = full.headers[SYNC_VERSION_HEADER]
+    unchanged = get_curriculum(client, headers, since=version)
+    assert unchanged.status_code == 204
+    assert unchanged.headers[SYNC_VERSION_HEADER] == version
+
+
+def test_completion_sends_only_the_changed_days(app, client, users, progress_rows, auth_headers):
+    from models import db
+    from services import progress_service
+
+    users(1)
+    progress_rows.add(1)
+    headers = auth_headers(1)
+    version = get_curriculum(client, headers).headers[SYNC_VERSION_HEADER]
+
+    progress_service.set_completed(1, 1)
+    db.session.commit()
+    response = get_curriculum(client, headers, since=version)
+    assert response.status_code == 200
+    # Day 1 is now completed and day 2, which it gates, is now open
+    assert delta_days(response) == {1: (True, True), 2: (False, True)}
+    assert response.headers[SYNC_VERSION_HEADER] != version
+
+
+def test_lesson_edit_sends_the_edited_day(client, users, progress_rows, auth_headers):
+    users(1)
+    progress_rows.add(1)
+    headers = auth_headers(1)
+    version = get_curriculum(client, headers).headers[SYNC_VERSION_HEADER]
+
+    edit = {'day': 5, 'title': 'Edited', 'content': '', 'exercise_title': '', 'exercise_description': '',
+            'exercise_hint': '', 'starter_code': '', 'test_cases': []}
+    assert client.post('/api/admin/lessons', json=edit, headers=auth_headers(9, role='admin')).status_code == 200
+    response = get_curriculum(client, headers, since=version)
+    # Day 6 comes along because day 5 gates it
+    assert set(delta_days(response)) == {5, 6}
+    assert response.get_json()['lessons'][0]['title'] == 'Edited'
+
+
+def test_unusable_since_gets_the_full_curriculum(client, users, progress_rows, auth_headers):
+    users(1)
+    progress_rows.add(1)
+    headers = auth_headers(1)
+    version = get_curriculum(client, headers).headers[SYNC_VERSION_HEADER]
+    digest, revision, progress_version, day = version.split('.')
+
+    for since in ('garbage', f'000000000000.{revision}.{progress_version}.{day}',
+                  f'{digest}.{revision}.{int(progress_version) + 5}.{day}'):
+        response = get_curriculum(client, headers, since=since)
+        assert response.status_code == 200
+        assert 'belts' in response.get_json()
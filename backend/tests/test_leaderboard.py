@@ -0,0 +1,179 @@
+import random
+from datetime import date, datetime, timedelta
+
+from services.leaderboard_service import LeaderboardIndex, ScoreCounts, current_streak, streaks
+
+TODAY = date(2024, 5, 10)
+
+
+def days(*offsets):
+    return [TODAY + timedelta(days=offset) for offset in offsets]
+
+
+def test_streaks_of_no_dates():
+    assert streaks([]) == (0, 0)
+
+
+def test_streaks_current_ends_at_last_date():
+    assert streaks(days(-9, -8, -7, -3, -2)) == (2, 3)
+    assert streaks(days(-9, -8, -5, -4, -3, -2)) == (4, 4)
+    assert streaks(days(-2)) == (1, 1)
+
+
+def test_current_streak_lapses_after_a_missed_day():
+    assert current_streak(5, TODAY, TODAY) == 5
+    assert current_streak(5, TODAY - timedelta(days=1), TODAY) == 5
+    assert current_streak(5, TODAY - timedelta(days=2), TODAY) == 0
+    assert current_streak(5, None, TODAY) == 0
+
+
+def test_score_counts_grow_without_losing_counts():
+    counts = ScoreCounts(size=4)
+    counts.add(1, 2)
+    counts.add(3, 1)
+    counts.add(300, 1)
+    assert counts.count_at(1) == 2
+    assert counts.count_at(3) == 1
+    assert counts.count_at(300) == 1
+    assert counts.count_below(300) == 3
+    assert counts.total() == 4
+
+
+def row(user_id, score, seq, reached_at=None, current=1, longest=1, last_active=TODAY):
+    return (user_id, score, reached_at or datetime(2024, 5, 1), current, longest, last_active, seq)
+
+
+def test_rank_orders_by_score_then_reached_at():
+    index = LeaderboardIndex()
+    index.apply([
+        row(1, 5, 1, datetime(2024, 5, 2)),
+        row(2, 7, 2, datetime(2024, 5, 3)),
+        row(3, 5, 3, datetime(2024, 5, 1)),
+    ])
+    assert [entry['user_id'] for entry in index.top(10, TODAY)] == [2, 3, 1]
+    assert index.rank(1, TODAY)['rank'] == 3
+    assert index.rank(4, TODAY) is None
+    assert index.seq == 3
+
+
+def test_rank_reports_lapsed_streak():
+    index = LeaderboardIndex()
+    index.apply([row(1, 3, 1, current=4, longest=6, last_active=TODAY - timedelta(days=3))])
+    assert index.rank(1, TODAY) == {'rank': 1, 'user_id': 1, 'score': 3, 'current_streak': 0, 'longest_streak': 6}
+
+
+def test_stale_rows_are_ignored():
+    index = LeaderboardIndex()
+    index.apply([row(1, 4, 5)])
+    index.apply([row(1, 3, 4)])
+    assert index.rank(1, TODAY)['score'] == 4
+
+
+def test_score_zero_removes_user():
+    index = LeaderboardIndex()
+    index.apply([row(1, 2, 1), row(2, 1, 2)])
+    index.apply([row(1, 0, 3)])
+    assert index.rank(1, TODAY) is None
+    assert index.rank(2, TODAY)['rank'] == 1
+    assert index.size() == 1
+
+
+def test_top_respects_limit():
+    index = LeaderboardIndex()
+    index.apply([row(user_id, user_id, user_id) for user_id in range(1, 6)])
+    assert [entry['user_id'] for entry in index.top(2, TODAY)] == [5, 4]
+    assert [entry['rank'] for entry in index.top(2, TODAY)] == [1, 2]
+
+
+def test_ranks_match_a_full_sort():
+    rng = random.Random(7)
+    index = LeaderboardIndex()
+    rows = {}
+    for seq in range(1, 2001):
+        user_id = rng.randrange(1, 300)
+        reached_at = datetime(2024, 1, 1) + timedelta(minutes=rng.randrange(100000))
+        rows[user_id] = row(user_id, rng.randrange(0, 400), seq, reached_at)
+        index.apply([rows[user_id]])
+
+    ranked = sorted((r for r in rows.values() if r[1] > 0), key=lambda r: (-r[1], r[2], r[0]))
+    assert index.size() == len(ranked)
+    assert [entry['user_id'] for entry in index.top(len(ranked) + 1, TODAY)] == [r[0] for r in ranked]
+    for position, r in enumerate(ranked, 1):
+        assert index.rank(r[0], TODAY)['rank'] == position
+
+
+def at(day):
+    return datetime(2024, 5, day, 9, 0)
+
+
+def entry(user_id):
+    from models import LeaderboardEntry
+
+    row = LeaderboardEntry.query.get(user_id)
+    return row.score, row.current_streak, row.longest_streak, row.last_active_date
+
+
+def test_completions_keep_score_and_streaks(app, users):
+    from models import db
+    from services import progress_service
+
+    users(1)
+    for day, on in ((1, 1), (2, 2), (3, 2), (4, 5)):
+        progress_service.record_attempt(1, day, passed=True, at=at(on))
+        db.session.commit()
+    assert entry(1) == (4, 1, 2, date(2024, 5, 5))
+
+    # A backdated completion joins the runs around it, so the streaks are recounted
+    progress_service.set_completed(1, 5, at=at(3))
+    progress_service.set_completed(1, 6, at=at(4))
+    db.session.commit()
+    assert entry(1) == (6, 5, 5, date(2024, 5, 5))
+
+    progress_service.set_completed(1, 5, completed=False)
+    db.session.commit()
+    assert entry(1) == (5, 2, 2, date(2024, 5, 5))
+
+
+def test_undated_completions_count_only_towards_the_score(app, users):
+    from models import db, LeaderboardEntry, LessonCompletion
+    from services import progress_service
+
+    users(1)
+    db.session.add(LessonCompletion(user_id=1, day=1, completed=True, completed_at=None, attempts=1))
+    db.session.add(LeaderboardEntry(user_id=1, score=1, current_streak=0, longest_streak=0, seq=1))
+    db.session.commit()
+
+    progress_service.record_attempt(1, 2, passed=True, at=at(1))
+    db.session.commit()
+    assert entry(1) == (2, 1, 1, date(2024, 5, 1))
+
+    progress_service.set_completed(1, 1, completed=False)
+    db.session.commit()
+    assert entry(1) == (1, 1, 1, date(2024, 5, 1))
+
+
+def test_leaderboard_route_ranks_users(client, users, auth_headers):
+    from models import db
+    from services import progress_service
+
+    users(1, 2, 3)
+    now = datetime.utcnow()
+    for user_id, days in ((1, 1), (2, 3), (3, 2)):
+        for day in range(1, days + 1):
+            progress_service.record_attempt(user_id, day, passed=True, at=now - timedelta(days=days - day))
+        db.session.commit()
+
+    body = client.get('/api/leaderboard', headers=auth_headers(3)).get_json()
+    assert [(row['user_id'], row['score'], row['current_streak']) for row in body['top']] == \
+        [(2, 3, 3), (3, 2, 2), (1, 1, 1)]
+    assert body['me']['rank'] == 2
+    assert body['total'] == 3
+
+    # The index catches up with rows written after it was built
+    progress_service.set_completed(1, 2, at=now)
+    progress_service.set_completed(1, 3, at=now)
+    progress_service.set_completed(1, 4, at=now)
+    db.session.commit()
+    body = client.get('/api/leaderboard', query_string={'limit': 1}, headers=auth_headers(3)).get_json()
+    assert [row['user_id'] for row in body['top']] == [1]
+    assert body['me']['rank'] == 3
@@ -0,0 +1,92 @@
+import pytest
+
+from services import output_matchers
+from services.output_matchers import AnyOf, build_matcher, compile_test_case
+
+
+def run(spec, *chunks):
+    """(whether every chunk was accepted, final verdict) for output fed in chunks."""
+    matcher = build_matcher(spec)
+    accepted = all([matcher.feed(chunk) for chunk in chunks])
+    return accepted, matcher.finish()
+
+
+def test_compile_defaults_to_exact():
+    assert compile_test_case({'expected': 'hi\n'}) == {'mode': 'exact', 'expected': 'hi\n'}
+
+
+def test_compile_contains_from_legacy_field():
+    spec = compile_test_case({'expected_output_contains': 'Hello'})
+    assert spec == {'mode': 'contains', 'expected': ['Hello']}
+
+
+def test_compile_numeric_has_default_tolerance():
+    assert compile_test_case({'match': 'numeric', 'expected': '3.14'})['tolerance'] == 1e-6
+
+
+def test_compile_rejects_unknown_mode():
+    with pytest.raises(ValueError, match='Unknown match mode'):
+        compile_test_case({'match': 'fuzzy', 'expected': 'x'})
+
+
+def test_compile_rejects_invalid_regex():
+    with pytest.raises(ValueError, match='Invalid pattern'):
+        compile_test_case({'match': 'regex', 'pattern': '('})
+
+
+def test_exact_across_chunks():
+    assert run({'mode': 'exact', 'expected': 'hello world\n'}, 'hel', 'lo wor', 'ld\n') == (True, True)
+
+
+def test_exact_fails_on_first_wrong_chunk():
+    matcher = build_matcher({'mode': 'exact', 'expected': 'hello\n'})
+    assert matcher.feed('help') is False
+    assert matcher.feed('o\n') is False
+    assert matcher.finish() is False
+
+
+def test_exact_rejects_missing_tail():
+    assert run({'mode': 'exact', 'expected': 'hello\n'}, 'hello') == (True, False)
+
+
+def test_whitespace_ignores_spacing_and_token_splits():
+    assert run({'mode': 'whitespace', 'expected': 'a  b\nc'}, ' a b', '\n\nc  \n') == (True, True)
+    assert run({'mode': 'whitespace', 'expected': 'hello world'}, 'hel', 'lo wo', 'rld') == (True, True)
+
+
+def test_whitespace_fails_early_on_impossible_prefix():
+    matcher = build_matcher({'mode': 'whitespace', 'expected': 'hello world'})
+    assert matcher.feed('hex') is False
+
+
+def test_numeric_tolerance():
+    spec = {'mode': 'numeric', 'expected': 'pi 3.14159', 'tolerance': 1e-3}
+    assert run(spec, 'pi 3.1416\n') == (True, True)
+    assert run(spec, 'pi 3.2\n')[1] is False
+
+
+def test_contains_finds_strings_split_across_chunks():
+    spec = {'mode': 'contains', 'expected': ['Hello', 'World']}
+    assert run(spec, 'He', 'llo, Wo', 'rld!') == (True, True)
+    assert run(spec, 'Hello there') == (True, False)
+
+
+def test_regex_is_multiline():
+    assert run({'mode': 'regex', 'pattern': r'^Total: \d+$'}, 'Items\nTotal: ', '42\n') == (True, True)
+
+
+def test_any_of_passes_if_one_matcher_passes():
+    matcher = AnyOf([{'mode': 'exact', 'expected': 'yes\n'}, {'mode': 'exact', 'expected': 'no\n'}])
+    assert matcher.feed('no\n') is True
+    assert matcher.finish() is True
+
+
+def test_any_of_fails_early_once_all_fail():
+    matcher = AnyOf([{'mode': 'exact', 'expected': 'yes\n'}, {'mode': 'exact', 'expected': 'no\n'}])
+    assert matcher.feed('maybe') is False
+    assert matcher.finish() is False
+
+
+def test_spec_digest_ignores_key_order():
+    assert output_matchers.spec_digest([{'mode': 'exact', 'expected': 'a'}]) == \
+        output_matchers.spec_digest([{'expected': 'a', 'mode': 'exact'}])
@@ -0,0 +1,131 @@
+import contextlib
+from datetime import datetime
+
+import pytest
+
+from services.progress_buffer import ProgressBuffer, merge_entry, new_entry
+
+
+class FakeApp:
+    def app_context(self):
+        return contextlib.nullcontext()
+
+
+@pytest.fixture
+def buffer():
+    # Long interval and high event cap, so only the test flushes
+    buffer = ProgressBuffer(FakeApp(), flush_interval=3600, max_events=10000, max_failures=2)
+    yield buffer
+    buffer._apply = lambda pending, current_days: None
+    buffer.close()
+
+
+def entry(**fields):
+    return dict(new_entry(), **fields)
+
+
+def test_merge_sums_attempts_and_keeps_passed():
+    merged = entry(attempts=2, passed=False)
+    merge_entry(merged, entry(attempts=3, passed=True))
+    assert merged['attempts'] == 5
+    assert merged['passed'] is True
+
+
+def test_merge_keeps_earliest_completion_and_best_time():
+    merged = entry(completed_at=datetime(2024, 5, 2), best_time=900)
+    merge_entry(merged, entry(completed_at=datetime(2024, 5, 1), best_time=1200))
+    assert merged['completed_at'] == datetime(2024, 5, 1)
+    assert merged['best_time'] == 900
+
+    merged = entry()
+    merge_entry(merged, entry(completed_at=datetime(2024, 5, 1), best_time=1200))
+    assert merged['completed_at'] == datetime(2024, 5, 1)
+    assert merged['best_time'] == 1200
+
+
+def test_merge_never_replaces_passing_submission_with_failing_one():
+    passing, failing = {'code': 'ok', 'passed': True}, {'code': 'bad', 'passed': False}
+
+    merged = entry(submission=failing)
+    merge_entry(merged, entry(submission=passing))
+    assert merged['submission'] is passing
+
+    merged = entry(submission=passing)
+    merge_entry(merged, entry(submission=failing))
+    assert merged['submission'] is passing
+
+    merged = entry(submission={'code': 'newer', 'passed': False})
+    merge_entry(merged, entry(submission=failing))
+    assert merged['submission']['code'] == 'newer'
+
+
+def test_pending_includes_buffered_completions(buffer):
+    buffer.complete(1, 3, current_day=4)
+    buffer.record_attempt(1, 4, passed=False)
+    assert buffer.pending(1) == ({3}, 4)
+    assert buffer.pending(2) == (set(), None)
+
+
+def test_failed_flush_is_put_back_and_retried(buffer):
+    applied = []
+
+    def fail(pending, current_days):
+        raise RuntimeError('database is locked')
+
+    buffer._apply = fail
+    buffer.record_attempt(1, 3, passed=True, duration_ms=500)
+    assert buffer.flush() == 0
+    assert buffer.pending(1) == ({3}, None)
+
+    buffer.record_attempt(1, 3, passed=False)
+    buffer._apply = lambda pending, current_days: applied.append(pending)
+    assert buffer.flush() == 2
+    assert applied[0][1][3]['attempts'] == 2
+    assert applied[0][1][3]['best_time'] == 500
+    assert buffer.failures == 0
+    assert buffer.pending(1) == (set(), None)
+
+
+def test_repeated_failures_drop_only_the_failing_user(buffer):
+    applied = []
+
+    def apply(pending, current_days):
+        if 2 in pending:
+            raise RuntimeError('constraint failed')
+        applied.extend(pending)
+
+    buffer._apply = apply
+    buffer.complete(1, 3)
+    buffer.complete(2, 3)
+    assert buffer.flush() == 0
+    assert buffer.flush() == 2
+    assert applied == [1]
+    assert buffer.dropped == 1
+    assert buffer.pending(1) == (set(), None)
+    assert buffer.pending(2) == (set(), None)
+
+
+def test_flush_writes_buffered_progress_to_the_database(app, users):
+    from models import LessonCompletion, LessonRollup, Submission
+    from services import progress_service
+
+    users(1)
+    buffer = ProgressBuffer(app, flush_interval=3600, max_events=10000)
+    try:
+        buffer.record_attempt(1, 3, passed=False, submission={'code': 'print(1)', 'version': 'v1'})
+        buffer.record_attempt(1, 3, passed=True, duration_ms=800, submission={'code': 'print(2)', 'version': 'v1'})
+        buffer.record_attempt(1, 3, passed=False, submission={'code': 'print(3)', 'version': 'v1'})
+        buffer.complete(1, 4)
+        assert progress_service.completed_days(1) == []
+        assert buffer.flush() == 4
+    finally:
+        buffer.close()
+
+    assert progress_service.completed_days(1) == [3, 4]
+    completion = LessonCompletion.query.get((1, 3))
+    assert completion.attempts == 3
+    assert completion.best_time == 800
+    submission = Submission.query.filter_by(user_id=1, day=3).one()
+    assert (submission.code, submission.passed) == ('print(2)', True)
+    assert {row.day: row.completions for row in LessonRollup.query} == {3: 1, 4: 1}
+    assert progress_service.version(1) == 2
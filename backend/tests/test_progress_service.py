@@ -0,0 +1,137 @@
+from datetime import datetime
+
+import pytest
+
+from services.progress_service import parse_client_time
+
+NOW = datetime(2024, 5, 10, 12, 0, 0)
+
+
+def test_missing_time_is_now():
+    assert parse_client_time(None, NOW) == NOW
+
+
+def test_naive_time_is_taken_as_utc():
+    assert parse_client_time('2024-05-09T08:30:00', NOW) == datetime(2024, 5, 9, 8, 30)
+
+
+def test_z_suffix():
+    assert parse_client_time('2024-05-09T08:30:00.250Z', NOW) == datetime(2024, 5, 9, 8, 30, 0, 250000)
+
+
+def test_offset_is_converted_to_naive_utc():
+    parsed = parse_client_time('2024-05-09T08:30:00+02:00', NOW)
+    assert parsed == datetime(2024, 5, 9, 6, 30)
+    assert parsed.tzinfo is None
+
+
+def test_future_time_is_clamped_to_now():
+    assert parse_client_time('2024-05-11T00:00:00Z', NOW) == NOW
+
+
+@pytest.mark.parametrize('value', [1715340000, ['2024-05-09'], {}])
+def test_non_string_is_rejected(value):
+    with pytest.raises(ValueError):
+        parse_client_time(value, NOW)
+
+
+def test_malformed_string_is_rejected():
+    with pytest.raises(ValueError):
+        parse_client_time('yesterday', NOW)
+
+
+def sync_events(*days, prefix='k'):
+    return [{'key': f'{prefix}{day}', 'day': day, 'completed_at': '2024-05-09T08:00:00Z'} for day in days]
+
+
+def test_apply_sync_completes_days_once(app, users):
+    from models import db, LessonCompletion
+    from services import progress_service
+    from conftest import ProgressRow
+
+    users(1)
+    progress = ProgressRow(1)
+    applied = progress_service.apply_sync(progress, sync_events(1, 2), lambda day: True, now=NOW)
+    db.session.commit()
+    assert applied == (2, 0, [])
+    assert progress_service.completed_days(1) == [1, 2]
+    assert progress.current_day == 3
+    assert LessonCompletion.query.get((1, 1)).completed_at == datetime(2024, 5, 9, 8, 0)
+    version = progress_service.version(1)
+
+    # A retried batch is all duplicates and changes nothing
+    applied = progress_service.apply_sync(progress, sync_events(1, 2), lambda day: True, now=NOW)
+    db.session.commit()
+    assert applied == (0, 2, [])
+    assert progress_service.version(1) == version
+
+
+def test_apply_sync_rejects_invalid_events(app, users):
+    from services import progress_service
+    from conftest import ProgressRow
+
+    users(1)
+    events = [
+        {'key': 'a', 'day': 99},
+        {'key': '', 'day': 1},
+        {'key': 'b', 'day': True},
+        {'key': 'c', 'day': 1, 'completed_at': 'yesterday'},
+        'not an event',
+        {'key': 'd', 'day': 1},
+        {'key': 'd', 'day': 2},
+    ]
+    applied, duplicates, rejected = progress_service.apply_sync(ProgressRow(1), events, lambda day: day < 10, now=NOW)
+    assert (applied, duplicates) == (1, 1)
+    assert [entry['index'] for entry in rejected] == [0, 1, 2, 3, 4]
+    assert progress_service.completed_days(1) == [1]
+
+
+def test_apply_sync_bumps_the_version_per_change(app, users):
+    from models import db
+    from services import progress_service
+    from conftest import ProgressRow
+
+    users(1)
+    progress = ProgressRow(1, current_day=5)
+    progress_service.apply_sync(progress, sync_events(1, 2), lambda day: True, now=NOW)
+    db.session.commit()
+    assert progress_service.version(1) == 2
+    assert [change['day'] for change in progress_service.changes_since(1, 0)] == [1, 2]
+    assert progress_service.changes_since(1, 2) == []
+
+    # An earlier time for a completed day moves it back and is a change
+    progress_service.apply_sync(progress, [{'key': 'x', 'day': 2, 'completed_at': '2024-05-01T00:00:00Z'}],
+                                lambda day: True, now=NOW)
+    db.session.commit()
+    assert progress_service.changes_since(1, 2) == [
+        {'day': 2, 'completed': True, 'completed_at': '2024-05-01T00:00:00'}
+    ]
+
+
+def test_sync_route_retries_when_a_concurrent_request_inserts_a_key(client, users, progress_rows, auth_headers,
+                                                                   monkeypatch):
+    import sqlite3
+
+    from services import curriculum_edits, curriculum_service
+
+    users(1)
+    progress_rows.add(1)
+    snapshot = curriculum_service.get_index().snapshot()
+    lesson = snapshot.lesson
+    raced = []
+
+    def lesson_racing_another_request(day):
+        # Another request commits the same key after this one looked for it, so this commit fails once
+        if not raced:
+            raced.append(day)
+            with sqlite3.connect(curriculum_edits.EDITS_DB_PATH) as other:
+                other.execute("INSERT INTO progress_sync_keys (user_id, key, day, applied_at) "
+                              "VALUES (1, 'k1', 1, '2024-05-10 12:00:00')")
+        return lesson(day)
+
+    monkeypatch.setattr(snapshot, 'lesson', lesson_racing_another_request)
+    response = client.post('/api/progress/sync', json={'events': sync_events(1, 2)}, headers=auth_headers(1))
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body['applied'], body['duplicates']) == (1, 1)
+    assert body['completed_days'] == [2]
@@ -0,0 +1,38 @@
+from services.search_service import SearchIndex, highlight, MATCH_START, MATCH_END
+
+
+class Snapshot:
+    """The parts of a curriculum snapshot the search index reads."""
+
+    digest = 'test'
+
+    def __init__(self, lessons):
+        self.lessons = lessons
+
+    def days(self):
+        return list(self.lessons)
+
+    def lesson(self, day):
+        return self.lessons[day], {'name': 'White Belt'}
+
+    def reference(self, day):
+        return None
+
+
+def test_highlight_escapes_the_text_around_the_matches():
+    snippet = f'<b>{MATCH_START}print{MATCH_END}("a & b")</b>'
+    assert highlight(snippet) == '&lt;b&gt;<mark>print</mark>(&quot;a &amp; b&quot;)&lt;/b&gt;'
+
+
+def test_search_snippets_cannot_inject_markup(tmp_path):
+    index = SearchIndex(path=str(tmp_path / 'search.db'))
+    index.sync(Snapshot({1: {
+        'title': 'Printing',
+        'content': 'Use <script>alert(1)</script> with print to show text',
+        'exercise': {'title': 'Hello', 'description': 'Say hello'}
+    }}))
+
+    [result] = index.search('show')
+    assert '<script>' not in result['snippet']
+    assert '&lt;script&gt;alert(1)&lt;/script&gt;' in result['snippet']
+    assert '<mark>show</mark>' in result['snippet']
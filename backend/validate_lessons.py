@@ -0,0 +1,178 @@
+"""Run every reference exercise in lessons.py and check its expectations.
+
+A lesson whose exercise is a starter template for students to finish keeps
+its finished program in "solution", which is run instead. Each exercise
+runs in the execution sandbox with its "test_inputs" fed to stdin, and
+passes when its output has everything in "expected_output_contains" (or
+equals "expected_output"). Results are
+compared with lesson_validation_baseline.json and the command exits with
+status 1 when a lesson that used to pass now fails, or a new lesson fails.
+
+A lesson whose result differs from the baseline is run again. If its runs
+disagree (random or timing-dependent exercises), it is reported as flaky
+and recorded as "excluded" in the baseline instead of a pass/fail bit;
+excluded lessons are never reported as regressions or fixes.
+
+    python validate_lessons.py                    # check against the baseline
+    python validate_lessons.py --update-baseline  # accept the current results
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config.execution_config import EXECUTION_POOL, RESULT_CACHE
+from lessons import curriculum
+from services import execution_service
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Baseline value for lessons whose outcome varies from run to run
+EXCLUDED = 'excluded'
+
+
+def reference_lessons():
+    """(belt, lesson) for every lesson in lessons.py, in day order."""
+    found = [
+        (belt, lesson)
+        for belt, belt_data in curriculum.items()
+        for lesson in belt_data['lessons']
+    ]
+    return sorted(found, key=lambda item: item[1]['day'])
+
+
+def as_sandbox_lesson(lesson):
+    """The lesson in the shape execution_service grades against."""
+    if 'expected_output_contains' in lesson:
+        test_case = {'expected_output_contains': lesson['expected_output_contains']}
+    else:
+        test_case = {'match': 'whitespace', 'expected': lesson.get('expected_output', '')}
+    exercise = {'test_cases': [test_case]}
+    if lesson.get('limits'):
+        exercise['limits'] = lesson['limits']
+    return {'day': f"lessons.py:{lesson['day']}", 'exercise': exercise}
+
+
+def scripted_stdin(lesson):
+    inputs = lesson.get('test_inputs') or []
+    return ''.join(f'{value}\n' for value in inputs)
+
+
+def validate(belt, lesson):
+    started = time.monotonic()
+    try:
+        result = execution_service.execute(lesson.get('solution', lesson['exercise']), scripted_stdin(lesson),
+                                           as_sandbox_lesson(lesson))
+    except Exception as e:
+        return {'day': lesson['day'], 'belt': belt, 'passed': False,
+                'runtime_ms': round((time.monotonic() - started) * 1000, 1), 'note': f'sandbox error: {str(e)}'}
+
+    passed = not result['stderr'] and bool(result['matched'])
+    note = ''
+    if result.get('limit_exceeded'):
+        note = f"{result['limit_exceeded']} limit exceeded"
+    elif result['stderr']:
+        note = result['stderr'].strip().splitlines()[-1]
+    elif not passed:
+        note = 'expected output not found'
+    return {
+        'day': lesson['day'],
+        'belt': belt,
+        'passed': passed,
+        'runtime_ms': result['duration_ms'],
+        'note': note
+    }
+
+
+def confirm(belt, lesson, result, expected, runs):
+    """Re-run a lesson whose result differs from the baseline; flag it flaky if the runs disagree."""
+    if expected == EXCLUDED or expected is None or result['passed'] == expected:
+        return result
+    for _ in range(runs - 1):
+        rerun = validate(belt, lesson)
+        if rerun['passed'] != result['passed']:
+            return dict(result, flaky=True, note='flaky: passes on some runs and fails on others')
+    return result
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=EXECUTION_POOL['SIZE'] or 4,
+                        help='execution workers to run exercises on')
+    parser.add_argument('--baseline', default=os.path.join(BASE_DIR, 'lesson_validation_baseline.json'))
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='record the current results as the new baseline')
+    parser.add_argument('--runs', type=int, default=3,
+                        help='runs of a lesson whose result differs from the baseline, to detect flaky ones')
+    args = parser.parse_args()
+
+    # Each worker is a separate interpreter process; one thread drives each.
+    # Cached results would hide both regressions and real runtimes.
+    EXECUTION_POOL['SIZE'] = max(1, args.workers)
+    RESULT_CACHE['ENABLED'] = False
+
+    lessons = reference_lessons()
+    baseline = load_baseline(args.baseline)
+    started = time.monotonic()
+
+    def check(item):
+        belt, lesson = item
+        # New lessons are expected to pass
+        expected = baseline.get(str(lesson['day']), True)
+        return confirm(belt, lesson, validate(belt, lesson), expected, max(1, args.runs))
+
+    with ThreadPoolExecutor(max_workers=EXECUTION_POOL['SIZE']) as executor:
+        results = list(executor.map(check, lessons))
+    elapsed = time.monotonic() - started
+
+    regressions = []
+    print(f"{'day':>5}  {'belt':<12} {'status':<6} {'runtime':>9}  note")
+    for result in results:
+        key = str(result['day'])
+        excluded = result.get('flaky') or baseline.get(key) == EXCLUDED
+        regressed = not excluded and not result['passed'] and baseline.get(key, True)
+        if regressed:
+            regressions.append(result)
+        if excluded:
+            status = 'flaky'
+        else:
+            status = 'pass' if result['passed'] else ('FAIL' if regressed else 'fail')
+        print(f"{key:>5}  {result['belt']:<12} {status:<6} {result['runtime_ms']:>7.1f}ms  {result['note']}")
+
+    passed = sum(1 for result in results if result['passed'])
+    print(f"\n{passed} of {len(results)} lessons pass; validated in {elapsed:.1f}s")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                str(result['day']): EXCLUDED if result.get('flaky') or baseline.get(str(result['day'])) == EXCLUDED
+                else result['passed']
+                for result in results
+            }, f, indent=2)
+            f.write('\n')
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    fixed = [result for result in results
+             if result['passed'] and not result.get('flaky') and baseline.get(str(result['day'])) is False]
+    if fixed:
+        print(f"Now passing: days {', '.join(str(result['day']) for result in fixed)} "
+              f"(run with --update-baseline to record)")
+    if regressions:
+        print(f"Regressions: days {', '.join(str(result['day']) for result in regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -152,8 +152,10 @@ const BeltProgressTracker = ({ onDaySelect, currentProgress }) => {
 
   const fetchBelts = async () => {
     try {
-      const response = await axios.get('http://localhost:5000/api/curriculum');
-      console.log('API Response:', response.data); // Debug log
+      // The summary has titles and progress flags only; lesson bodies load when a lesson is opened
+      const response = await axios.get('http://localhost:5000/api/curriculum/summary', {
+        headers: { Authorization: `Bearer ${localStorage.getItem('token')}` }
+      });
       
       if (!response.data || !Array.isArray(response.data.belts)) {
         throw new Error('Invalid curriculum data structure');
@@ -162,13 +164,13 @@ const BeltProgressTracker = ({ onDaySelect, currentProgress }) => {
       const transformedBelts = response.data.belts.map(belt => ({
         name: belt.displayName || belt.name,
         color: belt.color || '#f8f9fa',
-        totalDays: belt.requiredDays || (belt.days ? belt.days.length : 0),
-        completedDays: belt.days ? belt.days.filter(day => day.isCompleted).length : 0,
-        isCompleted: false,
-        days: (belt.days || []).map(day => ({
+        totalDays: belt.total,
+        completedDays: belt.completed,
+        isCompleted: belt.total > 0 && belt.completed === belt.total,
+        days: belt.lessons.map(day => ({
           ...day,
-          isCompleted: day.isCompleted || false,
-          isLocked: day.isLocked || false
+          isCompleted: day.is_completed,
+          isLocked: !day.is_accessible
         }))
       }));
       
@@ -247,8 +247,9 @@ const LessonView = () => {
           setCode(data.exercise.starterCode);
         }
 
-        // Fetch the curriculum to get all days for the current belt
-        const curriculumResponse = await fetch('http://localhost:5000/api/curriculum', {
+        // Fetch the curriculum to get all days for the current belt.
+        // The content document carries an ETag, so repeat loads are 304s served from the browser cache.
+        const curriculumResponse = await fetch('http://localhost:5000/api/curriculum/content', {
           method: 'GET',
           headers: {
             'Content-Type': 'application/json',
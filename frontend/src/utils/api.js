@@ -48,14 +48,62 @@ export const fetchWithAuth = async (endpoint, options = {}) => {
   }
 };
 
+// Completions that could not be sent, kept until the next sync
+const PENDING_PROGRESS_KEY = 'pendingProgress';
+
+const readPendingProgress = () => {
+  try {
+    return JSON.parse(localStorage.getItem(PENDING_PROGRESS_KEY)) || [];
+  } catch (e) {
+    return [];
+  }
+};
+
+const queueProgressEvent = (event) => {
+  localStorage.setItem(PENDING_PROGRESS_KEY, JSON.stringify([...readPendingProgress(), event]));
+};
+
+// Sends every queued completion in one request. Events keep their keys,
+// so resending a batch the server already applied is harmless.
+export const flushPendingProgress = async () => {
+  const events = readPendingProgress();
+  if (events.length === 0) {
+    return null;
+  }
+  const response = await fetchWithAuth('/api/progress/sync', {
+    method: 'POST',
+    body: { events }
+  });
+  const sent = new Set(events.map((event) => event.key));
+  localStorage.setItem(
+    PENDING_PROGRESS_KEY,
+    JSON.stringify(readPendingProgress().filter((event) => !sent.has(event.key)))
+  );
+  return response;
+};
+
 export const updateProgress = async (completedDay) => {
+  const event = {
+    key: `${Date.now()}-${Math.random().toString(36).slice(2)}`,
+    day: Number(completedDay),
+    completed_at: new Date().toISOString()
+  };
   try {
+    // Completions queued while offline go out together with this one
+    if (readPendingProgress().length > 0) {
+      queueProgressEvent(event);
+      return await flushPendingProgress();
+    }
     const response = await fetchWithAuth('/api/progress/update', {
       method: 'POST',
       body: { completed_day: completedDay }
     });
     return response;
   } catch (error) {
+    // No status means the request never reached the server; keep the event for the next sync
+    if (!error.status && !readPendingProgress().some((pending) => pending.key === event.key)) {
+      queueProgressEvent(event);
+    }
     console.error('Failed to update progress:', error);
     throw error;
   }